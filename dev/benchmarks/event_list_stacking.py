@@ -0,0 +1,99 @@
+"""Measure runtime and peak memory of event list stacking.
+
+Writes a set of synthetic event list files and stacks them with
+`EventListDataset.vstack_from_files` (preallocated output, optionally
+memory mapped) and with the previous implementation (read all tables,
+then `astropy.table.vstack`). Each method runs in a separate process,
+so that the peak resident set size (RSS) can be compared.
+
+Usage::
+
+    python event_list_stacking.py [n_files] [n_events_per_file]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import os
+import sys
+import resource
+import shutil
+import tempfile
+import time
+from multiprocessing import Process, Queue
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table, vstack
+from gammapy.data import EventListDataset
+
+COLUMNS = ['EVENT_ID', 'TIME', 'RA', 'DEC', 'DETX', 'DETY', 'ENERGY', 'ALT', 'AZ']
+
+
+def make_files(outdir, n_files, n_events):
+    filenames = []
+    for idx in range(n_files):
+        events = Table()
+        for name in COLUMNS:
+            events[name] = np.random.random(n_events)
+        events['EVENT_ID'] = np.arange(n_events)
+        events.meta.update(dict(OBS_ID=idx, TSTART=100. * idx, TSTOP=100. * idx + 50,
+                                ONTIME=50., LIVETIME=45., DEADC=0.9))
+        gti = Table(dict(START=[100. * idx], STOP=[100. * idx + 50]))
+
+        hdu_list = fits.HDUList([
+            fits.PrimaryHDU(),
+            fits.BinTableHDU(events, name='EVENTS'),
+            fits.BinTableHDU(gti, name='GTI'),
+        ])
+        filename = os.path.join(outdir, 'events_{:04d}.fits'.format(idx))
+        hdu_list.writeto(filename)
+        filenames.append(filename)
+    return filenames
+
+
+def stack_vstack(filenames, outdir):
+    """Previous implementation of `EventListDataset.vstack_from_files`."""
+    event_lists = [Table.read(filename, hdu='EVENTS') for filename in filenames]
+    gtis = [Table.read(filename, hdu='GTI') for filename in filenames]
+    events = vstack(event_lists, metadata_conflicts='silent')
+    vstack(gtis, metadata_conflicts='silent')
+    return len(events)
+
+
+def stack_prealloc(filenames, outdir):
+    dataset = EventListDataset.vstack_from_files(filenames)
+    return len(dataset.event_list)
+
+
+def stack_memmap(filenames, outdir):
+    dataset = EventListDataset.vstack_from_files(filenames, memmap_dir=outdir)
+    return len(dataset.event_list)
+
+
+def run(func, filenames, outdir, queue):
+    t = time.time()
+    n_events = func(filenames, outdir)
+    runtime = time.time() - t
+    # ru_maxrss is in kB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+    queue.put((n_events, runtime, peak_rss))
+
+
+def main(n_files=20, n_events=500000):
+    outdir = tempfile.mkdtemp(prefix='gammapy_stack_')
+    try:
+        filenames = make_files(outdir, n_files, n_events)
+        size = sum(os.path.getsize(_) for _ in filenames) / 1024. ** 2
+        print('Stacking {} files with {} events ({:.0f} MB)'.format(n_files, n_events, size))
+
+        for func in [stack_vstack, stack_prealloc, stack_memmap]:
+            queue = Queue()
+            process = Process(target=run, args=(func, filenames, outdir, queue))
+            process.start()
+            n_events_total, runtime, peak_rss = queue.get()
+            process.join()
+            print('{:15s} events: {:10d} runtime: {:6.2f} s peak RSS: {:8.1f} MB'.format(
+                func.__name__, n_events_total, runtime, peak_rss))
+    finally:
+        shutil.rmtree(outdir)
+
+
+if __name__ == '__main__':
+    main(*[int(_) for _ in sys.argv[1:]])
@@ -0,0 +1,94 @@
+"""Measure per-observation exposure and background computation for survey maps.
+
+Computes exposure cubes (`gammapy.cube.exposure_cube`) and background
+acceptance images (`gammapy.background.fill_acceptance_image`) for a
+number of pointings, for increasing sizes of the reference map. The
+previous implementation evaluated the IRFs for every pixel of the map,
+so the time per observation scales with the map size. Now only the
+cutout containing the field of view of the observation is evaluated
+and the time per observation is independent of the map size.
+
+Usage::
+
+    python fov_cutout_exposure.py [n_obs]
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import sys
+import time
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import SkyCoord, Angle
+from gammapy.image import SkyImage
+from gammapy.cube import SkyCube, exposure_cube
+from gammapy.irf import EffectiveAreaTable2D
+from gammapy.background import fill_acceptance_image
+from gammapy.utils.energy import EnergyBounds
+
+BINSZ = 0.02
+OFFSET_MAX = Angle(2.5, 'deg')
+MAP_SIZES = [(10, 10), (30, 10), (60, 10)]
+
+
+def make_aeff():
+    energy = np.logspace(-1, 2, 31) * u.TeV
+    offset = np.linspace(0, 3, 16) * u.deg
+    data = 1e5 * np.exp(-(offset.value / 2) ** 2) * np.ones((30, 1)) * u.m ** 2
+    return EffectiveAreaTable2D(energy=energy, offset=offset, data=data)
+
+
+def exposure_cube_full(pointing, livetime, aeff2d, ref_cube, offset_max):
+    """Previous implementation of `exposure_cube`, evaluating all pixels."""
+    coordinates = ref_cube.ref_sky_image.coordinates()
+    offset = coordinates.separation(pointing)
+    offset = np.clip(offset, Angle(0, 'deg'), offset_max)
+    energy = EnergyBounds(ref_cube.energy).log_centers
+    return aeff2d.evaluate(offset=offset, energy=energy) * livetime
+
+
+def acceptance_full(image, pointing, offset, acceptance):
+    """Previous background image computation, on the full map."""
+    header = image.to_image_hdu().header
+    return fill_acceptance_image(header, pointing, offset, acceptance, OFFSET_MAX)
+
+
+def acceptance_cutout(image, pointing, offset, acceptance):
+    """Background image computation on the field of view cutout, pasted into the map."""
+    cutout = image.cutout_circle(pointing, OFFSET_MAX)
+    header = cutout.to_image_hdu().header
+    cutout.data = fill_acceptance_image(header, pointing, offset, acceptance, OFFSET_MAX).data
+    image.paste(cutout)
+
+
+def main(n_obs=5):
+    aeff = make_aeff()
+    livetime = 1000 * u.s
+    offset = Angle(np.linspace(0, 3, 31), 'deg')
+    acceptance = np.exp(-offset.deg ** 2)
+
+    for width, height in MAP_SIZES:
+        nxpix, nypix = int(width / BINSZ), int(height / BINSZ)
+        image = SkyImage.empty(nxpix=nxpix, nypix=nypix, binsz=BINSZ, proj='CAR')
+        cube = SkyCube.empty(emin=0.5, emax=50, enbins=5, nxpix=nxpix, nypix=nypix,
+                             binsz=BINSZ, proj='CAR')
+        lon = np.random.uniform(-width / 2 + 3, width / 2 - 3, n_obs)
+        lat = np.random.uniform(-height / 2 + 3, height / 2 - 3, n_obs)
+        pointings = SkyCoord(lon, lat, unit='deg', frame='galactic')
+        print('Map {} x {} deg ({} x {} pixels)'.format(width, height, nxpix, nypix))
+
+        for label, func in [('exposure full', exposure_cube_full),
+                            ('exposure cutout', exposure_cube)]:
+            t = time.time()
+            for pointing in pointings:
+                func(pointing, livetime, aeff, cube, OFFSET_MAX)
+            print('  {:18s} {:8.3f} s per observation'.format(label, (time.time() - t) / n_obs))
+
+        for label, func in [('background full', acceptance_full),
+                            ('background cutout', acceptance_cutout)]:
+            t = time.time()
+            for pointing in pointings:
+                func(image, pointing, offset, acceptance)
+            print('  {:18s} {:8.3f} s per observation'.format(label, (time.time() - t) / n_obs))
+
+
+if __name__ == '__main__':
+    main(*[int(_) for _ in sys.argv[1:]])
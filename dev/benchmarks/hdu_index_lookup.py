@@ -0,0 +1,100 @@
+"""Measure the speed of HDU index table row lookups.
+
+Creates a synthetic HDU index table with 100k rows (six HDUs per
+observation, with padded HDU_TYPE and HDU_CLASS strings as in real
+index files), and compares `HDUIndexTable.row_idx` with the previous
+implementation, a Python loop over all rows.
+
+Usage::
+
+    python hdu_index_lookup.py
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import time
+import numpy as np
+from gammapy.data import HDUIndexTable
+
+N_ROWS = 100000
+N_LOOKUPS = 20
+
+HDUS = [
+    ('events', 'events'),
+    ('gti', 'gti'),
+    ('aeff', 'aeff_2d'),
+    ('edisp', 'edisp_2d'),
+    ('psf', 'psf_3gauss'),
+    ('bkg', 'bkg_3d'),
+]
+
+
+def make_hdu_index_table(n_rows):
+    n_obs = -(-n_rows // len(HDUS))
+    obs_id = np.repeat(np.arange(n_obs), len(HDUS))
+    hdu_type = np.tile(['{:10s}'.format(_[0]) for _ in HDUS], n_obs)
+    hdu_class = np.tile(['{:>10s}'.format(_[1]) for _ in HDUS], n_obs)
+
+    table = HDUIndexTable()
+    table['OBS_ID'] = obs_id
+    table['HDU_TYPE'] = hdu_type
+    table['HDU_CLASS'] = hdu_class
+    table['FILE_DIR'] = np.char.add('run', obs_id.astype(str))
+    table['FILE_NAME'] = np.char.add(np.char.strip(hdu_class), '.fits.gz')
+    table['HDU_NAME'] = np.char.upper(np.char.strip(hdu_type))
+    table.meta['BASE_DIR'] = '.'
+    return table
+
+
+def row_idx_loop(table, stripped, obs_id, hdu_type=None, hdu_class=None):
+    """Previous implementation of `HDUIndexTable.row_idx`."""
+    hdu_class_stripped, hdu_type_stripped = stripped
+    idx_list = []
+
+    for idx in range(len(table)):
+        if table['OBS_ID'][idx] == obs_id:
+            if hdu_class and hdu_class_stripped[idx] == hdu_class:
+                idx_list.append(idx)
+
+            if hdu_type and hdu_type_stripped[idx] == hdu_type:
+                idx_list.append(idx)
+
+    return idx_list
+
+
+def main():
+    table = make_hdu_index_table(N_ROWS)
+    obs_ids = np.random.choice(table['OBS_ID'], N_LOOKUPS)
+    print('HDU index table with {} rows'.format(len(table)))
+
+    # The stripped columns were cached in the previous implementation as well
+    stripped = [_.strip() for _ in table['HDU_CLASS']], [_.strip() for _ in table['HDU_TYPE']]
+    t = time.time()
+    expected = [row_idx_loop(table, stripped, obs_id, hdu_type='aeff') for obs_id in obs_ids]
+    t_loop = (time.time() - t) / N_LOOKUPS
+    print('Python loop:      {:10.3g} s per lookup'.format(t_loop))
+
+    t = time.time()
+    table.row_idx(obs_id=0, hdu_type='aeff')
+    t_build = time.time() - t
+    print('Index build:      {:10.3g} s'.format(t_build))
+
+    obs_ids_all = table.obs_id_unique
+    t = time.time()
+    for obs_id in obs_ids_all:
+        table.row_idx(obs_id=obs_id, hdu_type='aeff')
+        table.row_idx(obs_id=obs_id, hdu_class='edisp_2d')
+    t_dict = (time.time() - t) / (2 * len(obs_ids_all))
+    print('Dict lookup:      {:10.3g} s per lookup'.format(t_dict))
+    print('Speed-up:         {:10.0f}'.format(t_loop / t_dict))
+
+    actual = [table.row_idx(obs_id, hdu_type='aeff') for obs_id in obs_ids]
+    assert actual == expected
+
+    t = time.time()
+    for obs_id in obs_ids_all:
+        table.hdu_location(obs_id=obs_id, hdu_type='events')
+    t_location = (time.time() - t) / len(obs_ids_all)
+    print('hdu_location:     {:10.3g} s per call'.format(t_location))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Compare the runtime of the Sherpa and native spectrum fits.
+
+Fits a power law jointly to the ``hess-crab4`` observations, repeated to
+get 4 to 256 observations, with ``SpectrumFit(method='sherpa')`` and
+``SpectrumFit(method='native')``, and prints the runtimes and best-fit
+indices. The Sherpa fit is skipped for more than ``MAX_OBS_SHERPA``
+observations.
+
+Usage::
+
+    python spectrum_fit_native.py
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from time import time
+import astropy.units as u
+from gammapy.spectrum import SpectrumObservationList, SpectrumFit, models
+
+N_REPEAT = [1, 4, 16, 64]
+MAX_OBS_SHERPA = 64
+
+
+def fit(obs_list, method):
+    model = models.PowerLaw(index=2 * u.Unit(''),
+                            amplitude=1e-12 * u.Unit('cm-2 s-1 TeV-1'),
+                            reference=1 * u.TeV)
+    fit = SpectrumFit(obs_list, model, method=method)
+    t = time()
+    fit.fit()
+    return time() - t, fit.result[0].model.parameters.index.value
+
+
+def main():
+    obs_list = SpectrumObservationList.read('$GAMMAPY_EXTRA/datasets/hess-crab4_pha')
+
+    print('{:>6s} {:>12s} {:>12s} {:>14s} {:>14s}'.format(
+        'n_obs', 'sherpa (s)', 'native (s)', 'sherpa index', 'native index'))
+
+    for n_repeat in N_REPEAT:
+        obs = SpectrumObservationList(list(obs_list) * n_repeat)
+        time_native, index_native = fit(obs, 'native')
+
+        if len(obs) <= MAX_OBS_SHERPA:
+            time_sherpa, index_sherpa = fit(obs, 'sherpa')
+        else:
+            time_sherpa, index_sherpa = float('nan'), float('nan')
+
+        print('{:6d} {:12.3f} {:12.3f} {:14.4f} {:14.4f}'.format(
+            len(obs), time_sherpa, time_native, index_sherpa, index_native))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Measure the cost of the TS image amplitude error and upper limit outputs.
+
+Computes TS images for the ``poisson_stats_image`` test dataset with and
+without the ``amplitude_err`` and ``amplitude_ul`` outputs of
+`~gammapy.detect.compute_ts_image` and prints the runtimes.
+
+Usage::
+
+    python ts_image_errors.py
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from astropy.convolution import Gaussian2DKernel
+from gammapy.image import SkyImageList
+from gammapy.detect import compute_ts_image, TSImageEngine
+
+OPTIONS = [
+    dict(),
+    dict(error=True),
+    dict(ul=True),
+    dict(error=True, ul=True),
+]
+
+
+def main():
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+    kernel = Gaussian2DKernel(2.5)
+
+    with TSImageEngine(parallel=False) as engine:
+        for method in ['root brentq', 'batch newton']:
+            for options in OPTIONS:
+                result = compute_ts_image(images['counts'], images['background'],
+                                          images['exposure'], kernel, method=method,
+                                          engine=engine, **options)
+                print('{:15s} {:35s} runtime: {:6.2f} s'.format(
+                    method, str(sorted(options)), result.meta['runtime']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Compare speed and results of the TS image fit methods.
+
+Computes TS images for the ``poisson_stats_image`` test dataset with the
+``'root brentq'`` method (one scalar root finding call per pixel) and the
+``'batch newton'`` method (roots for all pixels of a tile found at once),
+and prints the runtimes and the maximum differences of the results.
+
+Usage::
+
+    python ts_image_methods.py
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import numpy as np
+from astropy.convolution import Gaussian2DKernel
+from gammapy.image import SkyImageList
+from gammapy.detect import compute_ts_image, TSImageEngine
+
+METHODS = ['root brentq', 'batch newton']
+
+
+def main():
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+    kernel = Gaussian2DKernel(2.5)
+
+    results = {}
+    for parallel in [False, True]:
+        with TSImageEngine(parallel=parallel) as engine:
+            for method in METHODS:
+                result = compute_ts_image(images['counts'], images['background'],
+                                          images['exposure'], kernel, method=method,
+                                          engine=engine)
+                print('{:15s} parallel={:5s} runtime: {:6.2f} s'.format(
+                    method, str(parallel), result.meta['runtime']))
+                results[method] = result
+
+    reference, batch = results['root brentq'], results['batch newton']
+    for name in ['ts', 'amplitude', 'niter']:
+        diff = np.nanmax(np.abs(reference[name].data - batch[name].data))
+        print('Max. abs. difference {:10s}: {:.3g}'.format(name, diff))
+
+
+if __name__ == '__main__':
+    main()
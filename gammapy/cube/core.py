@@ -24,6 +24,7 @@ from ..utils.testing import assert_wcs_allclose
 from ..utils.energy import EnergyBounds
 from ..utils.fits import table_to_fits_table
 from ..image import SkyImage
+from ..image.core import _bin_index
 from ..spectrum import LogEnergyAxis
 from ..spectrum.powerlaw import power_law_I_from_points
 
@@ -174,26 +175,42 @@ class SkyCube(object):
 
         return cls(data=data, wcs=wcs, energy=energy, meta=meta)
 
-    def fill_events(self, events, weights=None):
+    def fill_events(self, events, weights=None, chunk_size=1000000):
         """
         Fill events (modifies ``data`` attribute).
 
+        The cube indices of each event are computed from the WCS and the
+        energy axis and the events are counted with `numpy.bincount`, in
+        chunks of ``chunk_size`` events (see `~gammapy.image.SkyImage.fill_events`).
+
         Parameters
         ----------
         events : `~gammapy.data.EventList`
             Event list
         weights : str, optional
             Column to use as weights (none by default)
+        chunk_size : int, optional
+            Number of events processed at once.
         """
         if weights is not None:
-            weights = events[weights]
-
-        xx, yy, zz = self.wcs_skycoord_to_pixel(events.radec, events.energy)
+            weights = np.asarray(events[weights], dtype=float)
 
-        bins = self._bins_energy, self.ref_sky_image._bins_pix[0], self.ref_sky_image._bins_pix[1]
-        data = np.histogramdd([zz, yy, xx], bins, weights=weights)[0]
+        radec, energy = events.radec, events.energy
+        if not radec.shape == energy.shape:
+            raise ValueError('Position and energy array must have the same shape.')
 
-        self.data = self.data + data
+        nz, ny, nx = self.data.shape
+        counts = np.zeros(self.data.size)
+        for start in range(0, len(events), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            yy, xx = self.ref_sky_image._events_pix_index(radec[chunk])
+            zz = _bin_index(self.energy_axis.world2pix(energy[chunk]), nz, offset=0)
+            valid = (zz >= 0) & (yy >= 0) & (xx >= 0)
+            idx = (zz[valid] * ny + yy[valid]) * nx + xx[valid]
+            weights_chunk = None if weights is None else weights[chunk][valid]
+            counts += np.bincount(idx, weights=weights_chunk, minlength=counts.size)
+
+        self.data = self.data + counts.reshape(self.data.shape)
 
     @property
     def _bins_energy(self):
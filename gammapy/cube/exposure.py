@@ -2,6 +2,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 import numpy as np
 from astropy.coordinates import SkyCoord, Angle
+from astropy.units import Quantity
 from .core import SkyCube
 from ..utils.energy import EnergyBounds
 
@@ -29,19 +30,36 @@ def exposure_cube(pointing,
     ref_cube : `~gammapy.data.SkyCube`
         Reference cube used to define geometry
     offset_max : `~astropy.coordinates.Angle`
-        Maximum field of view offset.
+        Maximum field of view offset. If given, the exposure is only
+        computed for the part of the cube within ``offset_max`` of the
+        pointing position, and set to zero elsewhere.
 
     Returns
     -------
     expcube : `~gammapy.data.SkyCube`
         Exposure cube (3D)
     """
-    coordinates = ref_cube.ref_sky_image.coordinates()
-    offset = coordinates.separation(pointing)
-    offset = np.clip(offset, Angle(0, 'deg'), offset_max)
-
+    ref_image = ref_cube.ref_sky_image
     energy = EnergyBounds(ref_cube.energy).log_centers
-    exposure = aeff2d.evaluate(offset=offset, energy=energy)
+
+    if offset_max is None:
+        offset = ref_image.coordinates().separation(pointing)
+        exposure = aeff2d.evaluate(offset=offset, energy=energy)
+    else:
+        offset_max = Angle(offset_max)
+        exposure = np.zeros((len(energy),) + ref_image.data.shape)
+        exposure = Quantity(exposure, aeff2d.data.unit)
+
+        # Only evaluate the effective area on the field of view cutout
+        slices = ref_image._cutout_circle_slices(pointing, offset_max)
+        if slices is not None:
+            offset = ref_image._cutout_slices(slices).coordinates().separation(pointing)
+            inside = offset <= offset_max
+            if inside.any():
+                aeff = aeff2d.evaluate(offset=offset[inside], energy=energy)
+                exposure_cutout = exposure[(slice(None),) + slices]
+                exposure_cutout[:, inside] = aeff.reshape((len(energy), -1))
+
     exposure *= livetime
 
     expcube = SkyCube(data=exposure,
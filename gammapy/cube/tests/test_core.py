@@ -16,7 +16,8 @@ from ...datasets import FermiGalacticCenter
 from ...image import make_header
 from ...irf import EnergyDependentTablePSF
 from ...spectrum.powerlaw import power_law_evaluate
-from .. import SkyCube, compute_npred_cube, convolve_cube
+from ...utils.energy import EnergyBounds
+from .. import SkyCube, compute_npred_cube, convolve_cube, NpredCubeEvaluator, PSFKernelCache
 
 
 @requires_data('gammapy-extra')
@@ -272,6 +273,13 @@ def test_convolve_cube():
 
     assert_allclose(actual, expected, rtol=1e-2)
 
+    kernel_cache = PSFKernelCache()
+    npred_cube_fft = convolve_cube(npred_cube, psf, offset_max=Angle(5, 'deg'),
+                                   method='fft', kernel_cache=kernel_cache)
+    assert_allclose(npred_cube_fft.data, npred_cube_convolved.data, rtol=1e-6, atol=1e-10)
+    # One kernel and one kernel FFT per energy bin
+    assert len(kernel_cache) == 6
+
 
 @pytest.mark.xfail
 @requires_dependency('scipy')
@@ -309,3 +317,45 @@ def test_bin_events_in_cube():
     counts.fill_events(events)
 
     assert counts.data.sum() == 1233
+
+
+@requires_dependency('scipy')
+def test_npred_cube_evaluator():
+    energies = Quantity([1, 2, 4, 8], 'MeV')
+    exposure_cube, sky_cube = make_test_cubes(energies, 10, 10, 1)
+    energy_bins = EnergyBounds([1, 2, 4], 'MeV')
+
+    evaluator = NpredCubeEvaluator(exposure_cube, energy_bins, integral_resolution=1)
+    npred_cube = evaluator.compute(sky_cube)
+    expected = compute_npred_cube(sky_cube, exposure_cube, energy_bins,
+                                  integral_resolution=1)
+    assert npred_cube.data.shape == (2, 10, 10)
+    assert_allclose(npred_cube.data, expected.data)
+
+    # Power law with index 2 and exposure 1
+    solid_angle = exposure_cube.ref_sky_image.solid_angle().to('sr').value
+    assert_allclose(npred_cube.data[0], 0.5 * solid_angle)
+    assert_allclose(npred_cube.data[1], 0.25 * solid_angle)
+
+    # Re-use the evaluator for a different flux cube
+    sky_cube.data = 2 * sky_cube.data
+    npred_cube_2 = evaluator.compute(sky_cube)
+    assert_allclose(npred_cube_2.data, 2 * npred_cube.data)
+
+
+def test_fill_events_chunks():
+    counts = SkyCube.empty(emin=1, emax=10, enbins=3, nxpix=10, nypix=8, binsz=0.2,
+                           proj='TAN', coordsys='CEL')
+    rng = np.random.RandomState(0)
+    events = EventList()
+    events['RA'] = rng.uniform(-1, 1, 500) % 360
+    events['DEC'] = rng.uniform(-1, 1, 500)
+    events['ENERGY'] = 10 ** rng.uniform(-0.5, 1.5, 500)
+    events.meta['EUNIT'] = 'TeV'
+
+    xx, yy, zz = counts.wcs_skycoord_to_pixel(events.radec, events.energy)
+    bins = counts._bins_energy, counts.ref_sky_image._bins_pix[0], counts.ref_sky_image._bins_pix[1]
+    expected = np.histogramdd([zz, yy, xx], bins)[0]
+
+    counts.fill_events(events, chunk_size=99)
+    assert_allclose(counts.data, expected)
@@ -3,17 +3,22 @@
 Cube analysis utility functions.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
+from collections import OrderedDict
 import numpy as np
 from astropy.io.fits import ImageHDU
 from astropy.units import Quantity
 from astropy.coordinates import Angle
+from ..utils.energy import EnergyBounds
 from ..image import SkyImage
+from ..spectrum.powerlaw import power_law_I_from_points
 from .core import SkyCube
 
 __all__ = [
     'compute_npred_cube',
     'convolve_cube',
     'cube_to_spec',
+    'NpredCubeEvaluator',
+    'PSFKernelCache',
 ]
 
 
@@ -21,6 +26,9 @@ def compute_npred_cube(flux_cube, exposure_cube, energy_bins,
                        integral_resolution=10):
     """Computes predicted counts cube in energy bins.
 
+    For repeated computations with the same exposure cube, e.g. in a fit,
+    use `NpredCubeEvaluator`.
+
     Parameters
     ----------
     flux_cube : `SkyCube`
@@ -38,38 +46,129 @@ def compute_npred_cube(flux_cube, exposure_cube, energy_bins,
     npred_cube : `SkyCube`
         Predicted counts cube in energy bins.
     """
-    if flux_cube.data.shape[1:] != exposure_cube.data.shape[1:]:
-        raise ValueError('flux_cube and exposure cube must have the same shape!\n'
-                         'flux_cube: {0}\nexposure_cube: {1}'
-                         ''.format(flux_cube.data.shape[1:], exposure_cube.data.shape[1:]))
-
-    energy_centers = energy_bins.log_centers
-    wcs = exposure_cube.wcs
-    coordinates = exposure_cube.ref_sky_image.coordinates()
-    solid_angle = exposure_cube.ref_sky_image.solid_angle()
-
-    npred_cube = np.zeros((len(energy_bins) - 1,
-                           exposure_cube.data.shape[1], exposure_cube.data.shape[2]))
-    for i in range(len(energy_bins) - 1):
-        energy_bound = energy_bins[i:i + 2]
-        int_flux = flux_cube.integral_flux_image(energy_bound, integral_resolution)
-        int_flux = Quantity(int_flux.data, '1 / (cm2 s sr)')
-        energy = energy_centers[i] * np.ones(coordinates.shape)
-        exposure = Quantity(exposure_cube.lookup(coordinates, energy, interpolation=True), 'cm2 s')
-        npred_image = int_flux * exposure * solid_angle
-        npred_cube[i] = npred_image.to('')
-    npred_cube = np.nan_to_num(npred_cube)
-
-    npred_cube = SkyCube(data=npred_cube,
-                         wcs=wcs,
-                         energy=energy_bins)
-    return npred_cube
-
-
-def convolve_cube(cube, psf, offset_max):
+    evaluator = NpredCubeEvaluator(exposure_cube, energy_bins, integral_resolution)
+    return evaluator.compute(flux_cube)
+
+
+class NpredCubeEvaluator(object):
+    """Compute predicted counts cubes for a given exposure cube and energy binning.
+
+    The solid angle of the pixels, the exposure at the energy bin centers
+    and the energies used for the integration of the flux in each bin are
+    computed once, so that `compute` only has to interpolate the flux
+    cube along the energy axis and integrate it. The interpolation
+    pixel coordinates are cached for each energy axis of the flux cubes.
+
+    The flux cubes must have the same WCS as the exposure cube, the
+    energy axis can be different. The flux cube is interpolated linearly
+    in flux and log(energy) and integrated assuming a power law in each of
+    the ``integral_resolution`` steps per energy bin, as in
+    `SkyCube.integral_flux_image`.
+
+    Parameters
+    ----------
+    exposure_cube : `SkyCube`
+        Instrument exposure cube.
+    energy_bins : `~gammapy.utils.energy.EnergyBounds`
+        Energy bin edges of the predicted counts cube.
+    integral_resolution : int (optional)
+        Number of integration steps in energy bin when computing integral flux.
+
+    Examples
+    --------
+    Compute predicted counts for a series of flux cubes::
+
+        from gammapy.cube import NpredCubeEvaluator
+        evaluator = NpredCubeEvaluator(exposure_cube, energy_bins)
+        for flux_cube in flux_cubes:
+            npred_cube = evaluator.compute(flux_cube)
+    """
+
+    def __init__(self, exposure_cube, energy_bins, integral_resolution=10):
+        self.exposure_cube = exposure_cube
+        self.energy_bins = EnergyBounds(energy_bins)
+        self.integral_resolution = integral_resolution
+        self.solid_angle = exposure_cube.ref_sky_image.solid_angle().to('sr').value
+
+        # Exposure at the energy bin centers
+        energy_centers = self.energy_bins.log_centers
+        z = exposure_cube.energy_axis.world2pix(energy_centers)
+        exposure = Quantity(exposure_cube.data).value
+        self.exposure = _interpolate_energy_axis(exposure, z)
+
+        # Integration steps of all bins (n_bins, integral_resolution + 1),
+        # equally spaced in log(energy) within each bin
+        x = np.log10(self.energy_bins.value)
+        steps = np.arange(integral_resolution + 1) / integral_resolution
+        x_steps = x[:-1, np.newaxis] + (x[1:] - x[:-1])[:, np.newaxis] * steps
+        energy = Quantity(10 ** x_steps, self.energy_bins.unit)
+        self.integral_energy = energy.to('MeV').value
+
+        self._flux_axis_cache = dict()
+
+    def compute(self, flux_cube):
+        """Compute the predicted counts cube.
+
+        Parameters
+        ----------
+        flux_cube : `SkyCube`
+            Differential flux cube.
+
+        Returns
+        -------
+        npred_cube : `SkyCube`
+            Predicted counts cube in energy bins.
+        """
+        flux_shape = flux_cube.data.shape[1:]
+        exposure_shape = self.exposure_cube.data.shape[1:]
+        if flux_shape != exposure_shape:
+            raise ValueError('flux_cube and exposure cube must have the same shape!\n'
+                             'flux_cube: {0}\nexposure_cube: {1}'
+                             ''.format(flux_shape, exposure_shape))
+
+        z = self._flux_energy_pix(flux_cube)
+        flux = _interpolate_energy_axis(Quantity(flux_cube.data).value, z.ravel())
+        flux = flux.reshape(z.shape + flux_shape)
+
+        # Integral flux using power-law approximation in each step
+        energy1 = self.integral_energy[:, :-1, np.newaxis, np.newaxis]
+        energy2 = self.integral_energy[:, 1:, np.newaxis, np.newaxis]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            int_flux = power_law_I_from_points(energy1, energy2, flux[:, :-1], flux[:, 1:])
+        int_flux = int_flux.sum(axis=1)
+
+        npred_cube = np.nan_to_num(int_flux * self.exposure * self.solid_angle)
+
+        return SkyCube(data=npred_cube,
+                       wcs=self.exposure_cube.wcs,
+                       energy=self.energy_bins)
+
+    def _flux_energy_pix(self, flux_cube):
+        """Energy axis pixel coordinates of the integration steps (cached)."""
+        energy = Quantity(flux_cube.energy)
+        key = (energy.unit.to_string(),) + tuple(energy.value)
+        if key not in self._flux_axis_cache:
+            energy = Quantity(self.integral_energy, 'MeV')
+            self._flux_axis_cache[key] = flux_cube.energy_axis.world2pix(energy)
+        return self._flux_axis_cache[key]
+
+
+def _interpolate_energy_axis(data, z):
+    """Linear interpolation of ``data`` at energy axis pixel coordinates ``z``."""
+    z = np.asarray(z, dtype=float)
+    idx = np.clip(np.floor(z).astype(int), 0, max(len(data) - 2, 0))
+    idx_hi = np.minimum(idx + 1, len(data) - 1)
+    weight = (z - idx)[:, np.newaxis, np.newaxis]
+    return data[idx] * (1 - weight) + data[idx_hi] * weight
+
+
+def convolve_cube(cube, psf, offset_max, method='direct', kernel_cache=None):
     """Convolves a predicted counts cube in energy bins with the an
     energy-dependent PSF.
 
+    Pixels outside the cube are obtained by mirroring the cube at its
+    edges (``mode='mirror'`` in `~scipy.ndimage.convolve`).
+
     Parameters
     ----------
     cube : `SkyCube`
@@ -78,13 +177,26 @@ def convolve_cube(cube, psf, offset_max):
         Energy dependent PSF.
     offset_max : `~astropy.units.Quantity`
         Maximum offset in degrees of the PSF convolution kernel from its center.
+    method : {'direct', 'fft'}
+        Convolution method. ``'direct'`` uses `~scipy.ndimage.convolve`,
+        ``'fft'`` multiplies the Fourier transforms, which is much faster
+        for large kernels.
+    kernel_cache : `PSFKernelCache`, optional
+        Cache for the kernel images and their Fourier transforms. Pass the
+        same cache for repeated convolutions with the same PSF, e.g. in a fit,
+        so that the kernels are only computed once.
 
     Returns
     -------
     convolved_cube : `SkyCube`
         PSF convolved predicted counts cube in energy bins.
     """
-    from scipy.ndimage import convolve
+    if method not in ['direct', 'fft']:
+        raise ValueError('Invalid method: {}'.format(method))
+
+    if kernel_cache is None:
+        kernel_cache = PSFKernelCache()
+
     energy = cube.energy
     indices = np.arange(len(energy) - 1)
     convolved_cube = np.zeros_like(cube.data)
@@ -92,15 +204,160 @@ def convolve_cube(cube, psf, offset_max):
 
     for i in indices:
         energy_band = energy[i:i + 2]
-        psf_at_energy = psf.table_psf_in_energy_band(energy_band)
-        kernel_image = psf_at_energy.kernel(pixel_size, offset_max, normalize=True)
-        convolved_cube[i] = convolve(cube.data[i], kernel_image,
-                                     mode='mirror')
+        image = np.asarray(cube.data[i])
+        if method == 'direct':
+            from scipy.ndimage import convolve
+            kernel_image = kernel_cache.kernel(psf, energy_band, pixel_size, offset_max)
+            convolved_cube[i] = convolve(image, kernel_image, mode='mirror')
+        else:
+            kernel_fft = kernel_cache.kernel_fft(psf, energy_band, pixel_size,
+                                                 offset_max, image.shape)
+            convolved_cube[i] = _fft_convolve_mirror(image, kernel_fft)
     convolved_cube = SkyCube(data=convolved_cube, wcs=cube.wcs,
                              energy=cube.energy)
     return convolved_cube
 
 
+class PSFKernelCache(object):
+    """Cache of PSF kernel images and their Fourier transforms.
+
+    Used by `convolve_cube`. Kernels are stored with the key (PSF object,
+    energy band, pixel size, maximum offset), the Fourier transforms of
+    the zero-padded kernels additionally with the image shape. If more
+    than ``max_items`` entries are stored, the least recently used are
+    removed.
+
+    The PSF objects are identified by the instance, so PSFs should
+    not be modified in place after they have been used with a cache.
+
+    Parameters
+    ----------
+    max_items : int, optional
+        Maximum number of cached kernels and kernel Fourier transforms.
+
+    Examples
+    --------
+    Convolve several model cubes with the same PSF::
+
+        from gammapy.cube import convolve_cube, PSFKernelCache
+        kernel_cache = PSFKernelCache()
+        for npred_cube in npred_cubes:
+            convolved = convolve_cube(npred_cube, psf, offset_max='1 deg',
+                                      method='fft', kernel_cache=kernel_cache)
+    """
+
+    def __init__(self, max_items=100):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def kernel(self, psf, energy_band, pixel_size, offset_max):
+        """Normalized kernel image (`~numpy.ndarray`) for an energy band.
+
+        Parameters
+        ----------
+        psf : `~gammapy.irf.EnergyDependentTablePSF`
+            Energy dependent PSF.
+        energy_band : `~astropy.units.Quantity`
+            Energy band
+        pixel_size : `~astropy.coordinates.Angle`
+            Kernel pixel size
+        offset_max : `~astropy.coordinates.Angle`
+            Maximum offset of the kernel from its center.
+        """
+        energy_band = Quantity(energy_band)
+        pixel_size, offset_max = Angle(pixel_size), Angle(offset_max)
+        key = (psf, tuple(energy_band.to('TeV').value),
+               pixel_size.deg, offset_max.deg)
+
+        kernel = self._get(key)
+        if kernel is None:
+            psf_at_energy = psf.table_psf_in_energy_band(energy_band)
+            kernel = psf_at_energy.kernel(pixel_size, offset_max, normalize=True)
+            kernel = np.asarray(kernel, dtype=float)
+            self._add(key, kernel)
+
+        return kernel
+
+    def kernel_fft(self, psf, energy_band, pixel_size, offset_max, shape):
+        """Fourier transform of the zero-padded kernel, for images of a given shape.
+
+        See `kernel` for a description of the parameters, ``shape`` is the
+        shape of the images to convolve.
+        """
+        key = (psf, tuple(Quantity(energy_band).to('TeV').value),
+               Angle(pixel_size).deg, Angle(offset_max).deg, tuple(shape))
+
+        kernel_fft = self._get(key)
+        if kernel_fft is None:
+            kernel = self.kernel(psf, energy_band, pixel_size, offset_max)
+            kernel_fft = _KernelFFT(kernel, shape)
+            self._add(key, kernel_fft)
+
+        return kernel_fft
+
+    def clear(self):
+        """Remove all cached kernels."""
+        self._items.clear()
+
+    def _get(self, key):
+        if key not in self._items:
+            return None
+        # Re-insert to mark as most recently used
+        item = self._items.pop(key)
+        self._items[key] = item
+        return item
+
+    def _add(self, key, item):
+        self._items[key] = item
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+
+class _KernelFFT(object):
+    """Fourier transform of a kernel, padded for mirror-mode convolution."""
+
+    def __init__(self, kernel, shape):
+        self.pad = kernel.shape[0] // 2
+        self.fft_shape = tuple(_next_fast_len(n + 2 * self.pad) for n in shape)
+
+        # Zero-padded kernel, with the kernel center at pixel (0, 0)
+        padded = np.zeros(self.fft_shape)
+        padded[:kernel.shape[0], :kernel.shape[1]] = kernel
+        padded = np.roll(np.roll(padded, -self.pad, axis=0), -self.pad, axis=1)
+        self.data = np.fft.rfft2(padded)
+
+
+def _fft_convolve_mirror(image, kernel_fft):
+    """Convolve image with `_KernelFFT`, mirroring the image at the edges."""
+    pad = kernel_fft.pad
+    ny, nx = image.shape
+
+    padded = np.zeros(kernel_fft.fft_shape)
+    padded[:ny + 2 * pad, :nx + 2 * pad] = np.pad(image, pad, mode='reflect')
+    result = np.fft.irfft2(np.fft.rfft2(padded) * kernel_fft.data, kernel_fft.fft_shape)
+    return result[pad:pad + ny, pad:pad + nx]
+
+
+def _next_fast_len(n):
+    """Smallest integer >= n with only the prime factors 2, 3 and 5."""
+    best = 2 ** int(np.ceil(np.log2(n)))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # Smallest power of 2 times p35 that is >= n
+            p2 = p35
+            while p2 < n:
+                p2 *= 2
+            best = min(best, p2)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
 def cube_to_image(cube, slicepos=None):
     """Slice or project 3-dim cube into a 2-dim image.
 
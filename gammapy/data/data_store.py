@@ -1,11 +1,19 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
+import os
 import sys
 import logging
+import threading
+import traceback
 import numpy as np
 from collections import OrderedDict
 import subprocess
-from astropy.extern.six.moves import UserList
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+from astropy.extern import six
+from astropy.extern.six.moves import UserList, queue
+from astropy.io import fits
 from astropy.table import Table
 from astropy.utils import lazyproperty
 from astropy.units import Quantity
@@ -19,6 +27,7 @@ from ..irf import EnergyDependentTablePSF
 
 __all__ = [
     'DataStore',
+    'DataStoreCache',
     'DataStoreObservation',
     'ObservationList',
 ]
@@ -42,6 +51,12 @@ class DataStore(object):
         Observation index table
     name : str
         Data store name
+    cache : bool or `~gammapy.data.DataStoreCache`
+        Cache for loaded objects, see `~gammapy.data.DataStoreCache`.
+        By default a new cache is created, pass ``False`` to disable
+        caching. A `~gammapy.data.DataStoreCache` instance can be shared
+        by several data stores. Pickled data stores (e.g. to send them to
+        worker processes) get a new empty cache with the same limits.
     """
     DEFAULT_HDU_TABLE = 'hdu-index.fits.gz'
     """Default HDU table filename."""
@@ -52,7 +67,7 @@ class DataStore(object):
     DEFAULT_NAME = 'noname'
     """Default data store name."""
 
-    def __init__(self, hdu_table=None, obs_table=None, name=None):
+    def __init__(self, hdu_table=None, obs_table=None, name=None, cache=True):
         self.hdu_table = hdu_table
         self.obs_table = obs_table
 
@@ -61,6 +76,46 @@ class DataStore(object):
         else:
             self.name = self.DEFAULT_NAME
 
+        if cache is True:
+            cache = DataStoreCache()
+        elif cache is False:
+            cache = None
+        self.cache = cache
+
+    def __getstate__(self):
+        # The cache holds a lock and can't be pickled. Unpickled data stores,
+        # e.g. in worker processes, get a new empty cache with the same limits.
+        state = self.__dict__.copy()
+        if self.cache is not None:
+            state['cache'] = dict(max_items=self.cache.max_items, max_bytes=self.cache.max_bytes)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.cache is not None:
+            self.cache = DataStoreCache(**self.cache)
+
+    def load(self, location):
+        """Load the object for a given HDU location.
+
+        If the data store has a cache, the object is taken from the
+        cache if available.
+
+        Parameters
+        ----------
+        location : `~gammapy.data.HDULocation`
+            HDU location
+
+        Returns
+        -------
+        object : object
+            Object depends on type, e.g. for `events` it's a `~gammapy.data.EventList`.
+        """
+        if self.cache is None:
+            return location.load()
+        else:
+            return self.cache.load(location)
+
     @classmethod
     def from_files(cls, base_dir, hdu_table_filename=None, obs_table_filename=None, name=None):
         """Construct `DataStore` from HDU and observation index table files."""
@@ -217,49 +272,173 @@ class DataStore(object):
         """
         return ObservationList(self.obs(_) for _ in obs_id)
 
-    def load_all(self, hdu_type=None, hdu_class=None):
+    def load_all(self, hdu_type=None, hdu_class=None, n_jobs=1, backend='thread'):
         """Load a given file type for all observations
 
         Parameters
         ----------
-        hdu_type : str
+        hdu_type : str or list of str
             HDU type (see `~gammapy.data.HDUIndexTable.VALID_HDU_TYPE`)
-        hdu_class : str
+        hdu_class : str or list of str
             HDU class (see `~gammapy.data.HDUIndexTable.VALID_HDU_CLASS`)
+        n_jobs : int, optional
+            Number of parallel loading jobs, see `~gammapy.data.DataStore.iter_load`
+        backend : {'thread', 'process'}
+            Parallel backend, see `~gammapy.data.DataStore.iter_load`
 
         Returns
         -------
         list : python list of object
             Object depends on type, e.g. for `events` it is a list of `~gammapy.data.EventList`.
+            For a list of HDU types or classes, one list of objects per observation.
         """
         obs_ids = self.obs_table['OBS_ID']
-        return self.load_many(obs_ids=obs_ids, hdu_type=hdu_type, hdu_class=hdu_class)
+        return self.load_many(obs_ids=obs_ids, hdu_type=hdu_type, hdu_class=hdu_class,
+                              n_jobs=n_jobs, backend=backend)
 
-    def load_many(self, obs_ids, hdu_type=None, hdu_class=None):
+    def load_many(self, obs_ids, hdu_type=None, hdu_class=None, n_jobs=1, backend='thread'):
         """Load a given file type for certain observations in an obs_table
 
         Parameters
         ----------
         obs_ids : list
             List of observation IDs
-        hdu_type : str
+        hdu_type : str or list of str
             HDU type (see `~gammapy.data.HDUIndexTable.VALID_HDU_TYPE`)
-        hdu_class : str
+        hdu_class : str or list of str
             HDU class (see `~gammapy.data.HDUIndexTable.VALID_HDU_CLASS`)
+        n_jobs : int, optional
+            Number of parallel loading jobs, see `~gammapy.data.DataStore.iter_load`
+        backend : {'thread', 'process'}
+            Parallel backend, see `~gammapy.data.DataStore.iter_load`
 
         Returns
         -------
         list : list of object
             Object depends on type, e.g. for `events` it is a list of `~gammapy.data.EventList`.
+            For a list of HDU types or classes, one list of objects per observation.
         """
-        things = []
-        for obs_id in obs_ids:
-            obs = self.obs(obs_id=obs_id)
-            thing = obs.load(hdu_type=hdu_type, hdu_class=hdu_class)
-            things.append(thing)
+        things = [None] * len(obs_ids)
+        loaded = self.iter_load(obs_ids=obs_ids, hdu_type=hdu_type, hdu_class=hdu_class,
+                                n_jobs=n_jobs, backend=backend, with_index=True)
+        for idx, _, thing in loaded:
+            things[idx] = thing
 
         return things
 
+    def iter_load(self, obs_ids, hdu_type=None, hdu_class=None, n_jobs=1,
+                  backend='thread', max_in_flight=None, with_index=False):
+        """Load given file types for certain observations, yielding objects as they are loaded.
+
+        HDUs stored in the same file are read from one opened file, also if
+        several HDU types are requested, e.g. the events, GTI and IRFs stored
+        in one file per run. Objects in the data store cache are yielded
+        first, the others in the order they are loaded. At most
+        ``max_in_flight`` files are loaded or waiting to be consumed at any
+        time, which bounds the memory used for a large number of observations.
+
+        Reading gzipped FITS files is mostly I/O bound and decompression
+        releases the GIL, so the ``'thread'`` backend usually gives a good
+        speed-up; the ``'process'`` backend avoids the GIL completely, but
+        the loaded objects have to be pickled back to the main process.
+
+        Parameters
+        ----------
+        obs_ids : list
+            List of observation IDs
+        hdu_type : str or list of str
+            HDU type (see `~gammapy.data.HDUIndexTable.VALID_HDU_TYPE`)
+        hdu_class : str or list of str
+            HDU class (see `~gammapy.data.HDUIndexTable.VALID_HDU_CLASS`)
+        n_jobs : int, optional
+            Number of parallel loading jobs. If None, the number of CPUs is used.
+        backend : {'thread', 'process'}
+            Use a thread or process pool for ``n_jobs > 1``.
+        max_in_flight : int, optional
+            Maximum number of files being loaded or waiting to be consumed.
+            Default is ``2 * n_jobs``.
+        with_index : bool
+            Yield ``(index, obs_id, object)`` instead of ``(obs_id, object)``,
+            where ``index`` is the position in ``obs_ids``.
+
+        Yields
+        ------
+        obs_id : int
+            Observation ID
+        object : object
+            Object depends on type, e.g. for `events` it's a `~gammapy.data.EventList`.
+            If a list of HDU types or classes is given, a list with one object
+            per HDU type or class, yielded when all of them are loaded.
+
+        Examples
+        --------
+        Process all event lists with four loading threads::
+
+            from gammapy.data import DataStore
+            data_store = DataStore.from_dir('$GAMMAPY_EXTRA/datasets/hess-crab4-hd-hap-prod2')
+            obs_ids = data_store.obs_table['OBS_ID']
+            for obs_id, events in data_store.iter_load(obs_ids, hdu_type='events', n_jobs=4):
+                print(obs_id, len(events))
+
+        Load events and IRFs together::
+
+            hdu_types = ['events', 'aeff', 'edisp', 'psf']
+            for obs_id, (events, aeff, edisp, psf) in data_store.iter_load(obs_ids, hdu_type=hdu_types):
+                print(obs_id, len(events))
+        """
+        if backend not in ['thread', 'process']:
+            raise ValueError('Invalid backend: {}'.format(backend))
+
+        selections, multiple = _hdu_selections(hdu_type, hdu_class)
+
+        # Group locations by file, keeping objects from the cache
+        groups = OrderedDict()
+        loaded = OrderedDict()
+        n_missing = dict()
+        for idx, obs_id in enumerate(obs_ids):
+            obs = self.obs(obs_id=obs_id)
+            loaded[idx] = [None] * len(selections)
+            n_missing[idx] = 0
+            for sel_idx, (sel_type, sel_class) in enumerate(selections):
+                location = obs.location(hdu_type=sel_type, hdu_class=sel_class)
+                key = None if self.cache is None else self.cache.key(location)
+                thing = None if key is None else self.cache.get(key)
+
+                if thing is None:
+                    path = str(location.path(abs_path=True))
+                    groups.setdefault(path, []).append((idx, sel_idx, key, location))
+                    n_missing[idx] += 1
+                else:
+                    loaded[idx][sel_idx] = thing
+
+        def complete(idx):
+            things = loaded.pop(idx)
+            thing = things if multiple else things[0]
+            obs_id = obs_ids[idx]
+            return (idx, obs_id, thing) if with_index else (obs_id, thing)
+
+        for idx in [_ for _ in loaded if n_missing[_] == 0]:
+            yield complete(idx)
+
+        tasks = list(groups.values())
+        args = [(task_idx, [_[3] for _ in task]) for task_idx, task in enumerate(tasks)]
+        n_jobs = n_jobs or cpu_count()
+
+        if n_jobs == 1 or len(tasks) <= 1:
+            results = (_load_group(arg) for arg in args)
+        else:
+            results = _imap_bounded(_load_group, args, n_jobs, backend,
+                                    max_in_flight or 2 * n_jobs)
+
+        for task_idx, things in results:
+            for (idx, sel_idx, key, _), thing in zip(tasks[task_idx], things):
+                if self.cache is not None:
+                    self.cache.add(key, thing)
+                loaded[idx][sel_idx] = thing
+                n_missing[idx] -= 1
+                if n_missing[idx] == 0:
+                    yield complete(idx)
+
     def check_integrity(self, logger=None):
         """Check integrity, i.e. whether index and observation table match.
         """
@@ -420,6 +599,251 @@ class DataStore(object):
         return Table(rows=rows, names=colnames)
 
 
+def _hdu_selections(hdu_type, hdu_class):
+    """List of ``(hdu_type, hdu_class)`` pairs for `DataStore.iter_load`.
+
+    Also returns whether a list of HDU types or classes was given.
+    """
+    types_list = isinstance(hdu_type, (list, tuple))
+    classes_list = isinstance(hdu_class, (list, tuple))
+    if not (types_list or classes_list):
+        return [(hdu_type, hdu_class)], False
+
+    n_hdus = len(hdu_type) if types_list else len(hdu_class)
+    hdu_types = list(hdu_type) if types_list else [hdu_type] * n_hdus
+    hdu_classes = list(hdu_class) if classes_list else [hdu_class] * n_hdus
+    if len(hdu_types) != len(hdu_classes):
+        raise ValueError('hdu_type and hdu_class must have the same length.')
+
+    return list(zip(hdu_types, hdu_classes)), True
+
+
+def _load_group(task):
+    """Load several HDUs from one file.
+
+    HDUs listed several times are only loaded once.
+    """
+    task_idx, locations = task
+
+    if len(locations) == 1:
+        return task_idx, [locations[0].load()]
+
+    things = OrderedDict()
+    hdu_list = fits.open(str(locations[0].path()), memmap=False)
+    try:
+        for location in locations:
+            key = location.hdu_name, location.hdu_class
+            if key not in things:
+                things[key] = location.load(hdu_list=hdu_list)
+    finally:
+        hdu_list.close()
+
+    return task_idx, [things[_.hdu_name, _.hdu_class] for _ in locations]
+
+
+def _call(func, arg):
+    """Call function, returning exceptions with their traceback instead of raising them."""
+    try:
+        return True, func(arg)
+    except Exception as exc:
+        return False, (exc, traceback.format_exc())
+
+
+def _imap_bounded(func, args, n_jobs, backend, max_in_flight):
+    """Like ``Pool.imap_unordered``, with at most ``max_in_flight`` pending results.
+
+    Results are yielded as they complete. New tasks are only submitted
+    when a result has been consumed, so the memory used by the results
+    is bounded.
+    """
+    pool = ThreadPool(n_jobs) if backend == 'thread' else Pool(n_jobs)
+    done = queue.Queue()
+    args = iter(args)
+    n_pending = 0
+
+    try:
+        for arg in islice(args, max_in_flight):
+            pool.apply_async(_call, (func, arg), callback=done.put)
+            n_pending += 1
+
+        while n_pending:
+            success, result = done.get()
+            n_pending -= 1
+            if not success:
+                exc, tb = result
+                msg = 'Loading failed in worker:\n{}'.format(tb)
+                six.raise_from(RuntimeError(msg), exc)
+
+            for arg in islice(args, 1):
+                pool.apply_async(_call, (func, arg), callback=done.put)
+                n_pending += 1
+
+            yield result
+    finally:
+        pool.terminate()
+
+
+class DataStoreCache(object):
+    """Cache for objects loaded from a `~gammapy.data.DataStore`.
+
+    Objects are stored with the key (file path, HDU name, file modification
+    time), so IRFs shared by several observations are only loaded once,
+    and objects are reloaded if the file changes. If one of the limits is
+    exceeded, the least recently used objects are removed.
+
+    Cached objects are shared between all callers, so they should not
+    be modified in place.
+
+    Parameters
+    ----------
+    max_items : int, optional
+        Maximum number of cached objects.
+    max_bytes : int, optional
+        Maximum total memory in bytes of the cached objects, as estimated
+        from the size of their numpy arrays. Objects larger than this are
+        not cached.
+
+    Examples
+    --------
+    Check the cache after loading some data::
+
+        from gammapy.data import DataStore
+        data_store = DataStore.from_dir('$GAMMAPY_EXTRA/datasets/hess-crab4-hd-hap-prod2')
+        aeffs = data_store.load_all(hdu_type='aeff')
+        aeffs = data_store.load_all(hdu_type='aeff')
+        print(data_store.cache)
+
+    Use one cache, with a memory limit of 1 GB, for two data stores::
+
+        from gammapy.data import DataStore, DataStoreCache
+        cache = DataStoreCache(max_bytes=1e9)
+        data_store_1 = DataStore.from_dir('data_1')
+        data_store_1.cache = cache
+        data_store_2 = DataStore.from_dir('data_2')
+        data_store_2.cache = cache
+    """
+
+    def __init__(self, max_items=100, max_bytes=2 ** 31):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._objects = OrderedDict()
+        self._nbytes = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._objects)
+
+    @property
+    def nbytes(self):
+        """Estimated total memory of the cached objects in bytes."""
+        return sum(self._nbytes.values())
+
+    @staticmethod
+    def key(location):
+        """Cache key for a given `~gammapy.data.HDULocation`.
+
+        Returns ``None`` if the file doesn't exist.
+        """
+        path = str(location.path(abs_path=True))
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        return path, location.hdu_name, location.hdu_class, mtime
+
+    def load(self, location):
+        """Load object for a given `~gammapy.data.HDULocation`, using the cache."""
+        key = self.key(location)
+        obj = self.get(key)
+
+        if obj is None:
+            obj = location.load()
+            self.add(key, obj)
+
+        return obj
+
+    def get(self, key):
+        """Get object for a given key, ``None`` if not in the cache."""
+        with self._lock:
+            if key not in self._objects:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            # Re-insert to mark as most recently used
+            obj = self._objects.pop(key)
+            self._objects[key] = obj
+            self._nbytes[key] = self._nbytes.pop(key)
+            return obj
+
+    def add(self, key, obj):
+        """Add an object to the cache and remove old objects if needed."""
+        if key is None:
+            return
+
+        nbytes = _estimate_nbytes(obj)
+
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            log.debug('Not caching {}: too large ({} bytes)'.format(key, nbytes))
+            return
+
+        with self._lock:
+            self._objects.pop(key, None)
+            self._nbytes.pop(key, None)
+            self._objects[key] = obj
+            self._nbytes[key] = nbytes
+
+            while len(self._objects) > self.max_items or \
+                    (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                old_key, _ = self._objects.popitem(last=False)
+                self._nbytes.pop(old_key)
+                log.debug('Removed from cache: {}'.format(old_key))
+
+    def clear(self):
+        """Remove all objects from the cache and reset the counters."""
+        with self._lock:
+            self._objects.clear()
+            self._nbytes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __str__(self):
+        ss = self.__class__.__name__ + '\n'
+        ss += 'Number of objects: {} (max: {})\n'.format(len(self), self.max_items)
+        ss += 'Memory: {:.1f} MB (max: {})\n'.format(
+            self.nbytes / 1e6, None if self.max_bytes is None else self.max_bytes / 1e6)
+        ss += 'Hits: {}\n'.format(self.hits)
+        ss += 'Misses: {}\n'.format(self.misses)
+        return ss
+
+
+def _estimate_nbytes(obj, _seen=None):
+    """Estimate memory used by an object from the numpy arrays it holds."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Views share memory with their base array
+        if isinstance(obj.base, np.ndarray):
+            return _estimate_nbytes(obj.base, _seen)
+        return obj.nbytes
+    elif isinstance(obj, Table):
+        return sum(_estimate_nbytes(col, _seen) for col in obj.columns.values())
+    elif isinstance(obj, dict):
+        return sum(_estimate_nbytes(val, _seen) for val in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        return sum(_estimate_nbytes(val, _seen) for val in obj)
+    elif type(obj).__module__.startswith('gammapy') and hasattr(obj, '__dict__'):
+        return _estimate_nbytes(vars(obj), _seen)
+    else:
+        return 0
+
+
 class DataStoreObservation(object):
     """IACT data store observation.
 
@@ -428,9 +852,9 @@ class DataStoreObservation(object):
 
     def __init__(self, obs_id, data_store):
         # Assert that `obs_id` is available
-        if obs_id not in data_store.obs_table['OBS_ID']:
+        if obs_id not in data_store.obs_table._index_dict:
             raise ValueError('OBS_ID = {} not in obs index table.'.format(obs_id))
-        if obs_id not in data_store.hdu_table['OBS_ID']:
+        if obs_id not in data_store.hdu_table._obs_id_index:
             raise ValueError('OBS_ID = {} not in HDU index table.'.format(obs_id))
 
         self.obs_id = obs_id
@@ -474,7 +898,7 @@ class DataStoreObservation(object):
             Object depends on type, e.g. for `events` it's a `~gammapy.data.EventList`.
         """
         location = self.location(hdu_type=hdu_type, hdu_class=hdu_class)
-        return location.load()
+        return self.data_store.load(location)
 
     @lazyproperty
     def events(self):
@@ -1,17 +1,21 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
 import logging
+import re
 import sys
 from collections import OrderedDict
 import numpy as np
+from astropy.extern import six
 from astropy.utils.console import ProgressBar
 from astropy.io import fits
 from astropy.units import Quantity
 from astropy.time import Time
 from astropy.coordinates import SkyCoord, Angle, AltAz
-from astropy.table import Table
+from astropy.table import Table, Column
 from ..utils.energy import EnergyBounds
+from ..utils.coordinates import sky_to_unit_vector, sky_circle_membership
 from ..utils.scripts import make_path
+from ..utils.fits import iter_fits_table_chunks, _STRUCTURAL_KEYWORDS
 from ..extern.pathlib import Path
 from ..utils.time import time_ref_from_dict
 from .utils import _earth_location_from_dict
@@ -50,7 +54,17 @@ class EventList(Table):
     - `radec` for ``RA``, ``DEC``
     - `energy` for ``ENERGY``
     - `galactic` for ``GLON``, ``GLAT``
+
+    The `radec`, `galactic` and `offset` objects and the event unit vectors
+    (see `radec_xyz`) are cached, so that e.g. repeated selections only
+    compute them once. Selecting rows (e.g. ``event_list[mask]``) passes
+    the selected part of the cache on to the new event list. The cache is
+    cleared when the coordinate columns are replaced or assigned to, rows
+    are added or removed, the table is sorted or reversed, or the pointing
+    position in the header changes. If you modify coordinate column values
+    in place (e.g. ``event_list['RA'][0] = 42``), call `clear_coord_cache`.
     """
+    _COORD_COLUMNS = ['RA', 'DEC', 'GLON', 'GLAT']
 
     def summary(self, file=None):
         """Summary info string."""
@@ -80,14 +94,78 @@ class EventList(Table):
         time = met_ref + met
         return time
 
+    def __getitem__(self, item):
+        out = super(EventList, self).__getitem__(item)
+
+        # Pass on the coordinate cache for row selections
+        if isinstance(out, EventList) and not _is_column_selection(item):
+            cache = self._get_coord_cache()
+            if not isinstance(item, slice):
+                item = np.asarray(item)
+                if item.dtype.kind not in 'biu':
+                    return out
+
+            out_cache = out._get_coord_cache()
+            for name in ['radec', 'offset', 'xyz']:
+                if name in cache:
+                    out_cache[name] = cache[name][item]
+
+        return out
+
+    def __setitem__(self, item, value):
+        if not isinstance(item, six.string_types) or item in self._COORD_COLUMNS:
+            self.clear_coord_cache()
+        super(EventList, self).__setitem__(item, value)
+
+    def sort(self, *args, **kwargs):
+        self.clear_coord_cache()
+        super(EventList, self).sort(*args, **kwargs)
+
+    def reverse(self):
+        self.clear_coord_cache()
+        super(EventList, self).reverse()
+
+    def _coord_cache_key(self):
+        """Values the cached coordinates depend on."""
+        columns = [self.columns.get(_) for _ in ['RA', 'DEC']]
+        pointing = self.meta.get('RA_PNT'), self.meta.get('DEC_PNT')
+        return len(self), columns, pointing
+
+    def _get_coord_cache(self):
+        """Coordinate cache dict, reset if the coordinates changed."""
+        key = self._coord_cache_key()
+        cached_key, cache = getattr(self, '_coord_cache', (None, None))
+
+        if cache is None or not (cached_key[0] == key[0] and cached_key[2] == key[2] and
+                                 all(a is b for a, b in zip(cached_key[1], key[1]))):
+            cache = dict()
+            self._coord_cache = key, cache
+
+        return cache
+
+    def clear_coord_cache(self):
+        """Clear the cache of coordinate objects."""
+        self._coord_cache = None, None
+
     @property
     def radec(self):
-        """Event RA / DEC sky coordinates (`~astropy.coordinates.SkyCoord`)
+        """Event RA / DEC sky coordinates (`~astropy.coordinates.SkyCoord`)"""
+        cache = self._get_coord_cache()
+        if 'radec' not in cache:
+            lon, lat = self['RA'].data, self['DEC'].data
+            cache['radec'] = SkyCoord(lon, lat, unit='deg', frame='icrs', copy=False)
+        return cache['radec']
+
+    @property
+    def radec_xyz(self):
+        """Event RA / DEC positions as Cartesian unit vectors (`~numpy.ndarray`)
 
-        TODO: the `radec` and `galactic` properties should be cached as table columns
+        Array of shape ``(n_events, 3)``, see `~gammapy.utils.coordinates.sky_to_unit_vector`.
         """
-        lon, lat = self['RA'], self['DEC']
-        return SkyCoord(lon, lat, unit='deg', frame='icrs')
+        cache = self._get_coord_cache()
+        if 'xyz' not in cache:
+            cache['xyz'] = sky_to_unit_vector(self['RA'].data, self['DEC'].data)
+        return cache['xyz']
 
     @property
     def galactic(self):
@@ -98,8 +176,16 @@ class EventList(Table):
         ``event_list.radec.to('galactic')`` instead.
         """
         self.add_galactic_columns()
+        cache = self._get_coord_cache()
         lon, lat = self['GLON'], self['GLAT']
-        return SkyCoord(lon, lat, unit='deg', frame='galactic')
+
+        # The Galactic coordinates are only valid for the current GLON / GLAT columns
+        columns, galactic = cache.get('galactic', (None, None))
+        if columns is None or columns[0] is not lon or columns[1] is not lat:
+            galactic = SkyCoord(lon.data, lat.data, unit='deg', frame='galactic', copy=False)
+            cache['galactic'] = (lon, lat), galactic
+
+        return galactic
 
     @classmethod
     def read(cls, filename, **kwargs):
@@ -115,6 +201,85 @@ class EventList(Table):
             kwargs.update(hdu='EVENTS')
         return super(EventList, cls).read(str(filename), **kwargs)
 
+    @classmethod
+    def read_chunks(cls, filename, columns=None, chunk_size=100000, energy_band=None,
+                    offset_band=None, time_interval=None, region=None, hdu='EVENTS'):
+        """Read :ref:`gadf:iact-events` in chunks of rows, applying selections.
+
+        This makes it possible to reduce event lists that are too large to
+        be loaded at once. Only the requested columns are kept in memory,
+        for one chunk at a time (see `~gammapy.utils.fits.iter_fits_table_chunks`).
+
+        The selections are applied to each chunk with the ``select_*`` methods.
+        The columns they need (``ENERGY``, ``RA`` / ``DEC`` or ``TIME``)
+        are read even if not in ``columns``, but are not part of the output.
+
+        Parameters
+        ----------
+        filename : `~gammapy.extern.pathlib.Path`, str
+            Filename
+        columns : list of str, optional
+            Columns to read (default: all columns)
+        chunk_size : int
+            Number of events read per chunk
+        energy_band : `~astropy.units.Quantity`, optional
+            Energy band ``[energy_min, energy_max)``, see `select_energy`
+        offset_band : `~astropy.coordinates.Angle`, optional
+            Offset band ``[offset_min, offset_max)``, see `select_offset`
+        time_interval : `~astropy.time.Time`, optional
+            Time interval ``[time_min, time_max)``, see `select_time`
+        region : `~regions.CircleSkyRegion` or list of `~regions.CircleSkyRegion`, optional
+            (List of) sky region(s), see `select_circular_region`
+        hdu : str
+            Event list HDU name
+
+        Returns
+        -------
+        event_lists : generator of `EventList`
+            Selected events of each chunk
+
+        Examples
+        --------
+        >>> from astropy.table import vstack
+        >>> from astropy.units import Quantity
+        >>> from gammapy.data import EventList
+        >>> chunks = EventList.read_chunks('events.fits.gz', columns=['RA', 'DEC', 'ENERGY'],
+        ...                                energy_band=Quantity([1, 10], 'TeV'))
+        >>> event_list = vstack(list(chunks))
+        """
+        filename = make_path(filename)
+
+        read_columns = None
+        if columns is not None:
+            read_columns = list(columns)
+            required = []
+            if energy_band is not None:
+                required += ['ENERGY']
+            if offset_band is not None or region is not None:
+                required += ['RA', 'DEC']
+            if time_interval is not None:
+                required += ['TIME']
+            read_columns += [_ for _ in required if _ not in read_columns]
+
+        tables = iter_fits_table_chunks(filename, hdu=hdu, columns=read_columns,
+                                        chunk_size=chunk_size)
+        for table in tables:
+            event_list = cls(table, copy=False)
+
+            if energy_band is not None:
+                event_list = event_list.select_energy(energy_band)
+            if offset_band is not None:
+                event_list = event_list.select_offset(offset_band)
+            if time_interval is not None:
+                event_list = event_list.select_time(time_interval)
+            if region is not None:
+                event_list = event_list.select_circular_region(region)
+
+            if columns is not None and len(read_columns) > len(columns):
+                event_list = event_list[list(columns)]
+
+            yield event_list
+
     def add_galactic_columns(self):
         """Add Galactic coordinate columns to the table.
 
@@ -192,11 +357,15 @@ class EventList(Table):
     @property
     def offset(self):
         """Event offset (`~astropy.coordinates.Angle`)"""
-        position = self.radec
-        center = self.pointing_radec
-        offset = center.separation(position)
-        return Angle(offset, unit='deg')
-        # return Angle(self['THETA'], unit='deg')
+        cache = self._get_coord_cache()
+        if 'offset' not in cache:
+            center = self.pointing_radec
+            center = sky_to_unit_vector(center.ra, center.dec)
+            # Chord length formula, accurate also for small offsets
+            chord = np.sqrt(np.sum((self.radec_xyz - center) ** 2, axis=-1))
+            offset = np.degrees(2 * np.arcsin(np.clip(chord / 2, 0, 1)))
+            cache['offset'] = Angle(offset, unit='deg')
+        return cache['offset']
 
     @property
     def energy(self):
@@ -277,9 +446,8 @@ class EventList(Table):
         event_list : `EventList`
             Copy of event list with selection applied.
         """
-        position = self.radec
-        separation = center.separation(position)
-        mask = separation < radius
+        center = _center_xyz(center)
+        mask = sky_circle_membership(self.radec_xyz, center, radius)[0]
         return self[mask]
 
     def select_sky_ring(self, center, inner_radius, outer_radius):
@@ -299,11 +467,10 @@ class EventList(Table):
         event_list : `EventList`
             Copy of event list with selection applied.
         """
-
-        position = self.radec
-        separation = center.separation(position)
-        mask1 = inner_radius < separation
-        mask2 = separation < outer_radius
+        center = _center_xyz(center)
+        cos_separation = np.dot(self.radec_xyz, center[0])
+        mask1 = cos_separation < np.cos(Angle(inner_radius).radian)
+        mask2 = cos_separation > np.cos(Angle(outer_radius).radian)
         mask = mask1 * mask2
 
         return self[mask]
@@ -352,14 +519,34 @@ class EventList(Table):
         index_array : `np.array`
             Index array of selected events
         """
+        mask = self.circular_region_membership(region)
+        return np.where(mask.any(axis=0))[0]
+
+    def circular_region_membership(self, region):
+        """Test which events are in which circular regions.
+
+        All regions are tested at once using the event unit vectors
+        (see `radec_xyz` and `~gammapy.utils.coordinates.sky_circle_membership`).
+
+        Parameters
+        ----------
+        region : `~regions.CircleSkyRegion` or list of `~regions.CircleSkyRegion`
+            (List of) sky region(s)
+
+        Returns
+        -------
+        mask : `~numpy.ndarray`
+            Boolean array with shape ``(n_regions, n_events)``
+        """
+        if not isinstance(region, list):
+            region = list([region])
+
+        if not region:
+            return np.zeros((0, len(self)), dtype=bool)
 
-        position = self.radec
-        mask = np.array([], dtype=int)
-        for reg in region:
-            separation = reg.center.separation(position)
-            temp = np.where(separation < reg.radius)[0]
-            mask = np.union1d(mask, temp)
-        return mask
+        centers = np.vstack([_center_xyz(_.center) for _ in region])
+        radius = Angle([_.radius for _ in region])
+        return sky_circle_membership(self.radec_xyz, centers, radius)
 
     def peek(self):
         """Summary plots."""
@@ -498,6 +685,21 @@ class EventList(Table):
         return ax
 
 
+def _center_xyz(center):
+    """ICRS unit vectors for given sky positions, with shape ``(n, 3)``."""
+    center = center.icrs
+    return np.atleast_2d(sky_to_unit_vector(center.ra, center.dec))
+
+
+def _is_column_selection(item):
+    """Check if a table item selects columns (and not rows)."""
+    if isinstance(item, six.string_types):
+        return True
+    if isinstance(item, (tuple, list)) and len(item) > 0:
+        return all(isinstance(_, six.string_types) for _ in item)
+    return False
+
+
 class EventListDataset(object):
     """Event list dataset (event list plus some extra info).
 
@@ -545,7 +747,7 @@ class EventListDataset(object):
         return cls(event_list=event_list, gti=gti)
 
     @classmethod
-    def vstack_from_files(cls, filenames, logger=None):
+    def vstack_from_files(cls, filenames, logger=None, memmap_dir=None):
         """Stack event lists vertically (combine events and GTIs).
 
         This function stacks (a.k.a. concatenates) event lists.
@@ -555,38 +757,41 @@ class EventListDataset(object):
         It also stacks the GTIs so that exposure computations are still
         possible using the stacked event list.
 
+        The number of rows is read from the headers first, then the output
+        columns are allocated and the files are read one by one to fill
+        them. So only one input file is in memory at any time, in addition
+        to the output. With ``memmap_dir``, the output columns are stored
+        in memory mapped ``.npy`` files, so that event lists larger than
+        the available memory can be stacked.
 
-        At the moment this can require a lot of memory.
-        All event lists are loaded into memory at the same time.
-
-        TODO: implement and benchmark different a more efficient method:
-        Get number of rows from headers, pre-allocate a large table,
-        open files one by one and fill correct rows.
+        The output header keywords are taken from the first file, except
+        for these, which are computed from all files:
 
-        TODO: handle header keywords "correctly".
-        At the moment the output event list header keywords are copies of
-        the values from the first observation, i.e. meaningless.
-        Here's a (probably incomplete) list of values we should handle
-        (usually by computing the min, max or mean or removing it):
-        - OBS_ID
-        - DATE_OBS, DATE_END
-        - TIME_OBS, TIME_END
-        - TSTART, TSTOP
-        - LIVETIME, DEADC
-        - RA_PNT, DEC_PNT
-        - ALT_PNT, AZ_PNT
+        - TSTART, TSTOP (min, max)
+        - DATE_OBS, TIME_OBS, DATE_END, TIME_END (of the first / last file)
+        - ONTIME, LIVETIME (sum)
+        - DEADC (from ONTIME and LIVETIME)
 
+        Keywords describing a single observation (see ``STACK_REMOVE_KEYWORDS``,
+        e.g. ``OBS_ID`` and the pointing position) are removed.
 
         Parameters
         ----------
         filenames : list of str
             List of event list filenames
+        logger : `~logging.Logger`, optional
+            Logger for progress info
+        memmap_dir : str, optional
+            Directory to store the output columns as memory mapped
+            ``.npy`` files. The files are not deleted.
 
         Returns
         -------
         event_list_dataset : `~gammapy.data.EventListDataset`
 
         """
+        filenames = [str(make_path(_)) for _ in filenames]
+
         total_filesize = 0
         for filename in filenames:
             total_filesize += Path(filename).stat().st_size
@@ -594,25 +799,32 @@ class EventListDataset(object):
         if logger:
             logger.info('Number of files to stack: {}'.format(len(filenames)))
             logger.info('Total filesize: {:.2f} MB'.format(total_filesize / 1024. ** 2))
+            logger.info('Reading event list headers ...')
+
+        events_headers, gti_headers = [], []
+        for filename in filenames:
+            with fits.open(filename) as hdu_list:
+                events_headers.append(hdu_list['EVENTS'].header.copy())
+                gti_headers.append(hdu_list['GTI'].header.copy())
+
+        if logger:
+            n_events = sum(_['NAXIS2'] for _ in events_headers)
+            logger.info('Total number of events: {}'.format(n_events))
             logger.info('Reading event list files ...')
 
-        event_lists = []
-        gtis = []
+        stacker = _TableStacker([events_headers, gti_headers], memmap_dir)
         for filename in ProgressBar(filenames):
-            # logger.info('Reading {}'.format(filename))
-            event_list = Table.read(filename, hdu='EVENTS')
-
-            # TODO: Remove and modify header keywords for stacked event list
-            meta_del = ['OBS_ID', 'OBJECT']
-            meta_mod = ['DATE_OBS', 'DATE_END', 'TIME_OBS', 'TIME_END']
+            hdu_list = fits.open(filename, memmap=False)
+            try:
+                stacker.fill([hdu_list['EVENTS'], hdu_list['GTI']])
+            finally:
+                hdu_list.close()
 
-            gti = Table.read(filename, hdu='GTI')
-            event_lists.append(event_list)
-            gtis.append(gti)
+        events_columns, gti_columns = stacker.columns
 
-        from astropy.table import vstack as vstack_tables
-        total_event_list = vstack_tables(event_lists, metadata_conflicts='silent')
-        total_gti = vstack_tables(gtis, metadata_conflicts='silent')
+        total_event_list = EventList(list(events_columns.values()),
+                                     meta=_stack_meta(events_headers), copy=False)
+        total_gti = GTI(list(gti_columns.values()), meta=_stack_meta(gti_headers), copy=False)
 
         total_event_list.meta['EVTSTACK'] = 'yes'
         total_gti.meta['EVTSTACK'] = 'yes'
@@ -690,6 +902,117 @@ class EventListDataset(object):
         return checker.run(checks)
 
 
+STACK_REMOVE_KEYWORDS = [
+    'OBS_ID', 'OBJECT', 'RA_OBJ', 'DEC_OBJ',
+    'RA_PNT', 'DEC_PNT', 'ALT_PNT', 'AZ_PNT', 'ZEN_PNT',
+    'GLON_PNT', 'GLAT_PNT', 'MUONEFF',
+]
+"""Header keywords removed from stacked event lists."""
+
+
+def _stack_meta(headers):
+    """Table meta data for stacked tables with the given FITS headers."""
+    meta = OrderedDict()
+    for key, value in headers[0].items():
+        if key and not _STRUCTURAL_KEYWORDS.match(key) and key not in STACK_REMOVE_KEYWORDS:
+            meta[key] = value
+
+    if all('TSTART' in _ for _ in headers):
+        first = int(np.argmin([_['TSTART'] for _ in headers]))
+        meta['TSTART'] = headers[first]['TSTART']
+        for key in ['DATE_OBS', 'TIME_OBS']:
+            if key in headers[first]:
+                meta[key] = headers[first][key]
+
+    if all('TSTOP' in _ for _ in headers):
+        last = int(np.argmax([_['TSTOP'] for _ in headers]))
+        meta['TSTOP'] = headers[last]['TSTOP']
+        for key in ['DATE_END', 'TIME_END']:
+            if key in headers[last]:
+                meta[key] = headers[last][key]
+
+    for key in ['ONTIME', 'LIVETIME']:
+        if all(key in _ for _ in headers):
+            meta[key] = sum(_[key] for _ in headers)
+        else:
+            meta.pop(key, None)
+
+    if 'ONTIME' in meta and 'LIVETIME' in meta and meta['ONTIME'] > 0:
+        meta['DEADC'] = meta['LIVETIME'] / meta['ONTIME']
+    else:
+        meta.pop('DEADC', None)
+
+    return meta
+
+
+class _TableStacker(object):
+    """Fill preallocated columns from FITS table HDUs.
+
+    Parameters
+    ----------
+    headers : list
+        Headers (`~astropy.io.fits.Header`) of the table HDUs of all
+        files, one list per HDU. The columns are allocated when the
+        first file is filled, with data types that can hold the column
+        data of all files.
+    memmap_dir : str, optional
+        Directory to store the columns as memory mapped ``.npy`` files.
+    """
+
+    def __init__(self, headers, memmap_dir=None):
+        self.headers = headers
+        self.nrows = [[_['NAXIS2'] for _ in hdu_headers] for hdu_headers in headers]
+        self.extnames = [hdu_headers[0].get('EXTNAME', 'HDU{}'.format(idx))
+                         for idx, hdu_headers in enumerate(headers)]
+        self.memmap_dir = memmap_dir
+        self.columns = [None] * len(headers)
+        self._file_idx = 0
+        self._offsets = [0] * len(headers)
+
+    def fill(self, hdus):
+        """Fill columns with the data of the next file."""
+        for idx, hdu in enumerate(hdus):
+            if self.columns[idx] is None:
+                self.columns[idx] = self._allocate(hdu, idx)
+
+            columns = self.columns[idx]
+            start = self._offsets[idx]
+            stop = start + self.nrows[idx][self._file_idx]
+
+            if set(columns) != set(hdu.columns.names):
+                raise ValueError('Columns of HDU {} do not match: {} != {}'.format(
+                    hdu.name, list(columns), hdu.columns.names))
+
+            for name, column in columns.items():
+                column[start:stop] = hdu.data[name]
+
+            self._offsets[idx] = stop
+
+        self._file_idx += 1
+
+    def _allocate(self, hdu, idx):
+        """Allocate output columns with the data type and units of a given HDU."""
+        nrows = sum(self.nrows[idx])
+        columns = OrderedDict()
+
+        for name in hdu.columns.names:
+            data = hdu.data[name]
+            dtype = _promote_column_dtype(data.dtype.newbyteorder('='), name, self.headers[idx])
+            shape = (nrows,) + data.shape[1:]
+
+            if self.memmap_dir:
+                filename = '{}_{}.npy'.format(self.extnames[idx], name)
+                filename = str(make_path(self.memmap_dir) / filename)
+                array = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+            else:
+                array = np.empty(shape, dtype=dtype)
+
+            unit = hdu.columns[name].unit
+            columns[name] = Column(array, name=name, unit=unit or None, copy=False)
+
+        return columns
+
+
 class EventListDatasetChecker(object):
     """Event list dataset checker.
 
@@ -918,3 +1241,50 @@ class EventListDatasetChecker(object):
             return False
         else:
             return True
+
+
+_FITS_DTYPES = {
+    'L': 'bool', 'B': 'u1', 'I': 'i2', 'J': 'i4', 'K': 'i8',
+    'E': 'f4', 'D': 'f8', 'C': 'c8', 'M': 'c16',
+}
+
+
+def _promote_column_dtype(dtype, name, headers):
+    """Data type for a column holding the data of all given table HDU headers.
+
+    ``dtype`` is the data type of the column as read from the first file.
+    Wider strings or numeric types in other files are promoted with
+    `numpy.result_type`, mixing strings and numbers raises an error.
+    """
+    dtypes = [dtype]
+    for header in headers:
+        names = [header.get('TTYPE{}'.format(_)) for _ in range(1, header['TFIELDS'] + 1)]
+        if name not in names:
+            # Checked when filling the columns
+            continue
+        idx = names.index(name) + 1
+
+        repeat, code = re.match(r'^\s*(\d*)([A-Z])', header['TFORM{}'.format(idx)]).groups()
+        tscal = header.get('TSCAL{}'.format(idx), 1)
+        tzero = header.get('TZERO{}'.format(idx), 0)
+
+        if code == 'A':
+            other = np.dtype((dtype.kind if dtype.kind in 'SU' else 'S', int(repeat or 1)))
+        elif code not in _FITS_DTYPES:
+            raise ValueError('Column format not supported for stacking: {} {}'.format(
+                name, header['TFORM{}'.format(idx)]))
+        else:
+            other = np.dtype(_FITS_DTYPES[code])
+            bits = 8 * other.itemsize
+            if tscal == 1 and tzero != 0 and other.kind in 'iu' and abs(tzero) == 2 ** (bits - 1):
+                # Unsigned (or signed byte) integers stored with an offset
+                other = np.dtype('{}{}'.format('u' if other.kind == 'i' else 'i', other.itemsize))
+            elif tscal != 1 or tzero != 0:
+                other = np.dtype('f8')
+
+        if (other.kind in 'SU') != (dtype.kind in 'SU'):
+            raise ValueError('Column {} has string and numeric data types: {} and {}'.format(
+                name, dtype, other))
+        dtypes.append(other)
+
+    return np.result_type(*dtypes)
@@ -6,6 +6,7 @@ from astropy.io import fits
 from astropy.table import Table
 from astropy.utils import lazyproperty
 from ..utils.scripts import make_path
+from ..utils.fits import fits_table_to_table
 
 __all__ = [
     'HDULocation',
@@ -65,42 +66,58 @@ class HDULocation(object):
         hdu_list = fits.open(str(self.path(abs_path=True)))
         return hdu_list[self.hdu_name]
 
-    def load(self):
+    def load(self, hdu_list=None):
         """Load HDU as appropriate class.
 
         TODO: this should probably go via an extensible registry.
+
+        Parameters
+        ----------
+        hdu_list : `~astropy.io.fits.HDUList`, optional
+            Already opened file to read the HDU from. By default the
+            file is opened. Passing the HDU list avoids opening the same
+            file again when loading several HDUs from one file.
         """
+        if hdu_list is not None:
+            return self._load_hdu(hdu_list[self.hdu_name])
+
+        hdu_list = fits.open(str(self.path()), memmap=False)
+        try:
+            return self._load_hdu(hdu_list[self.hdu_name])
+        finally:
+            hdu_list.close()
+
+    def _load_hdu(self, hdu):
+        """Load a given HDU as appropriate class."""
         hdu_class = self.hdu_class
-        filename = self.path()
-        hdu_name = self.hdu_name
 
         if hdu_class == 'events':
             from ..data import EventList
-            return EventList.read(filename, hdu=hdu_name)
+            return EventList(Table.read(hdu))
         elif hdu_class == 'gti':
             from ..data import GTI
-            return GTI.read(filename, hdu=hdu_name)
+            return GTI(Table.read(hdu))
         elif hdu_class == 'aeff_2d':
             from ..irf import EffectiveAreaTable2D
-            return EffectiveAreaTable2D.read(filename, hdu=hdu_name)
+            return EffectiveAreaTable2D.from_table(fits_table_to_table(hdu))
         elif hdu_class == 'edisp_2d':
             from ..irf import EnergyDispersion2D
-            return EnergyDispersion2D.read(filename, hdu=hdu_name)
+            return EnergyDispersion2D.from_fits(hdu)
         elif hdu_class == 'psf_table':
             from ..irf import PSF3D
-            return PSF3D.read(filename, hdu=hdu_name)
+            return PSF3D.from_table(Table.read(hdu))
         elif hdu_class == 'psf_3gauss':
             from ..irf import EnergyDependentMultiGaussPSF
-            return EnergyDependentMultiGaussPSF.read(filename, hdu=hdu_name)
+            return EnergyDependentMultiGaussPSF.from_fits(hdu)
         elif hdu_class == 'psf_king':
             from ..irf import PSFKing
-            return PSFKing.read(filename, hdu=hdu_name)
+            return PSFKing.from_table(Table.read(hdu))
         elif hdu_class == 'bkg_2d':
             from ..background import EnergyOffsetArray
-            return EnergyOffsetArray.read(filename, hdu=hdu_name, data_name='bkg')
+            return EnergyOffsetArray.from_table(Table.read(hdu), data_name='bkg')
         elif hdu_class == 'bkg_3d':
             from ..background import FOVCube
-            return FOVCube.read(filename, hdu=hdu_name)
+            return FOVCube.from_fits_table(hdu)
         else:
             raise ValueError('Invalid hdu_class: {}'.format(hdu_class))
 
@@ -202,7 +219,7 @@ class HDUIndexTable(Table):
             msg += 'Valid values are: {}'.format(valid)
             raise ValueError(msg)
 
-        if obs_id not in self['OBS_ID']:
+        if obs_id not in self._obs_id_index:
             raise IndexError('No entry available with OBS_ID = {}'.format(obs_id))
 
     def row_idx(self, obs_id, hdu_type=None, hdu_class=None):
@@ -222,20 +239,17 @@ class HDUIndexTable(Table):
         idx : list of int
             List of row indices matching the selection.
         """
-        # Working with the HDU_CLASS or HDU_TYPE column directly is difficult,
-        # because those are padded strings (sometimes left-padded, sometimes right-padded).
-        # Using a Python loop and cached lists of stripped string columns is easiest here.
+        # Lookup in dicts built once from the stripped HDU_CLASS and HDU_TYPE
+        # columns, which are padded strings (sometimes left-padded, sometimes right-padded).
         idx_list = []
 
-        for idx in range(len(self)):
-            if self['OBS_ID'][idx] == obs_id:
-                if hdu_class and self._hdu_class_stripped[idx] == hdu_class:
-                    idx_list.append(idx)
+        if hdu_class:
+            idx_list += self._hdu_class_index.get((obs_id, hdu_class), [])
 
-                if hdu_type and self._hdu_type_stripped[idx] == hdu_type:
-                    idx_list.append(idx)
+        if hdu_type:
+            idx_list += self._hdu_type_index.get((obs_id, hdu_type), [])
 
-        return idx_list
+        return sorted(idx_list)
 
     def location_info(self, idx):
         """Create `HDULocation` for a given row index."""
@@ -253,11 +267,26 @@ class HDUIndexTable(Table):
 
     @lazyproperty
     def _hdu_class_stripped(self):
-        return [_.strip() for _ in self['HDU_CLASS']]
+        return np.char.strip(np.asarray(self['HDU_CLASS'])).tolist()
 
     @lazyproperty
     def _hdu_type_stripped(self):
-        return [_.strip() for _ in self['HDU_TYPE']]
+        return np.char.strip(np.asarray(self['HDU_TYPE'])).tolist()
+
+    @lazyproperty
+    def _obs_id_index(self):
+        """Dict containing row indices for all obs ids"""
+        return _make_index(self['OBS_ID'])
+
+    @lazyproperty
+    def _hdu_class_index(self):
+        """Dict containing row indices for all (obs_id, hdu_class) pairs"""
+        return _make_index(zip(self['OBS_ID'], self._hdu_class_stripped))
+
+    @lazyproperty
+    def _hdu_type_index(self):
+        """Dict containing row indices for all (obs_id, hdu_type) pairs"""
+        return _make_index(zip(self['OBS_ID'], self._hdu_type_stripped))
 
     @lazyproperty
     def obs_id_unique(self):
@@ -285,3 +314,11 @@ class HDUIndexTable(Table):
         print('OBS_ID: {} -- {}'.format(self.obs_id_unique[0], self.obs_id_unique[-1]), file=file)
         print('HDU_TYPE: {}'.format(self.hdu_type_unique), file=file)
         print('HDU_CLASS: {}'.format(self.hdu_class_unique), file=file)
+
+
+def _make_index(keys):
+    """Make dict with list of positions for each key."""
+    index = dict()
+    for idx, key in enumerate(keys):
+        index.setdefault(key, []).append(idx)
+    return index
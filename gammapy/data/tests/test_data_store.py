@@ -1,12 +1,13 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
+import pickle
 import numpy as np
 from numpy.testing import assert_allclose
 from astropy.tests.helper import pytest, assert_quantity_allclose
 from astropy.coordinates import Angle, SkyCoord
 from astropy.units import Quantity
 import astropy.units as u
-from ...data import DataStore, DataManager
+from ...data import DataStore, DataStoreCache, DataManager
 from ...utils.testing import data_manager, requires_data, requires_dependency
 from ...datasets import gammapy_extra
 from ...utils.energy import EnergyBounds
@@ -73,6 +74,54 @@ def test_datastore_load_all(data_manager):
     assert_allclose(event_lists[0]['ENERGY'][0], 1.1156039)
     assert_allclose(event_lists[-1]['ENERGY'][0], 1.0204216)
 
+    data_store.cache = None
+    event_lists = data_store.load_all(hdu_class='events', n_jobs=2)
+    assert_allclose(event_lists[0]['ENERGY'][0], 1.1156039)
+    assert_allclose(event_lists[-1]['ENERGY'][0], 1.0204216)
+
+    obs_ids = data_store.obs_table['OBS_ID'][:2]
+    loaded = data_store.iter_load(obs_ids, hdu_type='aeff', n_jobs=2, max_in_flight=1)
+    assert set(obs_id for obs_id, _ in loaded) == set(obs_ids)
+
+    # Several HDU types, from one file per run
+    data_store.cache = None
+    loaded = dict(data_store.iter_load(obs_ids, hdu_type=['events', 'gti', 'aeff'], n_jobs=2))
+    assert set(loaded) == set(obs_ids)
+    events, gti, aeff = loaded[obs_ids[0]]
+    assert_allclose(events['ENERGY'][0], 1.1156039)
+    assert len(gti) == len(data_store.obs(obs_ids[0]).gti)
+    assert aeff.__class__.__name__ == 'EffectiveAreaTable2D'
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_datastore_cache():
+    """Test that objects are loaded only once via the DataStore cache"""
+    data_store = DataStore.from_dir('$GAMMAPY_EXTRA/datasets/hess-crab4-hd-hap-prod2')
+
+    aeff = data_store.obs(obs_id=23523).aeff
+    assert data_store.obs(obs_id=23523).aeff is aeff
+    assert data_store.cache.hits == 1
+    assert data_store.cache.misses == 1
+    assert data_store.cache.nbytes > 0
+
+    data_store.cache = DataStoreCache(max_items=1)
+    events = data_store.obs(obs_id=23523).events
+    data_store.obs(obs_id=23523).aeff
+    assert data_store.obs(obs_id=23523).events is not events
+    assert len(data_store.cache) == 1
+
+    data_store.cache = None
+    assert data_store.obs(obs_id=23523).aeff is not aeff
+
+    # Pickled data stores get a new cache, e.g. in worker processes
+    data_store.cache = DataStoreCache(max_items=3)
+    data_store.obs(obs_id=23523).aeff
+    data_store = pickle.loads(pickle.dumps(data_store))
+    assert len(data_store.cache) == 0
+    assert data_store.cache.max_items == 3
+    assert len(data_store.obs(obs_id=23523).events) > 0
+
 
 @requires_data('gammapy-extra')
 @requires_dependency('yaml')
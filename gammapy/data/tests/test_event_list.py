@@ -1,7 +1,12 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
+import gzip
+import numpy as np
 from numpy.testing import assert_allclose
+from astropy.io import fits
 from astropy.coordinates import Angle, SkyCoord
+from astropy.table import vstack
+from astropy.units import Quantity
 from regions import CircleSkyRegion
 from ...utils.testing import requires_dependency, requires_data
 from ...data import EventList, EventListDataset, EventListDatasetChecker
@@ -28,6 +33,62 @@ def test_EventList():
     assert '{:1.5f}'.format(height) == '1835.00000 m'
 
 
+def test_EventList_coord_cache():
+    event_list = EventList()
+    event_list['RA'] = [83.6, 84.6, 83.6, 80.]
+    event_list['DEC'] = [22., 22., 23., 22.]
+    event_list.meta.update(RA_PNT=83.6, DEC_PNT=22.)
+
+    offset = event_list.offset
+    assert event_list.offset is offset
+    desired = event_list.pointing_radec.separation(event_list.radec)
+    assert_allclose(offset.deg, desired.deg, atol=1e-12)
+
+    # Row selections keep the cached values
+    selected = event_list.select_offset(Angle([0.5, 2], 'deg'))
+    assert len(selected) == 2
+    assert 'offset' in selected._get_coord_cache()
+    assert_allclose(selected.offset.deg, desired.deg[[1, 2]], atol=1e-12)
+
+    # Changes of the coordinates or pointing clear the cache
+    event_list['RA'] = [83.6, 83.6, 83.6, 83.6]
+    assert_allclose(event_list.offset.deg, [0, 0, 1, 0], atol=1e-12)
+    event_list.meta['DEC_PNT'] = 23.
+    assert_allclose(event_list.offset.deg, [1, 1, 0, 1], atol=1e-12)
+
+    # In-place changes of the coordinate values need an explicit cache reset
+    event_list['DEC'][3] = 23.
+    event_list.clear_coord_cache()
+    assert_allclose(event_list.offset.deg, [1, 1, 0, 0], atol=1e-12)
+    event_list['DEC'][:] = 23.
+    event_list.clear_coord_cache()
+    assert_allclose(event_list.offset.deg, [0, 0, 0, 0], atol=1e-12)
+    assert_allclose(event_list.radec.dec.deg, [23, 23, 23, 23])
+    event_list['RA'][0] = 84.6
+    event_list.reverse()
+    assert_allclose(event_list.radec.ra.deg, [83.6, 83.6, 83.6, 84.6])
+
+
+def test_EventList_circular_region_membership():
+    event_list = EventList()
+    event_list['RA'] = [83.6, 84.6, 83.6, 80.]
+    event_list['DEC'] = [22., 22., 23., 22.]
+
+    regions = [
+        CircleSkyRegion(SkyCoord(83.6, 22., unit='deg'), Angle(0.5, 'deg')),
+        CircleSkyRegion(SkyCoord(83.6, 22., unit='deg').galactic, Angle(1.1, 'deg')),
+    ]
+    mask = event_list.circular_region_membership(regions)
+    assert mask.tolist() == [[True, False, False, False], [True, True, True, False]]
+    assert event_list.filter_circular_region(regions).tolist() == [0, 1, 2]
+    assert len(event_list.select_circular_region(regions[0])) == 1
+
+    # No regions, e.g. if no reflected regions are found
+    assert event_list.circular_region_membership([]).shape == (0, 4)
+    assert len(event_list.filter_circular_region([])) == 0
+    assert len(event_list.select_circular_region([])) == 0
+
+
 @requires_data('gammapy-extra')
 def test_EventList_region():
     filename = gammapy_extra.filename('test_datasets/unbundled/hess/run_0023037_hard_eventlist.fits.gz')
@@ -55,6 +116,77 @@ def test_EventListDataset():
     # even without running the following test.
 
 
+@requires_data('gammapy-extra')
+def test_EventListDataset_vstack_from_files(tmpdir):
+    filename = gammapy_extra.filename('test_datasets/unbundled/hess/run_0023037_hard_eventlist.fits.gz')
+    dset = EventListDataset.read(filename)
+
+    stacked = EventListDataset.vstack_from_files([filename, filename])
+    assert len(stacked.event_list) == 2 * 49
+    assert len(stacked.gti) == 2 * len(dset.gti)
+    assert_allclose(stacked.event_list['ENERGY'][49], dset.event_list['ENERGY'][0])
+    assert stacked.event_list['ENERGY'].unit == dset.event_list['ENERGY'].unit
+    assert 'OBS_ID' not in stacked.event_list.meta
+    assert_allclose(stacked.event_list.meta['LIVETIME'], 2 * dset.event_list.meta['LIVETIME'])
+
+    stacked = EventListDataset.vstack_from_files([filename, filename], memmap_dir=str(tmpdir))
+    assert_allclose(stacked.event_list['ENERGY'][49], dset.event_list['ENERGY'][0])
+    assert tmpdir.join('EVENTS_ENERGY.npy').check()
+
+
+def test_EventListDataset_vstack_from_files_dtypes(tmpdir):
+    filenames = []
+    for idx, (energy_format, name_format) in enumerate([('E', '3A'), ('D', '8A')]):
+        events = fits.BinTableHDU.from_columns([
+            fits.Column(name='ENERGY', format=energy_format, unit='TeV', array=[1.1, 10.1]),
+            fits.Column(name='NAME', format=name_format, array=['abc', 'abcdefgh']),
+        ], name='EVENTS')
+        gti = fits.BinTableHDU.from_columns([
+            fits.Column(name='START', format='D', array=[0.]),
+            fits.Column(name='STOP', format='D', array=[1.]),
+        ], name='GTI')
+        filename = str(tmpdir / 'events_{}.fits.gz'.format(idx))
+        fits.HDUList([fits.PrimaryHDU(), events, gti]).writeto(filename)
+        filenames.append(filename)
+
+    # Column data types of later files are not truncated or downcast
+    stacked = EventListDataset.vstack_from_files(filenames)
+    energy = stacked.event_list['ENERGY']
+    assert energy.dtype == np.float64
+    assert energy[3] == 10.1
+    assert stacked.event_list['NAME'].tolist() == [b'abc', b'abc', b'abc', b'abcdefgh']
+
+
+@requires_data('gammapy-extra')
+def test_EventList_read_chunks(tmpdir):
+    filename = gammapy_extra.filename('test_datasets/unbundled/hess/run_0023037_hard_eventlist.fits.gz')
+    event_list = EventList.read(filename)
+    energy_band = Quantity([1, 10], 'TeV')
+    expected = event_list.select_energy(energy_band)
+
+    # Uncompressed files are memory mapped, compressed files streamed
+    filename_uncompressed = str(tmpdir / 'events.fits')
+    with gzip.open(filename, 'rb') as fh_in, open(filename_uncompressed, 'wb') as fh_out:
+        fh_out.write(fh_in.read())
+
+    for name in [filename, filename_uncompressed]:
+        chunks = list(EventList.read_chunks(name, columns=['RA', 'DEC'], chunk_size=10,
+                                            energy_band=energy_band))
+        assert len(chunks) == 5
+        assert chunks[0].colnames == ['RA', 'DEC']
+        assert chunks[0].meta['OBS_ID'] == event_list.meta['OBS_ID']
+
+        actual = vstack(chunks)
+        assert len(actual) == len(expected)
+        assert_allclose(actual['RA'], expected['RA'])
+        assert actual['DEC'].unit == expected['DEC'].unit
+
+    chunks = list(EventList.read_chunks(filename, chunk_size=100))
+    assert len(chunks) == 1
+    assert chunks[0].colnames == event_list.colnames
+    assert_allclose(chunks[0]['ENERGY'], event_list['ENERGY'])
+
+
 @requires_data('gammapy-extra')
 def test_EventListDatasetChecker():
     filename = gammapy_extra.filename('test_datasets/unbundled/hess/run_0023037_hard_eventlist.fits.gz')
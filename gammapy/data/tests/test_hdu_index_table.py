@@ -71,3 +71,21 @@ def test_hdu_index_table_pa():
 
     location = hdu_index.hdu_location(obs_id=23523, hdu_class='psf_king')
     assert str(location.path(abs_path=False)) == 'run23400-23599/run23523/psf_king_23523.fits.gz'
+
+
+def test_hdu_index_table_row_idx():
+    """Test row lookup with padded HDU_TYPE and HDU_CLASS strings."""
+    table = HDUIndexTable()
+    table['OBS_ID'] = [42, 42, 43, 43]
+    table['HDU_TYPE'] = ['events  ', '  psf', 'events', 'psf   ']
+    table['HDU_CLASS'] = ['events', 'psf_king  ', 'events', ' psf_table']
+
+    assert table.row_idx(obs_id=42, hdu_type='psf') == [1]
+    assert table.row_idx(obs_id=43, hdu_class='psf_table') == [3]
+    assert table.row_idx(obs_id=43, hdu_class='psf_king') == []
+    assert table.row_idx(obs_id=44, hdu_type='events') == []
+    # Rows matching both type and class are listed twice, as before
+    assert table.row_idx(obs_id=43, hdu_type='events', hdu_class='events') == [2, 2]
+
+    with pytest.raises(IndexError):
+        table.hdu_location(obs_id=44, hdu_type='events')
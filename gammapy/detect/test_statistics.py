@@ -3,12 +3,13 @@
 Functions to compute TS images.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
+import os
+import shutil
 import logging
+import tempfile
 from time import time
 import warnings
 from collections import OrderedDict
-from itertools import product
-from functools import partial
 from multiprocessing import Pool, cpu_count
 import numpy as np
 from astropy.convolution import Model2DKernel, Gaussian2DKernel
@@ -23,6 +24,7 @@ from ._test_statistics_cython import (_cash_cython, _amplitude_bounds_cython,
                                       _x_best_leastsq)
 
 __all__ = [
+    'TSImageEngine',
     'compute_ts_image',
     'compute_ts_image_multiscale',
     'compute_maximum_ts_image',
@@ -33,6 +35,8 @@ log = logging.getLogger(__name__)
 FLUX_FACTOR = 1E-12
 MAX_NITER = 20
 CONTAINMENT = 0.8
+# Maximum number of cutout pixels processed at once by the batch methods
+BATCH_SIZE = 2 ** 22
 
 
 def _extract_array(array, shape, position):
@@ -108,6 +112,9 @@ def compute_ts_image_multiscale(images, psf_parameters, scales=[0], downsample='
     morphology : str ('Gaussian2D')
         Source morphology assumption. Either 'Gaussian2D' or 'Shell2D'.
 
+    Other arguments are passed to `compute_ts_image`. If no ``engine`` is
+    given, one `TSImageEngine` is used for all scales.
+
     Returns
     -------
     multiscale_result : list
@@ -116,78 +123,89 @@ def compute_ts_image_multiscale(images, psf_parameters, scales=[0], downsample='
     BINSZ = abs(images['counts'].wcs.wcs.cdelt[0])
     shape = images['counts'].data.shape
 
-    multiscale_result = []
-
-    for scale in scales:
-        log.info('Computing {0}TS image for scale {1:.3f} deg and {2}'
-                 ' morphology.'.format('residual ' if residual else '',
-                                       scale,
-                                       morphology))  # Sample down and require that scale parameters is at least 5 pix
-        if downsample == 'auto':
-            factor = int(np.select([scale < 5 * BINSZ, scale < 10 * BINSZ,
-                                    scale < 20 * BINSZ, scale < 40 * BINSZ],
-                                   [1, 2, 4, 4], 8))
-        else:
-            factor = int(downsample)
-
-        if factor == 1:
-            log.info('No down sampling used.')
-            downsampled = False
-        else:
-            if morphology == 'Shell2D':
-                factor /= 2
-            log.info('Using down sampling factor of {0}'.format(factor))
-            downsampled = True
+    # Re-use one worker pool for all scales
+    engine = kwargs.pop('engine', None)
+    close_engine = engine is None
+    if engine is None:
+        engine = TSImageEngine(parallel=kwargs.pop('parallel', True))
 
-        funcs = [np.nansum, np.mean, np.nansum, np.nansum, np.nansum]
+    multiscale_result = []
 
-        images2 = SkyImageList()
-        for name, func in zip(images.names, funcs):
-            if downsampled:
-                pad_width = symmetric_crop_pad_width(shape, shape_2N(shape))
-                images2[name] = images[name].pad(pad_width)
-                images2[name] = images2[name].downsample(factor, func)
-            else:
-                images2[name] = images[name]
-
-        # Set up PSF and source kernel
-        kernel = multi_gauss_psf_kernel(psf_parameters, BINSZ=BINSZ,
-                                        NEW_BINSZ=BINSZ * factor,
-                                        mode='oversample')
-
-        if scale > 0:
-            from astropy.convolution import convolve
-            sigma = scale / (BINSZ * factor)
-            if morphology == 'Gaussian2D':
-                source_kernel = Gaussian2DKernel(sigma, mode='oversample')
-            elif morphology == 'Shell2D':
-                model = Shell2D(1, 0, 0, sigma, sigma * width)
-                x_size = _round_up_to_odd_integer(2 * sigma * (1 + width)
-                                                  + kernel.shape[0] / 2)
-                source_kernel = Model2DKernel(model, x_size=x_size, mode='oversample')
+    try:
+        for scale in scales:
+            log.info('Computing {0}TS image for scale {1:.3f} deg and {2}'
+                     ' morphology.'.format('residual ' if residual else '',
+                                           scale,
+                                           morphology))  # Sample down and require that scale parameters is at least 5 pix
+            if downsample == 'auto':
+                factor = int(np.select([scale < 5 * BINSZ, scale < 10 * BINSZ,
+                                        scale < 20 * BINSZ, scale < 40 * BINSZ],
+                                       [1, 2, 4, 4], 8))
             else:
-                raise ValueError('Unknown morphology: {}'.format(morphology))
-            kernel = convolve(source_kernel, kernel)
-            kernel.normalize()
+                factor = int(downsample)
 
-        if residual:
-            images2['background'].data += images2['model'].data
-
-        # Compute TS image
-        ts_results = compute_ts_image(
-            images2['counts'], images2['background'], images2['exposure'],
-            kernel, *args, **kwargs
-        )
-        log.info('TS image computation took {0:.1f} s \n'.format(ts_results.meta['runtime']))
-        ts_results.meta['MORPH'] = (morphology, 'Source morphology assumption')
-        ts_results.meta['SCALE'] = (scale, 'Source morphology size scale in deg')
+            if factor == 1:
+                log.info('No down sampling used.')
+                downsampled = False
+            else:
+                if morphology == 'Shell2D':
+                    factor /= 2
+                log.info('Using down sampling factor of {0}'.format(factor))
+                downsampled = True
+
+            funcs = [np.nansum, np.mean, np.nansum, np.nansum, np.nansum]
+
+            images2 = SkyImageList()
+            for name, func in zip(images.names, funcs):
+                if downsampled:
+                    pad_width = symmetric_crop_pad_width(shape, shape_2N(shape))
+                    images2[name] = images[name].pad(pad_width)
+                    images2[name] = images2[name].downsample(factor, func)
+                else:
+                    images2[name] = images[name]
+
+            # Set up PSF and source kernel
+            kernel = multi_gauss_psf_kernel(psf_parameters, BINSZ=BINSZ,
+                                            NEW_BINSZ=BINSZ * factor,
+                                            mode='oversample')
+
+            if scale > 0:
+                from astropy.convolution import convolve
+                sigma = scale / (BINSZ * factor)
+                if morphology == 'Gaussian2D':
+                    source_kernel = Gaussian2DKernel(sigma, mode='oversample')
+                elif morphology == 'Shell2D':
+                    model = Shell2D(1, 0, 0, sigma, sigma * width)
+                    x_size = _round_up_to_odd_integer(2 * sigma * (1 + width)
+                                                      + kernel.shape[0] / 2)
+                    source_kernel = Model2DKernel(model, x_size=x_size, mode='oversample')
+                else:
+                    raise ValueError('Unknown morphology: {}'.format(morphology))
+                kernel = convolve(source_kernel, kernel)
+                kernel.normalize()
+
+            if residual:
+                images2['background'].data += images2['model'].data
+
+            # Compute TS image
+            ts_results = compute_ts_image(
+                images2['counts'], images2['background'], images2['exposure'],
+                kernel, *args, engine=engine, **kwargs
+            )
+            log.info('TS image computation took {0:.1f} s \n'.format(ts_results.meta['runtime']))
+            ts_results.meta['MORPH'] = (morphology, 'Source morphology assumption')
+            ts_results.meta['SCALE'] = (scale, 'Source morphology size scale in deg')
 
-        if downsampled:
-            for name, order in zip(['ts', 'sqrt_ts', 'amplitude', 'niter'], [1, 1, 1, 0]):
-                ts_results[name] = ts_results[name].upsample(factor, order=order)
-                ts_results[name] = ts_results[name].crop(crop_width=pad_width)
+            if downsampled:
+                for name in ts_results.names:
+                    order = 0 if name == 'niter' else 1
+                    ts_results[name] = ts_results[name].upsample(factor, order=order)
+                    ts_results[name] = ts_results[name].crop(crop_width=pad_width)
 
-        multiscale_result.append(ts_results)
+            multiscale_result.append(ts_results)
+    finally:
+        if close_engine:
+            engine.close()
 
     return multiscale_result
 
@@ -235,7 +253,8 @@ def compute_maximum_ts_image(ts_image_results):
 
 
 def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
-                     method='root brentq', parallel=True, threshold=None):
+                     method='root brentq', parallel=True, threshold=None, engine=None,
+                     error=False, ul=False, ul_delta_ts=4, dirty=None, previous=None):
     """
     Compute TS image using different optimization methods.
 
@@ -249,6 +268,9 @@ def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
         Exposure image
     kernel : `astropy.convolution.Kernel2D`
         Source model kernel.
+    mask : `~numpy.ndarray` (None)
+        Mask of pixel positions to process. By default all positions
+        with non-zero exposure are processed.
     flux : float (None)
         Flux image used as a starting value for the amplitude fit.
     method : str ('root')
@@ -261,16 +283,47 @@ def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
             TODO: document
         * ``'leastsq iter'``
             TODO: document
+        * ``'batch newton'``
+            Same as ``'root brentq'``, but the roots are found for all pixels
+            of an image tile simultaneously, using safeguarded Newton steps
+            on stacked cutouts of the data. This avoids one Python level
+            root finding call per pixel.
     parallel : bool (True)
         Whether to use multiple cores for parallel processing.
     threshold : float (None)
         If the TS value corresponding to the initial flux estimate is not above
         this threshold, the optimizing step is omitted to save computing time.
+        Amplitude errors and upper limits of these pixels are computed around the
+        initial flux estimate.
+    engine : `~gammapy.detect.TSImageEngine` (None)
+        Engine used to process the image tiles. Pass an engine to re-use its
+        worker pool for several TS image computations. By default a new engine
+        is started and closed again on return, in which case ``parallel``
+        is passed on to it.
+    error : bool (False)
+        Compute an amplitude error image ``amplitude_err``, from the curvature
+        of the fit statistics at the best fit amplitude.
+    ul : bool (False)
+        Compute an amplitude upper limit image ``amplitude_ul``. The upper limit
+        is the amplitude above the best fit amplitude, where the TS changes by
+        ``ul_delta_ts``.
+    ul_delta_ts : float (4)
+        TS difference defining the upper limit. The default corresponds to a
+        2 sigma upper limit.
+    dirty : `~numpy.ndarray` (None)
+        Mask of pixels where the input data changed. If given, only positions
+        within the kernel footprint of a dirty pixel are computed.
+    previous : `~gammapy.image.SkyImageList` (None)
+        Result of a previous call. If given together with ``dirty``, the values
+        of all positions that are not re-computed are copied from it.
+        Otherwise they are set to NaN.
 
     Returns
     -------
     images : `~gammapy.image.SkyImageList`
-        Images (ts, niter, amplitude)
+        Images (ts, niter, amplitude and optionally amplitude_err, amplitude_ul).
+        The total runtime and the runtime per image tile are stored in
+        ``meta['runtime']`` and ``meta['tile_runtimes']``.
 
     Notes
     -----
@@ -287,6 +340,19 @@ def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
 
     Where :math:`F` is the fitted flux amplitude.
 
+    In iterative source detection, where a source model is added to the
+    background in every iteration, only the TS values close to the new source
+    change. They can be updated by passing the previous result and a mask of
+    the changed background pixels::
+
+        changed = np.abs(model_source) > 1e-3 * background.data
+        background.data += model_source
+        result = compute_ts_image(counts, background, exposure, kernel,
+                                  dirty=changed, previous=result)
+
+    The cost of the update scales with the number of changed pixels times
+    the kernel size, instead of the number of image pixels.
+
     References
     ----------
     [Stewart2009]_
@@ -314,7 +380,7 @@ def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
                     'fail. Setting exposure of this pixels to zero.')
         exposure[mask_] = 0
 
-    if (flux is None and method != 'root brentq') or threshold is not None:
+    if (flux is None and method not in ['root brentq', 'batch newton']) or threshold is not None:
         from scipy.signal import fftconvolve
 
         with np.errstate(invalid='ignore', divide='ignore'):
@@ -325,39 +391,51 @@ def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
     # Compute null statistics for the whole image
     c_0_image = _cash_cython(counts, background)
 
-    x_min, x_max = kernel.shape[1] // 2, counts.shape[1] - kernel.shape[1] // 2
-    y_min, y_max = kernel.shape[0] // 2, counts.shape[0] - kernel.shape[0] // 2
-    positions = product(range(y_min, y_max), range(x_min, x_max))
-
     # Positions where exposure == 0 are not processed
     if mask is None:
         mask = exposure > 0
-    positions = [(j, i) for j, i in positions if mask[j][i]]
-
-    wrap = partial(_ts_value, counts=counts, exposure=exposure, background=background,
-                   c_0_image=c_0_image, kernel=kernel, flux=flux, method=method,
-                   threshold=threshold)
-
-    if parallel:
-        log.info('Using {0} cores to compute TS image.'.format(cpu_count()))
-        pool = Pool()
-        results = pool.map(wrap, positions)
-        pool.close()
-        pool.join()
-    else:
-        results = map(wrap, positions)
 
-    assert positions, ("Positions are empty: possibly kernel " +
-                       "{} is larger than counts {}".format(kernel.shape, counts.shape))
-
-    # Set TS values at given positions
-    j, i = zip(*positions)
-    ts = np.ones(counts.shape) * np.nan
-    amplitudes = np.ones(counts.shape) * np.nan
-    niter = np.ones(counts.shape) * np.nan
-    ts[j, i] = [_[0] for _ in results]
-    amplitudes[j, i] = [_[1] for _ in results]
-    niter[j, i] = [_[2] for _ in results]
+    # Only positions where the kernel fits completely into the image are processed
+    x_min, x_max = kernel.shape[1] // 2, counts.shape[1] - kernel.shape[1] // 2
+    y_min, y_max = kernel.shape[0] // 2, counts.shape[0] - kernel.shape[0] // 2
+    valid = np.zeros(counts.shape, dtype=bool)
+    valid[y_min:y_max, x_min:x_max] = np.asarray(mask, dtype=bool)[y_min:y_max, x_min:x_max]
+
+    assert valid.any(), ("Positions are empty: possibly kernel " +
+                         "{} is larger than counts {}".format(kernel.shape, counts.shape))
+
+    if dirty is not None:
+        valid &= _dilate_mask(dirty, kernel.shape)
+        log.info('Re-computing TS values for {0} positions.'.format(valid.sum()))
+
+    images = OrderedDict()
+    images['counts'] = counts
+    images['background'] = background
+    images['exposure'] = exposure
+    images['c_0'] = c_0_image
+    images['mask'] = valid
+    if flux is not None:
+        images['flux'] = flux
+
+    close_engine = engine is None
+    if engine is None:
+        engine = TSImageEngine(parallel=parallel)
+
+    try:
+        results, tile_runtimes = engine.run(images, kernel, method=method,
+                                            threshold=threshold, error=error, ul=ul,
+                                            ul_delta_ts=ul_delta_ts)
+    finally:
+        if close_engine:
+            engine.close()
+
+    if dirty is not None and previous is not None:
+        for name in results:
+            if name not in previous.names:
+                raise ValueError("Previous result has no '{}' image.".format(name))
+            results[name] = np.where(valid, results[name], previous[name].data)
+
+    ts, amplitudes, niter = results['ts'], results['amplitude'], results['niter']
 
     # Handle negative TS values
     with np.errstate(invalid='ignore', divide='ignore'):
@@ -365,13 +443,327 @@ def compute_ts_image(counts, background, exposure, kernel, mask=None, flux=None,
 
     runtime = np.round(time() - t_0, 2)
     meta = OrderedDict(runtime=runtime)
-    return SkyImageList([
+    meta['tile_runtimes'] = tile_runtimes
+    images = SkyImageList([
         SkyImage(name='ts', data=ts.astype('float32'), wcs=wcs),
         SkyImage(name='sqrt_ts', data=sqrt_ts.astype('float32'), wcs=wcs),
         SkyImage(name='amplitude', data=amplitudes.astype('float32'), wcs=wcs),
         SkyImage(name='niter', data=niter.astype('int16'), wcs=wcs),
     ], meta=meta)
 
+    for name in ['amplitude_err', 'amplitude_ul']:
+        if name in results:
+            images[name] = SkyImage(name=name, data=results[name].astype('float32'), wcs=wcs)
+
+    return images
+
+
+class TSImageEngine(object):
+    """
+    Tiled TS image computation with a persistent pool of worker processes.
+
+    The input images are written once per TS image computation to memory
+    mapped scratch files, which are opened read-only by all workers. The
+    image is split into rectangular tiles and only the tile bounds are sent
+    to the workers, which return the small result arrays of the tile. This
+    avoids pickling the full input images for every task.
+
+    An engine can be re-used for several calls to `compute_ts_image`, e.g. for
+    the different scales in `compute_ts_image_multiscale`, so that the worker
+    pool is only started once. Call `~TSImageEngine.close` or use the engine
+    as a context manager to shut the pool down.
+
+    Parameters
+    ----------
+    parallel : bool (True)
+        Whether to use multiple cores for parallel processing.
+    n_jobs : int (None)
+        Number of worker processes. Defaults to the number of CPUs.
+    tile_size : int (64)
+        Size of the (square) image tiles in pixels.
+    scratch_dir : str (None)
+        Directory for the memory mapped scratch files. By default the system
+        temp directory is used. On Linux ``'/dev/shm'`` can be used to keep
+        the images in shared memory.
+
+    Examples
+    --------
+    Compute TS images for several kernels using the same worker pool:
+
+    >>> from gammapy.detect import TSImageEngine, compute_ts_image
+    >>> with TSImageEngine(n_jobs=4) as engine:
+    ...     results = [compute_ts_image(counts, background, exposure, kernel,
+    ...                                 engine=engine) for kernel in kernels]
+    """
+    def __init__(self, parallel=True, n_jobs=None, tile_size=64, scratch_dir=None):
+        self.parallel = parallel
+        self.n_jobs = n_jobs or cpu_count()
+        self.tile_size = tile_size
+        self.scratch_dir = scratch_dir
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def pool(self):
+        """Worker pool (`multiprocessing.Pool`), started on first access."""
+        if self._pool is None:
+            log.info('Using {0} cores to compute TS image.'.format(self.n_jobs))
+            self._pool = Pool(processes=self.n_jobs)
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def tiles(self, mask):
+        """List of tiles containing pixels to process.
+
+        Parameters
+        ----------
+        mask : `~numpy.ndarray`
+            Mask of pixel positions to process.
+
+        Returns
+        -------
+        tiles : list
+            List of tile bounds ``(y_lo, y_hi, x_lo, x_hi)``.
+        """
+        j, i = np.where(mask)
+        tiles = []
+        if not len(j):
+            return tiles
+
+        for y_lo in range(j.min(), j.max() + 1, self.tile_size):
+            y_hi = min(y_lo + self.tile_size, j.max() + 1)
+            for x_lo in range(i.min(), i.max() + 1, self.tile_size):
+                x_hi = min(x_lo + self.tile_size, i.max() + 1)
+                if mask[y_lo:y_hi, x_lo:x_hi].any():
+                    tiles.append((y_lo, y_hi, x_lo, x_hi))
+        return tiles
+
+    def run(self, images, kernel, method='root brentq', threshold=None, error=False,
+            ul=False, ul_delta_ts=4):
+        """Compute TS values for all positions given by ``images['mask']``.
+
+        Positions in the mask must be at least half the kernel size away from
+        the image boundary.
+
+        Parameters
+        ----------
+        images : `~collections.OrderedDict`
+            Dict of input arrays: 'counts', 'background', 'exposure', 'c_0'
+            (null hypothesis cash statistics), 'mask' and optionally 'flux'.
+        kernel : `astropy.convolution.Kernel2D`
+            Source model kernel.
+        method : str ('root brentq')
+            Fit method, see `compute_ts_image`.
+        threshold : float (None)
+            TS threshold, see `compute_ts_image`.
+        error, ul : bool (False)
+            Whether to compute amplitude errors and upper limits,
+            see `compute_ts_image`.
+        ul_delta_ts : float (4)
+            TS difference defining the upper limit.
+
+        Returns
+        -------
+        results : `~collections.OrderedDict`
+            Dict of result arrays 'ts', 'amplitude', 'niter' and, if requested,
+            'amplitude_err' and 'amplitude_ul'.
+        tile_runtimes : `~numpy.ndarray`
+            Runtime per tile in seconds.
+        """
+        shape = images['mask'].shape
+        tiles = self.tiles(images['mask'])
+        names = _ts_result_names(error, ul)
+        values = np.nan * np.ones((len(names),) + shape)
+        options = dict(method=method, threshold=threshold, error=error, ul=ul,
+                       ul_delta_ts=ul_delta_ts)
+        tile_runtimes = np.zeros(len(tiles))
+
+        scratch_dir = None
+        try:
+            if self.parallel:
+                scratch_dir, filenames = self._write_scratch(images)
+                tasks = [(idx, filenames, kernel, tile, options)
+                         for idx, tile in enumerate(tiles)]
+                tile_results = self.pool.imap_unordered(_ts_tile, tasks)
+            else:
+                tasks = [(idx, images, kernel, tile, options)
+                         for idx, tile in enumerate(tiles)]
+                tile_results = (_ts_tile(task) for task in tasks)
+
+            for n_done, (idx, tile_values, runtime) in enumerate(tile_results):
+                y_lo, y_hi, x_lo, x_hi = tiles[idx]
+                values[:, y_lo:y_hi, x_lo:x_hi] = tile_values
+                tile_runtimes[idx] = runtime
+                log.debug('Processed tile {0}/{1} {2} in {3:.2f} s'.format(
+                    n_done + 1, len(tiles), tiles[idx], runtime))
+        finally:
+            if scratch_dir is not None:
+                shutil.rmtree(scratch_dir)
+
+        results = OrderedDict(zip(names, values))
+        return results, tile_runtimes
+
+    def _write_scratch(self, images):
+        """Write images to memory mapped ``.npy`` scratch files."""
+        scratch_dir = tempfile.mkdtemp(prefix='gammapy_ts_', dir=self.scratch_dir)
+        filenames = OrderedDict()
+        for name, image in images.items():
+            filename = os.path.join(scratch_dir, '{}.npy'.format(name))
+            np.save(filename, image)
+            filenames[name] = filename
+        return scratch_dir, filenames
+
+
+def _dilate_mask(mask, shape):
+    """Dilate a mask by a rectangular footprint.
+
+    Only the bounding box of the masked pixels is processed, so the cost
+    scales with the size of the masked region and not the size of the image.
+
+    Parameters
+    ----------
+    mask : `~numpy.ndarray`
+        Mask to dilate.
+    shape : tuple
+        Shape of the footprint (must be odd).
+
+    Returns
+    -------
+    dilated : `~numpy.ndarray`
+        Dilated mask.
+    """
+    from scipy.ndimage import maximum_filter
+    mask = np.asarray(mask, dtype=bool)
+    dilated = np.zeros_like(mask)
+
+    j, i = np.where(mask)
+    if not len(j):
+        return dilated
+
+    y_width, x_width = shape[0] // 2, shape[1] // 2
+    y_lo, y_hi = max(j.min() - y_width, 0), min(j.max() + y_width + 1, mask.shape[0])
+    x_lo, x_hi = max(i.min() - x_width, 0), min(i.max() + x_width + 1, mask.shape[1])
+    region = (slice(y_lo, y_hi), slice(x_lo, x_hi))
+    dilated[region] = maximum_filter(mask[region], size=shape, mode='constant')
+    return dilated
+
+
+def _ts_result_names(error=False, ul=False):
+    """Names of the arrays computed by `TSImageEngine.run`."""
+    names = ['ts', 'amplitude', 'niter']
+    if error:
+        names.append('amplitude_err')
+    if ul:
+        names.append('amplitude_ul')
+    return names
+
+
+# Memory mapped scratch images opened by a worker process
+_SCRATCH_IMAGES = OrderedDict()
+
+
+def _load_scratch_images(filenames):
+    """Open scratch images, re-using the memory maps of the current run."""
+    scratch_dir = os.path.dirname(list(filenames.values())[0])
+    if _SCRATCH_IMAGES.get('scratch_dir') != scratch_dir:
+        _SCRATCH_IMAGES.clear()
+        _SCRATCH_IMAGES['scratch_dir'] = scratch_dir
+        _SCRATCH_IMAGES['images'] = OrderedDict(
+            (name, np.load(filename, mmap_mode='r')) for name, filename in filenames.items()
+        )
+    return _SCRATCH_IMAGES['images']
+
+
+def _ts_tile(task):
+    """
+    Compute TS values for all positions within one image tile.
+
+    Parameters
+    ----------
+    task : tuple
+        Tuple ``(idx, images, kernel, tile, options)``, where ``idx`` is the
+        index of the tile in the list of tiles, ``images`` is either
+        a dict of arrays or a dict of scratch file names, ``tile`` are the tile
+        bounds ``(y_lo, y_hi, x_lo, x_hi)`` and ``options`` is a dict with the
+        fit options ``method``, ``threshold``, ``error``, ``ul`` and ``ul_delta_ts``.
+
+    Returns
+    -------
+    idx : int
+        Index of the tile.
+    values : `~numpy.ndarray`
+        Array of shape ``(n_results, ny, nx)`` with the TS, amplitude
+        and niter values of the tile, followed by the amplitude error and
+        upper limit values if requested.
+    runtime : float
+        Runtime in seconds.
+    """
+    t_0 = time()
+    idx, images, kernel, tile, options = task
+
+    if not isinstance(images['mask'], np.ndarray):
+        images = _load_scratch_images(images)
+
+    y_lo, y_hi, x_lo, x_hi = tile
+    y_width, x_width = kernel.shape[0] // 2, kernel.shape[1] // 2
+    cutout = (slice(y_lo - y_width, y_hi + y_width), slice(x_lo - x_width, x_hi + x_width))
+
+    # Copy the tile, including a margin for the kernel, into memory
+    data = dict((name, np.array(images[name][cutout])) for name in images if name != 'mask')
+    mask = images['mask'][y_lo:y_hi, x_lo:x_hi]
+
+    n_results = len(_ts_result_names(options['error'], options['ul']))
+    values = np.nan * np.ones((n_results,) + mask.shape)
+
+    # Process positions in chunks, to limit the size of the stacked cutouts
+    j, i = np.where(mask)
+    chunk_size = max(BATCH_SIZE // kernel.array.size, 1)
+    chunks = [(j[start:start + chunk_size], i[start:start + chunk_size])
+              for start in range(0, len(j), chunk_size)]
+
+    if options['method'] == 'batch newton':
+        for j_, i_ in chunks:
+            values[:3, j_, i_] = _ts_values_batch((j_ + y_width, i_ + x_width),
+                                                  counts=data['counts'],
+                                                  exposure=data['exposure'],
+                                                  background=data['background'],
+                                                  c_0_image=data['c_0'], kernel=kernel,
+                                                  flux=data.get('flux'),
+                                                  threshold=options['threshold'])
+    else:
+        for j_, i_ in zip(j, i):
+            values[:3, j_, i_] = _ts_value((j_ + y_width, i_ + x_width), counts=data['counts'],
+                                           exposure=data['exposure'],
+                                           background=data['background'],
+                                           c_0_image=data['c_0'], kernel=kernel,
+                                           flux=data.get('flux'), method=options['method'],
+                                           threshold=options['threshold'])
+
+    if n_results > 3:
+        for j_, i_ in chunks:
+            values[3:, j_, i_] = _amplitude_err_ul_batch((j_ + y_width, i_ + x_width),
+                                                         counts=data['counts'],
+                                                         exposure=data['exposure'],
+                                                         background=data['background'],
+                                                         kernel=kernel,
+                                                         amplitude=values[1, j_, i_],
+                                                         error=options['error'],
+                                                         ul=options['ul'],
+                                                         ul_delta_ts=options['ul_delta_ts'])
+
+    return idx, values, time() - t_0
+
 
 def _ts_value(position, counts, exposure, background, c_0_image, kernel, flux,
               method, threshold):
@@ -432,6 +824,332 @@ def _ts_value(position, counts, exposure, background, c_0_image, kernel, flux,
     return (c_0 - c_1) * np.sign(amplitude), amplitude * FLUX_FACTOR, niter
 
 
+def _cutouts(image, shape, positions):
+    """Stack of image cutouts of a given shape.
+
+    The cutouts are taken from a sliding window view of the image,
+    so only the selected cutouts are copied.
+
+    Parameters
+    ----------
+    image : `~numpy.ndarray`
+        Image to extract the cutouts from.
+    shape : tuple
+        Shape of the cutouts (must be odd).
+    positions : tuple of `~numpy.ndarray`
+        Pixel positions ``(j, i)`` of the cutout centers.
+
+    Returns
+    -------
+    cutouts : `~numpy.ndarray`
+        Array of shape ``(n_positions,) + shape``.
+    """
+    from numpy.lib.stride_tricks import as_strided
+    ny, nx = shape
+    view_shape = (image.shape[0] - ny + 1, image.shape[1] - nx + 1, ny, nx)
+    windows = as_strided(image, shape=view_shape, strides=image.strides * 2)
+    j, i = positions
+    return windows[j - ny // 2, i - nx // 2]
+
+
+def _cash_sum_batch(counts, model):
+    """Summed cash statistics for a stack of cutouts.
+
+    Vectorized version of ``_cash_sum_cython``, summing over the last two axes.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cash = np.where(model > 0, model - counts * np.log(model), 0)
+    return 2 * cash.sum(axis=(-2, -1))
+
+
+def _f_cash_root_batch(x, counts, background, model):
+    """Derivative of the cash statistics and its slope for a stack of cutouts.
+
+    Vectorized version of ``_f_cash_root_cython``.
+
+    Parameters
+    ----------
+    x : `~numpy.ndarray`
+        Model amplitudes, one per cutout.
+    counts, background, model : `~numpy.ndarray`
+        Stacks of counts, background and model cutouts.
+
+    Returns
+    -------
+    f, df : `~numpy.ndarray`
+        Function value and derivative with respect to ``x``.
+    """
+    x = x[:, np.newaxis, np.newaxis]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        npred = x * model * FLUX_FACTOR + background
+        ratio = np.where(model > 0, counts / npred, 0)
+        dratio = np.where(model > 0, ratio / npred, 0)
+    f = 2 * FLUX_FACTOR * (model * (1 - ratio)).sum(axis=(-2, -1))
+    df = 2 * FLUX_FACTOR ** 2 * (model ** 2 * dratio).sum(axis=(-2, -1))
+    return f, df
+
+
+def _amplitude_bounds_batch(counts, background, model):
+    """Bounds for the root of the cash derivative for a stack of cutouts.
+
+    Vectorized version of ``_amplitude_bounds_cython``.
+    """
+    n, size = len(counts), np.prod(counts.shape[1:])
+    counts, background, model = [_.reshape(n, size) for _ in (counts, background, model)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sn = background / model
+
+    sn_total = np.where(model > 0, sn, 1E14)
+    sn_counts = np.where(counts > 0, sn_total, 1E14)
+    idx = np.argmin(sn_counts, axis=1)
+    sn_min = sn_counts[np.arange(n), idx]
+    c_min = np.where(sn_min < 1E14, counts[np.arange(n), idx], 1)
+    sn_min = np.minimum(sn_min, 1E14)
+    sn_min_total = np.minimum(sn_total.min(axis=1), 1E14)
+
+    s_model = np.where(model > 0, model, 0).sum(axis=1)
+    s_counts = np.where(counts > 0, counts, 0).sum(axis=1)
+
+    b_min = c_min / s_model - sn_min
+    b_max = s_counts / s_model - sn_min
+    return b_min / FLUX_FACTOR, b_max / FLUX_FACTOR, -sn_min_total / FLUX_FACTOR
+
+
+def _newton_batch(func, x, lo, hi, maxiter=MAX_NITER, rtol=1E-3, xtol=2E-12):
+    """Find roots of monotonically increasing functions for many pixels at once.
+
+    All roots are searched simultaneously with Newton steps, that fall back
+    to bisection where a step would leave the bracketing interval. Pixels
+    are iterated in lockstep, converged pixels are removed from the active set.
+
+    Parameters
+    ----------
+    func : callable
+        Function ``func(x, idx)`` returning the function values and
+        derivatives at ``x`` for the pixels with index ``idx``.
+    x : `~numpy.ndarray`
+        Start values.
+    lo, hi : `~numpy.ndarray`
+        Bracketing interval, can be infinite.
+    maxiter : int
+        Maximum number of iterations.
+    rtol, xtol : float
+        Relative and absolute tolerance of the root (same as for
+        `~scipy.optimize.brentq`).
+
+    Returns
+    -------
+    root : `~numpy.ndarray`
+        Roots. NaN where the root finding did not converge.
+    niter : `~numpy.ndarray`
+        Number of iterations.
+    """
+    root = np.nan * np.ones(len(x))
+    niter = maxiter * np.ones(len(x), dtype=int)
+    active = np.arange(len(x))
+
+    for i in range(maxiter):
+        if not len(active):
+            break
+
+        f, df = func(x, active)
+
+        # Shrink the bracketing interval
+        lo = np.where(f < 0, x, lo)
+        hi = np.where(f > 0, x, hi)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_new = x - f / df
+
+        # Use bisection where the Newton step leaves the interval
+        bisect = ~((x_new > lo) & (x_new < hi))
+        x_new = np.where(bisect, 0.5 * (lo + hi), x_new)
+
+        converged = (np.abs(x_new - x) <= xtol + rtol * np.abs(x_new)) | (f == 0)
+        x_new = np.where(f == 0, x, x_new)
+        root[active[converged]] = x_new[converged]
+        niter[active[converged]] = i + 1
+
+        active, x, lo, hi = [_[~converged] for _ in (active, x_new, lo, hi)]
+
+    return root, niter
+
+
+def _root_amplitude_batch(counts, background, model):
+    """Fit amplitudes for a stack of cutouts by finding roots of the cash derivative.
+
+    Vectorized version of `_root_amplitude_brentq`, using `_newton_batch`.
+
+    Parameters
+    ----------
+    counts, background, model : `~numpy.ndarray`
+        Stacks of counts, background and model cutouts.
+
+    Returns
+    -------
+    amplitude : `~numpy.ndarray`
+        Fitted flux amplitudes. NaN where the root finding failed.
+    niter : `~numpy.ndarray`
+        Number of iterations needed for the fit.
+    """
+    amplitude_min, amplitude_max, amplitude_min_total = _amplitude_bounds_batch(
+        counts, background, model)
+
+    amplitude = np.nan * np.ones(len(counts))
+    niter = MAX_NITER * np.ones(len(counts), dtype=int)
+
+    has_counts = counts.sum(axis=(-2, -1)) > 0
+    amplitude[~has_counts] = amplitude_min_total[~has_counts]
+    niter[~has_counts] = 0
+
+    idx = np.where(has_counts)[0]
+    counts, background, model = counts[idx], background[idx], model[idx]
+    lo, hi = amplitude_min[idx], amplitude_max[idx]
+
+    # Where the root is not bracketed the fit fails
+    f_lo, _ = _f_cash_root_batch(lo, counts, background, model)
+    f_hi, _ = _f_cash_root_batch(hi, counts, background, model)
+    bracketed = (f_lo <= 0) & (f_hi >= 0)
+    idx, lo, hi = idx[bracketed], lo[bracketed], hi[bracketed]
+    counts, background, model = counts[bracketed], background[bracketed], model[bracketed]
+
+    def func(x, active):
+        return _f_cash_root_batch(x, counts[active], background[active], model[active])
+
+    amplitude[idx], niter[idx] = _newton_batch(func, 0.5 * (lo + hi), lo, hi)
+    return np.maximum(amplitude, amplitude_min_total), niter
+
+
+def _amplitude_err_ul_batch(positions, counts, exposure, background, kernel, amplitude,
+                            error, ul, ul_delta_ts):
+    """
+    Compute amplitude errors and upper limits for many pixel positions at once.
+
+    The error is computed from the curvature of the cash statistics at the
+    best fit amplitude. The upper limit is the amplitude above the best fit
+    amplitude where the cash statistics increases by ``ul_delta_ts``, found
+    with `_newton_batch`.
+
+    Parameters
+    ----------
+    positions : tuple of `~numpy.ndarray`
+        Pixel positions ``(j, i)``.
+    counts : `~numpy.ndarray`
+        Counts image
+    background : `~numpy.ndarray`
+        Background image
+    exposure : `~numpy.ndarray`
+        Exposure image
+    kernel : `astropy.convolution.Kernel2D`
+        Source model kernel
+    amplitude : `~numpy.ndarray`
+        Best fit flux amplitudes at the given positions.
+    error, ul : bool
+        Whether to compute amplitude errors and upper limits.
+    ul_delta_ts : float
+        TS difference defining the upper limit.
+
+    Returns
+    -------
+    values : `~numpy.ndarray`
+        Array of shape ``(n_results, n_positions)`` with the amplitude errors
+        and upper limits.
+    """
+    shape = kernel.shape
+    counts = _cutouts(counts, shape, positions)
+    background = _cutouts(background, shape, positions)
+    model = _cutouts(exposure, shape, positions) * kernel.array
+    x = amplitude / FLUX_FACTOR
+
+    _, df = _f_cash_root_batch(x, counts, background, model)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_err = np.sqrt(2 / df)
+
+    values = []
+    if error:
+        values.append(x_err * FLUX_FACTOR)
+
+    if ul:
+        npred = background + x[:, np.newaxis, np.newaxis] * FLUX_FACTOR * model
+        c_best = _cash_sum_batch(counts, npred)
+
+        def func(x_, active):
+            npred = background[active] + x_[:, np.newaxis, np.newaxis] * FLUX_FACTOR * model[active]
+            delta_ts = _cash_sum_batch(counts[active], npred) - c_best[active] - ul_delta_ts
+            f, _ = _f_cash_root_batch(x_, counts[active], background[active], model[active])
+            return delta_ts, f
+
+        # Start at the parabolic approximation of the upper limit
+        x_0 = x + np.sqrt(ul_delta_ts) * np.where(np.isfinite(x_err), x_err, 1)
+        hi = np.inf * np.ones(len(x))
+        x_ul, _ = _newton_batch(func, x_0, x, hi)
+        values.append(x_ul * FLUX_FACTOR)
+
+    return values
+
+
+def _ts_values_batch(positions, counts, exposure, background, c_0_image, kernel, flux,
+                     threshold):
+    """
+    Compute TS values for many pixel positions at once.
+
+    Vectorized version of `_ts_value`, using `_root_amplitude_batch`.
+
+    Parameters
+    ----------
+    positions : tuple of `~numpy.ndarray`
+        Pixel positions ``(j, i)``.
+    counts : `~numpy.ndarray`
+        Counts image
+    background : `~numpy.ndarray`
+        Background image
+    exposure : `~numpy.ndarray`
+        Exposure image
+    c_0_image : `~numpy.ndarray`
+        Cash statistics image of the null hypothesis.
+    kernel : `astropy.convolution.Kernel2D`
+        Source model kernel
+    flux : `~numpy.ndarray`
+        Flux image, only used if a ``threshold`` is given.
+    threshold : float
+        TS threshold, see `compute_ts_image`.
+
+    Returns
+    -------
+    values : `~numpy.ndarray`
+        Array of shape ``(3, n_positions)`` with TS, amplitude and niter values.
+    """
+    shape = kernel.shape
+    counts_ = _cutouts(counts, shape, positions)
+    background_ = _cutouts(background, shape, positions)
+    model = _cutouts(exposure, shape, positions) * kernel.array
+    c_0 = _cutouts(c_0_image, shape, positions).sum(axis=(-2, -1))
+
+    values = np.empty((3, len(counts_)))
+
+    if threshold is not None:
+        flux_ = flux[positions][:, np.newaxis, np.newaxis]
+        c_1 = _cash_sum_batch(counts_, background_ + flux_ * FLUX_FACTOR * model)
+        # Don't fit if pixel significance is low
+        low = c_0 - c_1 < threshold
+        values[0, low] = c_0[low] - c_1[low]
+        values[1, low] = flux[positions][low] * FLUX_FACTOR
+        values[2, low] = 0
+        fit = ~low
+        counts_, background_, model, c_0 = [_[fit] for _ in (counts_, background_, model, c_0)]
+    else:
+        fit = slice(None)
+
+    amplitude, niter = _root_amplitude_batch(counts_, background_, model)
+
+    npred = background_ + amplitude[:, np.newaxis, np.newaxis] * FLUX_FACTOR * model
+    c_1 = _cash_sum_batch(counts_, npred)
+
+    values[:, fit] = (c_0 - c_1) * np.sign(amplitude), amplitude * FLUX_FACTOR, niter
+    return values
+
+
 def _leastsq_iter_amplitude(counts, background, model, maxiter=MAX_NITER, rtol=0.001):
     """Fit amplitude using an iterative least squares algorithm.
 
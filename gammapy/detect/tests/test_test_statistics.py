@@ -4,7 +4,7 @@ import numpy as np
 from numpy.testing.utils import assert_allclose
 from astropy.convolution import Gaussian2DKernel
 from ...utils.testing import requires_dependency, requires_data
-from ...detect import compute_ts_image
+from ...detect import compute_ts_image, TSImageEngine
 from ...image import SkyImageList
 
 
@@ -34,3 +34,151 @@ def test_compute_ts_map():
     assert_allclose([[99], [99]], np.where(result['ts'].data == result['ts'].data.max()))
     assert_allclose(3, result['niter'].data[99, 99])
     assert_allclose(1.0227934338735763e-09, result['amplitude'].data[99, 99], rtol=1e-3)
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_compute_ts_map_engine():
+    """Check that tiled parallel and serial computation agree"""
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+
+    kernel = Gaussian2DKernel(2.5)
+
+    images['counts'] = images['counts'].downsample(2, np.nansum)
+    images['background'] = images['background'].downsample(2, np.nansum)
+    images['exposure'] = images['exposure'].downsample(2, np.mean)
+
+    with TSImageEngine(n_jobs=2, tile_size=16) as engine:
+        results = [compute_ts_image(images['counts'], images['background'],
+                                    images['exposure'], kernel, engine=engine)
+                   for _ in range(2)]
+
+    result_serial = compute_ts_image(
+        images['counts'], images['background'], images['exposure'], kernel,
+        engine=TSImageEngine(parallel=False, tile_size=33),
+    )
+
+    for result in results:
+        for name in ['ts', 'amplitude', 'niter']:
+            assert_allclose(result[name].data, result_serial[name].data)
+
+    assert len(results[0].meta['tile_runtimes']) > 1
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_compute_ts_map_engine_chunks(monkeypatch):
+    """Check that tiles processed in several chunks end up in the right place"""
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+
+    kernel = Gaussian2DKernel(2.5)
+
+    images['counts'] = images['counts'].downsample(2, np.nansum)
+    images['background'] = images['background'].downsample(2, np.nansum)
+    images['exposure'] = images['exposure'].downsample(2, np.mean)
+
+    # Process at most 10 positions at once, i.e. several chunks per tile
+    monkeypatch.setattr('gammapy.detect.test_statistics.BATCH_SIZE', 10 * kernel.array.size)
+
+    kwargs = dict(method='batch newton', error=True, ul=True)
+    result_tiled = compute_ts_image(
+        images['counts'], images['background'], images['exposure'], kernel,
+        engine=TSImageEngine(parallel=False, tile_size=16), **kwargs
+    )
+    result_single = compute_ts_image(
+        images['counts'], images['background'], images['exposure'], kernel,
+        engine=TSImageEngine(parallel=False, tile_size=1000), **kwargs
+    )
+
+    assert len(result_tiled.meta['tile_runtimes']) > 1
+    assert len(result_single.meta['tile_runtimes']) == 1
+    for name in ['ts', 'amplitude', 'niter', 'amplitude_err', 'amplitude_ul']:
+        assert_allclose(result_tiled[name].data, result_single[name].data)
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_compute_ts_map_batch_newton():
+    """Compare the batch newton and root brentq methods"""
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+
+    kernel = Gaussian2DKernel(2.5)
+
+    results = [compute_ts_image(images['counts'], images['background'],
+                                images['exposure'], kernel, method=method, parallel=False)
+               for method in ['root brentq', 'batch newton']]
+
+    assert_allclose(results[0]['ts'].data, results[1]['ts'].data, atol=1e-2)
+    assert_allclose(results[0]['amplitude'].data, results[1]['amplitude'].data,
+                    rtol=1e-2, atol=1e-14)
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_compute_ts_map_error_ul():
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+
+    kernel = Gaussian2DKernel(2.5)
+
+    result = compute_ts_image(images['counts'], images['background'], images['exposure'],
+                              kernel, method='batch newton', parallel=False, error=True,
+                              ul=True)
+
+    assert 'amplitude_err' in result.names
+    assert 'amplitude_ul' in result.names
+
+    amplitude = result['amplitude'].data
+    valid = np.isfinite(amplitude)
+    assert np.all(result['amplitude_err'].data[valid] > 0)
+    assert np.all(result['amplitude_ul'].data[valid] > amplitude[valid])
+
+    # For large counts the upper limit is close to the parabolic approximation
+    ul = amplitude[99, 99] + 2 * result['amplitude_err'].data[99, 99]
+    assert_allclose(result['amplitude_ul'].data[99, 99], ul, rtol=1e-2)
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_compute_ts_map_dirty():
+    """Check that re-computing dirty pixels gives the full result"""
+    filename = '$GAMMAPY_EXTRA/test_datasets/unbundled/poisson_stats_image/input_all.fits.gz'
+    images = SkyImageList.read(filename)
+
+    kernel = Gaussian2DKernel(2.5)
+    kwargs = dict(method='batch newton', parallel=False)
+
+    previous = compute_ts_image(images['counts'], images['background'],
+                                images['exposure'], kernel, **kwargs)
+
+    dirty = np.zeros(images['counts'].data.shape, dtype=bool)
+    dirty[95:105, 95:105] = True
+    images['background'].data[dirty] *= 1.1
+
+    result = compute_ts_image(images['counts'], images['background'], images['exposure'],
+                              kernel, dirty=dirty, previous=previous, **kwargs)
+    expected = compute_ts_image(images['counts'], images['background'],
+                                images['exposure'], kernel, **kwargs)
+
+    for name in ['ts', 'amplitude', 'niter']:
+        assert_allclose(result[name].data, expected[name].data)
+
+    assert result['ts'].data[99, 99] != previous['ts'].data[99, 99]
+
+
+def test_amplitude_bounds_batch():
+    from ..test_statistics import _amplitude_bounds_batch
+    from .._test_statistics_cython import _amplitude_bounds_cython
+    np.random.seed(0)
+    counts = np.random.poisson(0.5, (10, 5, 5)).astype(float)
+    background = np.random.uniform(0.1, 1, (10, 5, 5))
+    model = np.random.uniform(0, 1, (10, 5, 5))
+    model[:, 0] = 0
+
+    actual = _amplitude_bounds_batch(counts, background, model)
+    for idx in range(10):
+        desired = _amplitude_bounds_cython(counts[idx], background[idx], model[idx])
+        assert_allclose([_[idx] for _ in actual], desired)
@@ -234,10 +234,14 @@ class SkyImage(object):
 
         return cls(name, data, wcs, unit, meta=wcs.to_header())
 
-    def fill_events(self, events, weights=None):
+    def fill_events(self, events, weights=None, chunk_size=1000000):
         """Fill events (modifies ``data`` attribute).
 
-        Calls `numpy.histogramdd`
+        The pixel index of each event is computed from the WCS and the
+        events are counted with `numpy.bincount`. Events outside the image
+        are ignored. The events are processed in chunks of ``chunk_size``,
+        which limits the memory used for large event lists. The result is
+        the same as with `numpy.histogramdd` on the pixel coordinates.
 
         Parameters
         ----------
@@ -245,18 +249,33 @@ class SkyImage(object):
             Event list
         weights : str, optional
             Column to use as weights (none by default)
+        chunk_size : int, optional
+            Number of events processed at once.
 
         Examples
         --------
         Show example how to make an empty image and fill it.
         """
         if weights is not None:
-            weights = events[weights]
-
-        xx, yy = self.wcs_skycoord_to_pixel(events.radec)
-        bins = self._bins_pix
-        data = np.histogramdd([yy, xx], bins, weights=weights)[0]
-        self.data = self.data + data
+            weights = np.asarray(events[weights], dtype=float)
+
+        radec = events.radec
+        counts = np.zeros(self.data.size)
+        for start in range(0, len(events), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            yy, xx = self._events_pix_index(radec[chunk])
+            valid = (yy >= 0) & (xx >= 0)
+            idx = yy[valid] * self.data.shape[1] + xx[valid]
+            weights_chunk = None if weights is None else weights[chunk][valid]
+            counts += np.bincount(idx, weights=weights_chunk, minlength=counts.size)
+
+        self.data = self.data + counts.reshape(self.data.shape)
+
+    def _events_pix_index(self, position):
+        """Integer pixel indices ``(y, x)`` of sky positions, -1 outside the image."""
+        xx, yy = self.wcs_skycoord_to_pixel(position)
+        ny, nx = self.data.shape
+        return _bin_index(yy, ny), _bin_index(xx, nx)
 
     @property
     def _bins_pix(self):
@@ -399,8 +418,8 @@ class SkyImage(object):
         bounds_ref = image_ref.wcs.wcs_world2pix(bounds[0], bounds[1], _DEFAULT_WCS_ORIGIN)
 
         # round to nearest integer and clip at the boundaries
-        xlo, xhi = np.rint(np.clip(bounds_ref[0], 0, xmax_ref))
-        ylo, yhi = np.rint(np.clip(bounds_ref[1], 0, ymax_ref))
+        xlo, xhi = np.rint(np.clip(bounds_ref[0], 0, xmax_ref)).astype(int)
+        ylo, yhi = np.rint(np.clip(bounds_ref[1], 0, ymax_ref)).astype(int)
 
         if wcs_check:
             if not np.allclose(bounds_ref, np.rint(bounds_ref)):
@@ -483,6 +502,82 @@ class SkyImage(object):
             wcs=cutout.wcs, unit=self.unit,
         )
 
+    def cutout_circle(self, position, radius):
+        """
+        Cut out the rectangular piece of the image that contains a circle.
+
+        The cutout contains all pixels with centers within ``radius`` of
+        ``position``, plus a margin of about one pixel. Its size is computed
+        from the projection of the circle, so unlike `cutout` it is
+        correct for any projection and position, e.g. for circles at
+        high latitudes in ``CAR`` images. It can be pasted back into the
+        image with `paste`. See :ref:`image-cutpaste` for more information
+        how to cut and paste sky images.
+
+        Parameters
+        ----------
+        position : `~astropy.coordinates.SkyCoord`
+            Center of the circle.
+        radius : `~astropy.coordinates.Angle`
+            Radius of the circle.
+
+        Returns
+        -------
+        cutout : `~gammapy.image.SkyImage`
+            Cut out image, or ``None`` if the circle doesn't overlap with the image.
+        """
+        slices = self._cutout_circle_slices(position, radius)
+        if slices is None:
+            return None
+
+        return self._cutout_slices(slices)
+
+    def _cutout_slices(self, slices):
+        """Cut out the piece of the image given by array slices ``(yslice, xslice)``."""
+        yslice, xslice = slices
+        wcs = self.wcs.deepcopy()
+        wcs.wcs.crpix -= np.array([xslice.start, yslice.start])
+        data = self.data[yslice, xslice].copy()
+        return self.__class__(name=self.name, data=data, wcs=wcs, unit=self.unit)
+
+    def _cutout_circle_slices(self, position, radius):
+        """Array slices ``(yslice, xslice)`` of the bounding box of a circle.
+
+        Returns ``None`` if the circle doesn't overlap with the image.
+        """
+        radius = Angle(radius)
+        ny, nx = self.data.shape
+        full = slice(0, ny), slice(0, nx)
+
+        # A circle around one of the poles of the image coordinate system
+        # isn't bounded by the projection of its border.
+        frame = self.center.frame
+        for lat in [-90, 90]:
+            pole = SkyCoord(0, lat, unit='deg', frame=frame)
+            if position.separation(pole) <= radius:
+                return full
+
+        # Points on the border of the circle
+        pa = np.linspace(0, 2 * np.pi, 360)
+        lon0 = position.spherical.lon.radian
+        lat0 = position.spherical.lat.radian
+        r = radius.radian
+        lat = np.arcsin(np.sin(lat0) * np.cos(r) + np.cos(lat0) * np.sin(r) * np.cos(pa))
+        lon = lon0 + np.arctan2(np.sin(pa) * np.sin(r) * np.cos(lat0),
+                                np.cos(r) - np.sin(lat0) * np.sin(lat))
+        border = SkyCoord(lon, lat, unit='rad', frame=position.frame)
+
+        xx, yy = self.wcs_skycoord_to_pixel(border)
+        if not (np.all(np.isfinite(xx)) and np.all(np.isfinite(yy))):
+            return full
+
+        xlo, xhi = max(int(np.floor(xx.min())), 0), min(int(np.ceil(xx.max())) + 1, nx)
+        ylo, yhi = max(int(np.floor(yy.min())), 0), min(int(np.ceil(yy.max())) + 1, ny)
+        if xlo >= xhi or ylo >= yhi:
+            return None
+
+        return slice(ylo, yhi), slice(xlo, xhi)
+
     def pad(self, pad_width, mode='reflect', **kwargs):
         """
         Pad sky image at the edges.
@@ -1187,3 +1282,21 @@ class SkyImage(object):
             raise ValueError('Invalid option kernel = {}'.format(kernel))
 
         return image
+
+
+def _bin_index(pix, n_bins, offset=0.5):
+    """Index of the unit width bins with edges ``np.arange(n_bins + 1) - offset``.
+
+    As in `numpy.histogramdd`, the last bin includes its upper edge.
+    Values outside of the bins, or NaN, get the index -1.
+    """
+    pix = np.asarray(pix, dtype=float)
+    with np.errstate(invalid='ignore'):
+        # Split off the integer part, so that values at the bin edges are exact
+        pix_floor = np.floor(pix)
+        idx = pix_floor + (pix - pix_floor >= 1 - offset)
+        idx[pix == n_bins - offset] = n_bins - 1
+        invalid = ~((idx >= 0) & (idx < n_bins))
+
+    idx[invalid] = -1
+    return idx.astype(int)
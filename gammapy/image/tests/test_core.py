@@ -326,6 +326,29 @@ def test_image_pad():
     assert image2.data.shape == (21, 18)
 
 
+@pytest.mark.parametrize(('lon', 'lat'), [(0, 0), (20, 35), (-48, 3)])
+def test_image_cutout_circle(lon, lat):
+    image = SkyImage.empty(nxpix=200, nypix=160, binsz=0.5, proj='CAR')
+    position = SkyCoord(lon, lat, unit='deg', frame='galactic')
+    radius = Angle(5, 'deg')
+
+    cutout = image.cutout_circle(position, radius)
+    assert cutout.data.size < image.data.size
+
+    # All pixels within the circle are in the cutout
+    inside = image.coordinates().separation(position) <= radius
+    inside_cutout = cutout.coordinates().separation(position) <= radius
+    assert inside_cutout.sum() == inside.sum()
+
+    cutout.data += 1
+    image.paste(cutout)
+    assert image.data.sum() == cutout.data.size
+
+    position = SkyCoord(0, 0, unit='deg', frame='galactic')
+    image = SkyImage.empty(nxpix=10, nypix=10, binsz=0.1, xref=100)
+    assert image.cutout_circle(position, radius) is None
+
+
 def test_skycoord_pixel_conversion():
     image = SkyImage.empty(nxpix=10, nypix=15)
 
@@ -422,3 +445,25 @@ def test_image_fill_events():
 
     assert image.data[0, 0] == 1 + 3
     assert image.data[0, 1] == 2
+
+
+def test_image_fill_events_histogramdd():
+    image = SkyImage.empty(nxpix=20, nypix=10, binsz=0.1, proj='TAN', coordsys='CEL')
+    rng = np.random.RandomState(0)
+    events = EventList()
+    events['RA'] = rng.uniform(-1.5, 1.5, 1000) % 360
+    events['DEC'] = rng.uniform(-1, 1, 1000)
+    events['WEIGHT'] = rng.uniform(0, 1, 1000)
+
+    xx, yy = image.wcs_skycoord_to_pixel(events.radec)
+    expected = np.histogramdd([yy, xx], image._bins_pix, weights=events['WEIGHT'])[0]
+
+    image.fill_events(events, weights='WEIGHT', chunk_size=99)
+    assert_allclose(image.data, expected)
+
+
+def test_bin_index():
+    from ..core import _bin_index
+    pix = [-0.6, -0.5, 0.49999999999999994, 0.5, 2.4, 2.5, 2.6, nan]
+    assert_equal(_bin_index(pix, 3), [-1, 0, 0, 1, 2, 2, -1, -1])
+    assert_equal(_bin_index(pix, 3, offset=0), [-1, -1, 0, 0, 2, 2, 2, -1])
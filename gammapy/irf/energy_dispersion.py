@@ -1,5 +1,6 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
+from collections import OrderedDict
 import numpy as np
 from astropy.io import fits
 from astropy.coordinates import Angle
@@ -8,11 +9,12 @@ from astropy.table import Table
 from ..utils.energy import EnergyBounds, Energy
 from ..utils.array import array_stats_str
 from ..utils.scripts import make_path
-from ..utils.nddata import NDDataArray, BinnedDataAxis
+from ..utils.nddata import NDDataArray, BinnedDataAxis, GridInterpolator
 from ..utils.fits import energy_axis_to_ebounds
 
 __all__ = [
     'EnergyDispersion',
+    'EnergyDispersionBands',
     'EnergyDispersion2D',
 ]
 
@@ -20,10 +22,12 @@ __all__ = [
 class EnergyDispersion(NDDataArray):
     """Energy dispersion matrix.
 
-    We use a dense matrix (`numpy.ndarray`) for the energy dispersion matrix.
-    An alternative would be to store a sparse matrix
-    (`scipy.sparse.csc_matrix`).  It's not clear which would be more efficient
-    for typical gamma-ray energy dispersion matrices.
+    We use a dense matrix (`numpy.ndarray`) for the energy dispersion matrix,
+    for interpolation and plotting. Typical matrices are mostly zeros, so for
+    `apply`, RMF I/O and stacking a compressed representation is used, with
+    only the band of non-zero reco energy bins for each true energy bin (see
+    `bands`). It is cached and re-computed when ``data`` is set, call
+    `clear_bands_cache` if you modify ``data`` in place.
 
     The most common file format for energy dispersion matrices is the RMF
     (Redistribution Matrix File) format from X-ray astronomy:
@@ -56,6 +60,19 @@ class EnergyDispersion(NDDataArray):
         """
         return self.data
 
+    @property
+    def bands(self):
+        """Compressed band representation of the PDF matrix (`EnergyDispersionBands`)"""
+        data, bands = getattr(self, '_bands_cache', (None, None))
+        if data is not self.data:
+            bands = EnergyDispersionBands.from_dense(self.data.value)
+            self._bands_cache = self.data, bands
+        return bands
+
+    def clear_bands_cache(self):
+        """Clear the cached `bands`."""
+        self._bands_cache = None, None
+
     def pdf_in_safe_range(self, lo_threshold, hi_threshold):
         """PDF matrix with bins outside threshold set to 0
         
@@ -127,14 +144,22 @@ class EnergyDispersion(NDDataArray):
 
         pdf_matrix = np.zeros([len(data), header['DETCHANS']], dtype=np.float64)
 
-        for i, l in enumerate(data):
-            if l.field('N_GRP'):
-                m_start = 0
-                for k in range(l.field('N_GRP')):
-                    pdf_matrix[i, l.field('F_CHAN')[k]: l.field(
-                        'F_CHAN')[k] + l.field('N_CHAN')[k]] = l.field(
-                        'MATRIX')[m_start:m_start + l.field('N_CHAN')[k]]
-                    m_start += l.field('N_CHAN')[k]
+        # Flatten the channel groups of all rows, then fill the matrix at once
+        n_grp = np.asarray(data.field('N_GRP'), dtype=int)
+        good = np.where(n_grp > 0)[0]
+        columns = [data.field(_) for _ in ['F_CHAN', 'N_CHAN', 'MATRIX']]
+        f_chan, n_chan, matrix = [[np.atleast_1d(column[_]) for _ in good] for column in columns]
+        f_chan = [row[:n_grp[_]] for row, _ in zip(f_chan, good)]
+        n_chan = [row[:n_grp[_]] for row, _ in zip(n_chan, good)]
+
+        if len(good) > 0:
+            f_chan = np.concatenate(f_chan).astype(int)
+            n_chan = np.concatenate(n_chan).astype(int)
+            rows = np.repeat(np.repeat(good, n_grp[good]), n_chan)
+            cols = _band_columns(f_chan, n_chan)
+            n_values = np.add.reduceat(n_chan, np.cumsum(n_grp[good]) - n_grp[good])
+            values = np.concatenate([row[:n] for row, n in zip(matrix, n_values)])
+            pdf_matrix[rows, cols] = values
 
         e_reco = EnergyBounds.from_ebounds(hdu_list['EBOUNDS'])
         e_true = EnergyBounds.from_rmf_matrix(hdu_list['MATRIX'])
@@ -198,34 +223,23 @@ class EnergyDispersion(NDDataArray):
         """
         table = Table()
 
+        # Make RMF type matrix, with one channel group (the band) per row
+        bands = self.bands
         rows = self.pdf_matrix.shape[0]
-        n_grp = []
+        n_grp = (bands.n_chan > 0).astype(np.int16)
         f_chan = np.ndarray(dtype=np.object, shape=rows)
         n_chan = np.ndarray(dtype=np.object, shape=rows)
         matrix = np.ndarray(dtype=np.object, shape=rows)
 
-        # Make RMF type matrix
-        for i, row in enumerate(self.data.value):
-            subsets = 1
-            pos = np.nonzero(row)[0]
-            borders = np.where(np.diff(pos) != 1)[0]
-            # add 1 to borders for correct behaviour of np.split
-            groups = np.asarray(np.split(pos, borders + 1))
-            n_grp_temp = groups.shape[0] if groups.size > 0 else 1
-            n_chan_temp = np.asarray([val.size for val in groups])
-            try:
-                f_chan_temp = np.asarray([val[0] for val in groups])
-            except(IndexError):
-                f_chan_temp = np.zeros(1)
-
-            n_grp.append(n_grp_temp)
-            f_chan[i] = f_chan_temp
-            n_chan[i] = n_chan_temp
-            matrix[i] = row[pos]
+        values = np.split(bands.values, np.cumsum(bands.n_chan)[:-1])
+        for i in range(rows):
+            f_chan[i] = bands.f_chan[i:i + 1]
+            n_chan[i] = bands.n_chan[i:i + 1]
+            matrix[i] = values[i]
 
         table['ENERG_LO'] = self.e_true.data[:-1]
         table['ENERG_HI'] = self.e_true.data[1:]
-        table['N_GRP'] = np.asarray(n_grp, dtype=np.int16)
+        table['N_GRP'] = n_grp
         table['F_CHAN'] = f_chan
         table['N_CHAN'] = n_chan
         table['MATRIX'] = matrix
@@ -316,10 +330,20 @@ class EnergyDispersion(NDDataArray):
         convolved_data : array
             1-dim data array after multiplication with the energy dispersion matrix
         """
-        if e_reco is None:
-            e_reco = self.e_reco.nodes
-        else:
-            e_reco = np.sqrt(e_reco[:-1] * e_reco[1:])
+        native = e_reco is None
+        if not native:
+            e_reco_native = self.e_reco.data
+            native = (len(e_reco) == len(e_reco_native) and
+                      np.allclose(Quantity(e_reco).to(e_reco_native.unit).value,
+                                  e_reco_native.value, rtol=1e-10, atol=0))
+
+        # The PDF matrix is only re-evaluated for a different reco binning
+        if native:
+            if isinstance(data, Quantity):
+                return Quantity(self.bands.dot(data.value), data.unit)
+            return self.bands.dot(data)
+
+        e_reco = np.sqrt(e_reco[:-1] * e_reco[1:])
         edisp_pdf = self.evaluate(e_reco=e_reco)
         return np.dot(data, edisp_pdf)
 
@@ -455,6 +479,95 @@ class EnergyDispersion(NDDataArray):
         return DataRMF(**kwargs)
 
 
+class EnergyDispersionBands(object):
+    """Compressed band representation of an energy dispersion matrix.
+
+    For each row (true energy bin) only the values from the first to the last
+    non-zero column (reco energy bin) are stored, as in the OGIP RMF
+    ``F_CHAN``, ``N_CHAN``, ``MATRIX`` columns with one channel group per row.
+
+    Parameters
+    ----------
+    f_chan : array_like
+        First stored column of each row
+    n_chan : array_like
+        Number of stored columns of each row
+    values : array_like
+        Stored values of all rows, concatenated
+    shape : tuple
+        Shape ``(n_true, n_reco)`` of the dense matrix
+    """
+
+    def __init__(self, f_chan, n_chan, values, shape):
+        self.f_chan = np.asarray(f_chan, dtype=int)
+        self.n_chan = np.asarray(n_chan, dtype=int)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.shape = tuple(shape)
+
+        # Dense matrix indices of the stored values
+        self.rows = np.repeat(np.arange(self.shape[0]), self.n_chan)
+        self.cols = _band_columns(self.f_chan, self.n_chan)
+
+        # Sorting by column, to sum over rows with `np.add.reduceat` in `dot`
+        self._order = np.argsort(self.cols, kind='mergesort')
+        sorted_cols = self.cols[self._order]
+        self._starts = np.flatnonzero(np.concatenate([[True], np.diff(sorted_cols) != 0]))
+        self._unique_cols = sorted_cols[self._starts]
+
+    @classmethod
+    def from_dense(cls, matrix):
+        """Create from dense matrix with shape ``(n_true, n_reco)``."""
+        matrix = np.asarray(matrix)
+        nonzero = matrix != 0
+        filled = nonzero.any(axis=1)
+
+        first = np.argmax(nonzero, axis=1)
+        last = matrix.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis=1)
+        f_chan = np.where(filled, first, 0)
+        n_chan = np.where(filled, last - first + 1, 0)
+
+        rows = np.repeat(np.arange(matrix.shape[0]), n_chan)
+        values = matrix[rows, _band_columns(f_chan, n_chan)]
+        return cls(f_chan, n_chan, values, matrix.shape)
+
+    @property
+    def density(self):
+        """Fraction of the dense matrix elements that are stored (float)"""
+        return len(self.values) / (self.shape[0] * self.shape[1])
+
+    def to_dense(self):
+        """Dense matrix (`~numpy.ndarray`)"""
+        matrix = np.zeros(self.shape)
+        matrix[self.rows, self.cols] = self.values
+        return matrix
+
+    def dot(self, data):
+        """Matrix product ``data @ matrix``.
+
+        Parameters
+        ----------
+        data : array_like
+            Data in true energy bins, with shape ``(..., n_true)``
+
+        Returns
+        -------
+        result : `~numpy.ndarray`
+            Data in reco energy bins, with shape ``(..., n_reco)``
+        """
+        data = np.asarray(data)
+        result = np.zeros(data.shape[:-1] + (self.shape[1],))
+        if len(self.values) > 0:
+            product = data[..., self.rows[self._order]] * self.values[self._order]
+            result[..., self._unique_cols] = np.add.reduceat(product, self._starts, axis=-1)
+        return result
+
+
+def _band_columns(f_chan, n_chan):
+    """Column indices of the values of channel groups, concatenated."""
+    offsets = np.cumsum(n_chan) - n_chan
+    return np.arange(np.sum(n_chan)) + np.repeat(f_chan - offsets, n_chan)
+
+
 class EnergyDispersion2D(object):
     """Offset-dependent energy dispersion matrix.
 
@@ -475,7 +588,7 @@ class EnergyDispersion2D(object):
     dispersion : `~numpy.ndarray`
         PDF matrix
     interp_kwargs : dict or None
-        Interpolation parameter dict passed to `scipy.interpolate.RegularGridInterpolator`.
+        Interpolation parameter dict passed to `~gammapy.utils.nddata.GridInterpolator`.
         If you pass ``None``, the default ``interp_params=dict(bounds_error=False, fill_value=0)`` is used.
 
     Examples
@@ -529,6 +642,8 @@ class EnergyDispersion2D(object):
         plt.loglog()
 
     """
+    response_cache_size = 32
+    """Maximum number of response matrices cached by `to_energy_dispersion`"""
 
     def __init__(self, etrue_lo, etrue_hi, migra_lo, migra_hi, offset_lo,
                  offset_hi, dispersion, interp_kwargs=None):
@@ -623,17 +738,90 @@ class EnergyDispersion2D(object):
         z = np.atleast_1d(np.log10(e_true.value))
         in_shape = (x.size, y.size, z.size)
 
-        pts = [[xx, yy, zz] for xx in x for yy in y for zz in z]
-        val_array = self._linear(pts)
+        val_array = self._linear.outer([x, y, z])
 
         return val_array.reshape(in_shape).squeeze()
 
-    def to_energy_dispersion(self, offset, e_true=None, e_reco=None):
+    def _eval_response(self, offset, e_true, e_reco):
+        """Response matrices for several offsets.
+
+        Evaluates the dispersion for all offsets, true energies and reco
+        energy bins in one vectorized interpolator call.
+
+        Parameters
+        ----------
+        offset : `~numpy.ndarray`
+            Offsets (deg)
+        e_true : `~numpy.ndarray`
+            True energies (TeV)
+        e_reco : `~gammapy.utils.energy.EnergyBounds`
+            Reconstructed energy axis
+
+        Returns
+        -------
+        response : `~numpy.ndarray`
+            Response with shape ``(offset.size, e_true.size, e_reco.nbins)``
+        """
+        center = e_reco.log_centers.to('TeV').value
+        bands = e_reco.bands.to('TeV').value
+        e_true = e_true[:, np.newaxis]
+
+        migra = center / e_true
+        values = [offset[:, np.newaxis, np.newaxis], migra, np.log10(e_true)]
+        val = self._linear(values)
+
+        # Multiply by migra bin width (~Integration)
+        return val * (bands / e_true)
+
+    def _get_response_cached(self, offsets, e_true, e_reco, offset_quantum=None):
+        """Response matrices for several offsets, using the response cache.
+
+        All offsets not found in the cache are evaluated in one call of
+        `_eval_response`.
+        """
+        offsets = np.atleast_1d(Angle(offsets).to('deg').value).astype(float)
+        if offset_quantum is not None:
+            quantum = Angle(offset_quantum).to('deg').value
+            offsets = np.round(offsets / quantum) * quantum
+
+        e_true_nodes = e_true.log_centers.to('TeV').value
+        binning = (tuple(e_true.to('TeV').value), tuple(e_reco.to('TeV').value))
+        keys = [(offset,) + binning for offset in offsets]
+
+        cache = self._response_cache
+        missing = []
+        for key in keys:
+            if key not in cache and key[0] not in missing:
+                missing.append(key[0])
+
+        if missing:
+            response = self._eval_response(np.array(missing), e_true_nodes, e_reco)
+            for offset, matrix in zip(missing, response):
+                cache[(offset,) + binning] = matrix
+
+        matrices = []
+        for key in keys:
+            # Re-insert to mark as most recently used
+            matrix = cache.pop(key)
+            cache[key] = matrix
+            matrices.append(matrix)
+
+        while len(cache) > self.response_cache_size:
+            cache.popitem(last=False)
+
+        return matrices
+
+    def to_energy_dispersion(self, offset, e_true=None, e_reco=None,
+                             offset_quantum=None):
         """Detector response R(Delta E_reco, Delta E_true)
 
         Probability to reconstruct an energy in a given true energy band
         in a given reconstructed energy band
 
+        The response matrices are cached per offset and energy binning
+        (see `response_cache_size`), so repeated calls, e.g. for several
+        observations sharing the same IRF, are cheap.
+
         Parameters
         ----------
         offset : `~astropy.coordinates.Angle`
@@ -642,6 +830,9 @@ class EnergyDispersion2D(object):
             True energy axis
         e_reco : `~gammapy.utils.energy.EnergyBounds`
             Reconstructed energy axis
+        offset_quantum : `~astropy.coordinates.Angle`, optional
+            If given, the offset is rounded to a multiple of this value
+            before evaluation, so that close offsets share a cached result.
 
         Returns
         -------
@@ -649,17 +840,42 @@ class EnergyDispersion2D(object):
             Energy disperion matrix
         """
         offset = Angle(offset)
-        e_true = self.ebounds if e_true is None else EnergyBounds(e_true)
-        e_reco = self.ebounds if e_reco is None else EnergyBounds(e_reco)
+        if offset.size != 1:
+            raise ValueError('Use to_energy_dispersion_list for several offsets')
 
-        rm = []
+        edisps = self.to_energy_dispersion_list(offset, e_true=e_true, e_reco=e_reco,
+                                                offset_quantum=offset_quantum)
+        return edisps[0]
 
-        for energy in e_true.log_centers:
-            vec = self.get_response(offset=offset, e_true=energy, e_reco=e_reco)
-            rm.append(vec)
+    def to_energy_dispersion_list(self, offsets, e_true=None, e_reco=None,
+                                  offset_quantum=None):
+        """Detector response matrices for several offsets.
 
-        rm = np.asarray(rm)
-        return EnergyDispersion(data=rm, e_true=e_true, e_reco=e_reco)
+        Same as `to_energy_dispersion`, but all offsets are evaluated at
+        once, which is much faster than calling `to_energy_dispersion`
+        in a loop.
+
+        Parameters
+        ----------
+        offsets : `~astropy.coordinates.Angle`
+            Offsets
+        e_true : `~gammapy.utils.energy.EnergyBounds`, None
+            True energy axis
+        e_reco : `~gammapy.utils.energy.EnergyBounds`
+            Reconstructed energy axis
+        offset_quantum : `~astropy.coordinates.Angle`, optional
+            Offset rounding, see `to_energy_dispersion`
+
+        Returns
+        -------
+        edisps : list of `~gammapy.irf.EnergyDispersion`
+            Energy dispersion matrices, one per offset
+        """
+        e_true = self.ebounds if e_true is None else EnergyBounds(e_true)
+        e_reco = self.ebounds if e_reco is None else EnergyBounds(e_reco)
+
+        matrices = self._get_response_cached(offsets, e_true, e_reco, offset_quantum)
+        return [EnergyDispersion(data=rm, e_true=e_true, e_reco=e_reco) for rm in matrices]
 
     def get_response(self, offset, e_true, e_reco=None):
         """Detector response R(Delta E_reco, E_true)
@@ -691,19 +907,18 @@ class EnergyDispersion2D(object):
             e_reco = EnergyBounds.from_lower_and_upper_bounds(
                 self.migra_lo * e_true, self.migra_hi * e_true)
             migra = self.migra
+            val = self.evaluate(offset=offset, e_true=e_true, migra=migra)
 
-        # Translate given e_reco binning to migra at bin center
-        else:
-            e_reco = EnergyBounds(e_reco)
-            center = e_reco.log_centers
-            migra = center / e_true
-
-        val = self.evaluate(offset=offset, e_true=e_true, migra=migra)
+            # Multiply by migra bin width (~Integration)
+            rv = val * (e_reco.bands / e_true)
+            return rv.value
 
-        # Multiply by migra bin width (~Integration)
-        rv = val * (e_reco.bands / e_true)
+        # Translate given e_reco binning to migra at bin center
+        offset = np.atleast_1d(Angle(offset).to('deg').value)
+        e_true = np.atleast_1d(e_true.to('TeV').value)
+        rv = self._eval_response(offset, e_true, EnergyBounds(e_reco))
 
-        return rv.value
+        return rv.squeeze()
 
     def plot_migration(self, ax=None, offset=None, e_true=None,
                        migra=None, **kwargs):
@@ -817,15 +1032,14 @@ class EnergyDispersion2D(object):
         return fig
 
     def _prepare_linear_interpolator(self, interp_kwargs):
-        from scipy.interpolate import RegularGridInterpolator
-
-        x = self.offset
+        x = self.offset.to('deg').value
         y = self.migra
-        z = np.log10(self.energy.value)
+        z = np.log10(self.energy.to('TeV').value)
         points = (x, y, z)
         values = self.dispersion
 
-        self._linear = RegularGridInterpolator(points, values, **interp_kwargs)
+        self._linear = GridInterpolator(points, values, **interp_kwargs)
+        self._response_cache = OrderedDict()
 
     def info(self):
         """Print some basic info.
@@ -7,6 +7,7 @@ from astropy.io import fits
 from astropy.units import Quantity
 from astropy.coordinates import Angle
 from ..utils.array import array_stats_str
+from ..utils.nddata import GridInterpolator
 from ..utils.fits import table_to_fits_table
 from ..utils.energy import Energy
 from ..utils.scripts import make_path
@@ -51,6 +52,7 @@ class PSF3D(object):
         self.psf_value = psf_value.to('sr^-1')
         self.energy_thresh_lo = energy_thresh_lo.to('TeV')
         self.energy_thresh_hi = energy_thresh_hi.to('TeV')
+        self._interpolators = dict()
 
     def info(self):
         """Print some basic info.
@@ -179,6 +181,9 @@ class PSF3D(object):
                  interp_kwargs=None):
         """Interpolate the value of the `EnergyOffsetArray` at a given offset and Energy.
 
+        The interpolator is created on the first call and then re-used
+        for all calls with the same ``interp_kwargs``.
+
         Parameters
         ----------
         energy : `~astropy.units.Quantity`
@@ -188,17 +193,13 @@ class PSF3D(object):
         rad : `~astropy.coordinates.Angle`
             offset value
         interp_kwargs : dict
-            option for interpolation for `~scipy.interpolate.RegularGridInterpolator`
+            option for interpolation for `~gammapy.utils.nddata.GridInterpolator`
 
         Returns
         -------
         values : `~astropy.units.Quantity`
-            Interpolated value
+            Interpolated value, with shape ``(rad, offset, energy)``
         """
-        if not interp_kwargs:
-            interp_kwargs = dict(bounds_error=False, fill_value=None)
-
-        from scipy.interpolate import RegularGridInterpolator
         if energy is None:
             energy = self.energy_logcenter()
         if offset is None:
@@ -210,17 +211,22 @@ class PSF3D(object):
         offset = Angle(offset).to('deg')
         rad = Angle(rad).to('deg')
 
-        energy_bin = self.energy_logcenter()
+        interpolator = self._get_interpolator(interp_kwargs)
+        data_interp = interpolator.outer([rad.value, offset.value, energy.value])
+        return Quantity(data_interp, self.psf_value.unit)
+
+    def _get_interpolator(self, interp_kwargs=None):
+        """Get the (cached) interpolator for the given ``interp_kwargs``."""
+        if not interp_kwargs:
+            interp_kwargs = dict(bounds_error=False, fill_value=None)
 
-        offset_bin = self.offset.to('deg')
-        rad_bin = self.rad_center()
-        points = (rad_bin, offset_bin, energy_bin)
-        interpolator = RegularGridInterpolator(points, self.psf_value, **interp_kwargs)
-        rr, off, ee = np.meshgrid(rad.value, offset.value, energy.value, indexing='ij')
-        shape = ee.shape
-        pix_coords = np.column_stack([rr.flat, off.flat, ee.flat])
-        data_interp = interpolator(pix_coords)
-        return Quantity(data_interp.reshape(shape), self.psf_value.unit)
+        key = tuple(sorted(interp_kwargs.items()))
+        if key not in self._interpolators:
+            points = (self.rad_center().value, self.offset.to('deg').value,
+                      self.energy_logcenter().value)
+            self._interpolators[key] = GridInterpolator(points, self.psf_value.value,
+                                                        **interp_kwargs)
+        return self._interpolators[key]
 
     def to_energy_dependent_table_psf(self, theta=None, exposure=None):
         """
@@ -259,7 +265,7 @@ class PSF3D(object):
         theta : `~astropy.coordinates.Angle`
             Offset in the field of view. Default theta = 0 deg
         interp_kwargs : dict
-            Option for interpolation for `~scipy.interpolate.RegularGridInterpolator`
+            Option for interpolation for `~gammapy.utils.nddata.GridInterpolator`
 
         Returns
         -------
@@ -279,7 +285,15 @@ class PSF3D(object):
         return table_psf
 
     def containment_radius(self, energy, theta=None, fraction=0.68, interp_kwargs=None):
-        """Containment radius.
+        r"""Containment radius.
+
+        The radial PSF profiles for all pairs of ``energy`` and ``theta``
+        are evaluated at once. The containment fraction as a function of
+        radius is obtained as cumulative (trapezoidal) integral of
+        :math:`dP / d\theta = 2 \pi \theta dP / d\Omega` over the
+        rad bin centers, and the radius is found by linear interpolation.
+        This gives the same results as
+        ``self.to_table_psf(energy, theta).containment_radius(fraction)``.
 
         Parameters
         ----------
@@ -289,32 +303,71 @@ class PSF3D(object):
             Offset in the field of view. Default theta = 0 deg
         fraction : float
             Containment fraction. Default fraction = 0.68
+        interp_kwargs : dict
+            Option for interpolation for `~gammapy.utils.nddata.GridInterpolator`
 
         Returns
         -------
         radius : `~astropy.units.Quantity`
-            Containment radius in deg
+            Containment radius in deg, with shape ``(energy, theta)``
+            (squeezed). NaN where the PSF is not defined, i.e. where it
+            has NaN or zero values.
         """
 
         # Defaults
-        theta = theta or Angle(0, 'deg')
-        if energy.ndim == 0:
-            energy = Quantity([energy.value], energy.unit)
-        if theta.ndim == 0:
-            theta = Quantity([theta.value], theta.unit)
-
-        unit = None
-        radius = np.zeros((energy.size, theta.size))
-        for e in range(energy.size):
-            for t in range(theta.size):
-                psf = self.to_table_psf(energy[e], theta[t], interp_kwargs)
-                if psf == None:
-                    radius[e, t] = np.nan
-                    continue
-                r = psf.containment_radius(fraction)
-                radius[e, t] = r.value
-                unit = r.unit
-        return Quantity(radius.squeeze(), unit)
+        if theta is None:
+            theta = Angle(0, 'deg')
+
+        energy = Quantity(energy, 'TeV', ndmin=1)
+        theta = Quantity(theta, 'deg', ndmin=1)
+
+        # Axis order (energy, theta, rad)
+        dp_domega = self.evaluate(energy, theta, interp_kwargs=interp_kwargs)
+        dp_domega = dp_domega.value.transpose()
+
+        rad = self.rad_center().to('radian').value
+        dp_dtheta = 2 * np.pi * rad * dp_domega
+
+        # The integral from 0 to the first rad bin center uses the linear
+        # extrapolation of the first segment, as in `TablePSF`
+        slope = (dp_dtheta[..., 1] - dp_dtheta[..., 0]) / (rad[1] - rad[0])
+        cdf = np.empty_like(dp_dtheta)
+        cdf[..., 0] = rad[0] * (dp_dtheta[..., 0] - 0.5 * rad[0] * slope)
+        cdf[..., 1:] = 0.5 * (dp_dtheta[..., 1:] + dp_dtheta[..., :-1]) * np.diff(rad)
+        cdf = np.cumsum(cdf, axis=-1)
+
+        radius = self._containment_radius_from_cdf(rad, cdf.reshape(-1, len(rad)), fraction)
+        invalid = np.any(np.isnan(dp_domega) | (dp_domega == 0), axis=-1)
+        radius[invalid.flat] = np.nan
+
+        radius = Angle(radius.reshape(invalid.shape), 'radian').to('deg')
+        return Quantity(radius.squeeze())
+
+    @staticmethod
+    def _containment_radius_from_cdf(rad, cdf, fraction):
+        """Invert a 2-dim array of cumulative profiles ``cdf[profile, rad]``.
+
+        As in `~gammapy.irf.TablePSF`, only the part where the cumulative
+        profile is strictly increasing is used, and the linear interpolation
+        is extrapolated for fractions outside of that range.
+        """
+        n_profiles, n_rad = cdf.shape
+        n_valid = np.argmax(np.diff(cdf, axis=-1) <= 0, axis=-1)
+        n_valid[n_valid == 0] = n_rad
+
+        valid = np.arange(n_rad) < n_valid[:, np.newaxis]
+        idx = np.sum((cdf < fraction) & valid, axis=-1) - 1
+        idx = np.clip(idx, 0, np.maximum(n_valid - 2, 0))
+
+        rows = np.arange(n_profiles)
+        cdf_lo, cdf_hi = cdf[rows, idx], cdf[rows, np.minimum(idx + 1, n_rad - 1)]
+        rad_lo, rad_hi = rad[idx], rad[np.minimum(idx + 1, n_rad - 1)]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            radius = rad_lo + (fraction - cdf_lo) * (rad_hi - rad_lo) / (cdf_hi - cdf_lo)
+
+        radius[n_valid < 2] = np.nan
+        return radius
 
     def plot_containment_vs_energy(self, fractions=[0.68, 0.95],
                                    thetas=Angle([0, 1], 'deg'), ax=None, **kwargs):
@@ -10,6 +10,7 @@ from ..utils.scripts import make_path
 from ..utils.array import array_stats_str
 from ..utils.energy import Energy, EnergyBounds
 from ..utils.fits import table_to_fits_table
+from ..utils.nddata import GridInterpolator
 from . import EnergyDependentTablePSF
 
 __all__ = ['PSFKing']
@@ -48,6 +49,7 @@ class PSFKing(object):
 
         self.energy_thresh_lo = energy_thresh_lo.to('TeV')
         self.energy_thresh_hi = energy_thresh_hi.to('TeV')
+        self._interpolators = dict()
 
     def info(self):
         """Print some basic info.
@@ -176,7 +178,13 @@ class PSFKing(object):
         return term1 * term2 * term3
 
     def evaluate(self, energy=None, offset=None, interp_kwargs=None):
-        """Interpolate the value of the `EnergyOffsetArray` at a given offset and Energy.
+        """Interpolate the PSF parameters at a given offset and energy.
+
+        ``gamma`` and ``sigma`` are interpolated linearly in offset and
+        log(energy). Energies and offsets outside the range of the
+        nodes are clipped to the first / last node. ``energy`` and
+        ``offset`` can be arrays, the parameters are returned with
+        their broadcast shape.
 
         Parameters
         ----------
@@ -185,31 +193,71 @@ class PSFKing(object):
         offset : `~astropy.coordinates.Angle`
             offset value
         interp_kwargs : dict
-            option for interpolation for `~scipy.interpolate.RegularGridInterpolator`
+            option for interpolation for `~gammapy.utils.nddata.GridInterpolator`,
+            e.g. ``dict(method='nearest')``
 
         Returns
         -------
-        values : `~astropy.units.Quantity`
-            Interpolated value
+        values : dict
+            Interpolated parameters ``gamma`` (`~numpy.ndarray`) and
+            ``sigma`` (`~astropy.coordinates.Angle`)
         """
+        energy = Energy(energy).to('TeV').value
+        offset = Angle(offset).to('deg').value
+
+        interp_gamma, interp_sigma = self._get_interpolators(interp_kwargs)
+        offset_nodes, energy_nodes = interp_gamma.points
+        x = np.clip(offset, offset_nodes[0], offset_nodes[-1])
+        y = np.clip(np.log10(energy), energy_nodes[0], energy_nodes[-1])
+
         param = dict()
-        energy = Energy(energy)
-        offset = Angle(offset)
+        param["gamma"] = interp_gamma([x, y])
+        param["sigma"] = Angle(interp_sigma([x, y]), 'deg')
+        return param
 
-        # Find nearest energy value
-        i = np.argmin(np.abs(self.energy - energy))
-        j = np.argmin(np.abs(self.offset - offset))
+    def _get_interpolators(self, interp_kwargs=None):
+        """Get the (cached) ``gamma`` and ``sigma`` interpolators."""
+        interp_kwargs = interp_kwargs or dict()
+        key = tuple(sorted(interp_kwargs.items()))
 
-        # TODO: Use some kind of interpolation to get PSF
-        # parameters for every energy and theta
+        if key not in self._interpolators:
+            kwargs = dict(bounds_error=False, fill_value=None)
+            kwargs.update(interp_kwargs)
+            points = (self.offset.to('deg').value, np.log10(self.energy.to('TeV').value))
+            gamma = GridInterpolator(points, np.asarray(self.gamma), **kwargs)
+            sigma = GridInterpolator(points, self.sigma.to('deg').value, **kwargs)
+            self._interpolators[key] = gamma, sigma
 
-        # Select correct gauss parameters for given energy and theta
-        sigma = self.sigma[j][i]
-        gamma = self.gamma[j][i]
+        return self._interpolators[key]
 
-        param["sigma"] = sigma
-        param["gamma"] = gamma
-        return param
+    def evaluate_psf(self, energy, offset, rad, interp_kwargs=None):
+        """Evaluate the PSF at a given energy, offset and distance from the PSF center.
+
+        The King parameters are interpolated with `evaluate` and
+        `evaluate_direct` is called on the broadcast arrays, so e.g.
+        ``evaluate_psf(energy[:, None, None], offset[None, :, None], rad)``
+        gives the PSF for all energies and offsets at once.
+
+        Parameters
+        ----------
+        energy : `~astropy.units.Quantity`
+            Energy
+        offset : `~astropy.coordinates.Angle`
+            Offset in the field of view
+        rad : `~astropy.coordinates.Angle`
+            Offset from PSF center
+        interp_kwargs : dict
+            option for interpolation for `~gammapy.utils.nddata.GridInterpolator`
+
+        Returns
+        -------
+        psf_value : `~astropy.units.Quantity`
+            PSF value in sr^-1, with the broadcast shape of the inputs
+        """
+        param = self.evaluate(energy, offset, interp_kwargs)
+        rad = Angle(rad).to('deg').value
+        psf_value = self.evaluate_direct(rad, param["gamma"], param["sigma"].value)
+        return Quantity(psf_value, 'deg^-2').to('sr^-1')
 
     def to_table_psf(self, theta=None, offset=None, exposure=None):
         """
@@ -235,13 +283,13 @@ class PSFKing(object):
         energies = self.energy
 
         # Defaults
-        theta = theta or Angle(0, 'deg')
-        offset = offset or Angle(np.arange(0, 1.5, 0.005), 'deg')
-        psf_value = Quantity(np.empty((len(energies), len(offset))), 'deg^-2')
+        if theta is None:
+            theta = Angle(0, 'deg')
+        if offset is None:
+            offset = Angle(np.arange(0, 1.5, 0.005), 'deg')
 
-        for i, energy in enumerate(energies):
-            param_king = self.evaluate(energy, theta)
-            psf_value[i] = Quantity(self.evaluate_direct(offset, param_king["gamma"], param_king["sigma"]), 'deg^-2')
+        offset = Angle(offset)
+        psf_value = self.evaluate_psf(energies[:, np.newaxis], theta, offset)
 
         return EnergyDependentTablePSF(energy=energies, offset=offset,
                                        exposure=exposure, psf_value=psf_value)
@@ -620,9 +620,72 @@ class EnergyDependentTablePSF(object):
         radii = [psf.containment_radius(fraction) for psf in psfs]
         return Quantity(radii)
 
+    def containment_fraction(self, energy, radius, interp_kwargs=None):
+        """Containment fraction for arrays of energies and radii.
+
+        The PSF is interpolated at all energies at once (see `evaluate`) and
+        :math:`dP / d\\theta` is integrated over offset for all of them with
+        the trapezoidal rule. The integral from 0 to the first offset node
+        uses the linear extrapolation of the first segment. This is exact for
+        the PSF linearly interpolated in offset, i.e. gives the same result
+        as ``table_psf_at_energy(energy).integral(0 deg, radius)``.
+
+        Radii are clipped to the range from 0 to the largest offset of the
+        PSF. Energies where the interpolated PSF is not finite give NaN.
+
+        Parameters
+        ----------
+        energy : `~astropy.units.Quantity`
+            Energy
+        radius : `~astropy.coordinates.Angle`
+            Integration radius, broadcast against ``energy``
+        interp_kwargs : dict
+            Interpolation options, passed to `evaluate`
+
+        Returns
+        -------
+        fraction : `~numpy.ndarray`
+            Containment fraction, with the broadcast shape of ``energy`` and ``radius``
+        """
+        energy = Quantity(energy)
+        energy_value, radius = np.broadcast_arrays(energy.value, Angle(radius).radian)
+        shape = energy_value.shape
+
+        # Interpolate the PSF once per distinct energy
+        energy_unique, energy_idx = np.unique(energy_value, return_inverse=True)
+        psf_value = self.evaluate(Quantity(energy_unique, energy.unit), None, interp_kwargs)
+        psf_value = psf_value.to('sr^-1').value
+
+        offset = self.offset.to('radian').value
+        dp_dtheta = 2 * np.pi * offset * psf_value
+
+        # The integral from 0 to the first offset node uses the linear
+        # extrapolation of the first segment, as in `TablePSF`
+        slope = (dp_dtheta[:, 1] - dp_dtheta[:, 0]) / (offset[1] - offset[0])
+        cdf = np.empty_like(dp_dtheta)
+        cdf[:, 0] = offset[0] * (dp_dtheta[:, 0] - 0.5 * offset[0] * slope)
+        cdf[:, 1:] = 0.5 * (dp_dtheta[:, 1:] + dp_dtheta[:, :-1]) * np.diff(offset)
+        cdf = np.cumsum(cdf, axis=1)
+
+        # Add the integral from the offset node below the radius (or the first
+        # node, for radii below it) to the radius
+        radius = np.clip(radius.ravel(), 0, offset[-1])
+        idx = np.clip(np.searchsorted(offset, radius, side='right') - 1, 0, len(offset) - 2)
+        delta = radius - offset[idx]
+        lo = dp_dtheta[energy_idx, idx]
+        hi = dp_dtheta[energy_idx, idx + 1]
+        slope = (hi - lo) / (offset[idx + 1] - offset[idx])
+        fraction = cdf[energy_idx, idx] + delta * (lo + 0.5 * slope * delta)
+
+        valid = np.all(np.isfinite(psf_value), axis=1)
+        fraction = np.where(valid[energy_idx], fraction, np.nan)
+        return fraction.reshape(shape)
+
     def integral(self, energy, offset_min, offset_max):
         """Containment fraction.
 
+        See `containment_fraction`.
+
         Parameters
         ----------
         energy : `~astropy.units.Quantity`
@@ -635,10 +698,9 @@ class EnergyDependentTablePSF(object):
         fraction : array_like
             Containment fraction (in range 0 .. 1)
         """
-        # TODO: useless at the moment ... support array inputs or remove!
-
-        psf = self.table_psf_at_energy(energy)
-        return psf.integral(offset_min, offset_max)
+        fraction_max = self.containment_fraction(energy, offset_max)
+        fraction_min = self.containment_fraction(energy, offset_min)
+        return fraction_max - fraction_min
 
     def info(self):
         """Print basic info."""
@@ -103,6 +103,19 @@ def test_EffectiveAreaTable2D_generic():
     desired = np.zeros([nbinse, nx, ny]).shape
     assert_equal(actual, desired)
 
+    # case 7: broadcast offset = 2Darray, energy = 1Darray
+    offset = np.linspace(0.2, 0.3, nx * nbinse).reshape(nx, nbinse) * u.deg
+    energy = np.logspace(0, 1, nbinse) * u.TeV
+    actual = aeff.evaluate(offset=offset, energy=energy, outer=False)
+    assert_equal(actual.shape, (nx, nbinse))
+    desired = aeff.evaluate(offset=offset[3, 2], energy=energy[2])
+    assert_allclose(actual[3, 2], desired)
+
+    # Data containing nan
+    aeff.data = np.array([[np.nan, np.nan], [1, 1], [2, 2]]) * u.cm * u.cm
+    actual = aeff.evaluate(offset=0.25 * u.deg, energy=aeff.energy.nodes)
+    assert_allclose(actual.value, [np.nan, 1, 2])
+
     # Misc functions
     assert 'EffectiveAreaTable2D' in str(aeff)
 
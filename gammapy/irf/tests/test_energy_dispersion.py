@@ -46,6 +46,29 @@ def test_EnergyDispersion_write(tmpdir):
     edisp2 = EnergyDispersion.read(writename)
     actual = edisp2.pdf_matrix[indices]
     assert_allclose(actual, desired)
+    assert_allclose(edisp2.pdf_matrix, edisp.pdf_matrix)
+
+
+@requires_dependency('scipy')
+def test_EnergyDispersion_bands():
+    e_true = np.logspace(-1, 2, 31) * u.TeV
+    e_reco = np.logspace(-1, 2, 21) * u.TeV
+    edisp = EnergyDispersion.from_gauss(e_true=e_true, e_reco=e_reco, sigma=0.1)
+
+    bands = edisp.bands
+    assert bands.density < 0.5
+    assert_allclose(bands.to_dense(), edisp.pdf_matrix)
+
+    data = np.arange(30.)
+    desired = np.dot(data, edisp.pdf_matrix)
+    assert_allclose(edisp.apply(data), desired)
+    assert_allclose(edisp.apply(data, e_reco=e_reco), desired)
+    data = np.vstack([data, 2 * data])
+    assert_allclose(bands.dot(data), np.dot(data, edisp.pdf_matrix))
+
+    # The cached bands are re-computed for new data
+    edisp.data = 2 * edisp.data
+    assert_allclose(edisp.bands.to_dense(), edisp.pdf_matrix)
 
 
 @requires_dependency('scipy')
@@ -92,3 +115,17 @@ def test_EnergyDispersion2D():
     e_val = np.sqrt(e_true[2] * e_true[3])
     desired = edisp.get_response(offset, e_val, e_reco)
     assert_equal(actual, desired)
+
+    # Check RMF exporter for several offsets
+    offsets = Angle([0.612, 1.2, 0.612], 'deg')
+    rmfs = edisp.to_energy_dispersion_list(offsets, e_true=e_true, e_reco=e_reco)
+    assert len(rmfs) == 3
+    assert_allclose(rmfs[0].pdf_matrix, rmf.pdf_matrix)
+    assert_allclose(rmfs[2].pdf_matrix, rmf.pdf_matrix)
+    desired = edisp.to_energy_dispersion('1.2 deg', e_true=e_true, e_reco=e_reco)
+    assert_allclose(rmfs[1].pdf_matrix, desired.pdf_matrix)
+
+    # Check offset quantization
+    rmf = edisp.to_energy_dispersion('1.23 deg', e_true=e_true, e_reco=e_reco,
+                                     offset_quantum='0.1 deg')
+    assert_allclose(rmf.pdf_matrix, desired.pdf_matrix)
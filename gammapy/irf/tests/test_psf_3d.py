@@ -47,3 +47,25 @@ def test_PSF3D_write(tmpdir):
     assert_quantity_allclose(psf.rad_lo, psf2.rad_lo)
     assert_quantity_allclose(psf.rad_hi, psf2.rad_hi)
     assert_quantity_allclose(psf.psf_value, psf2.psf_value)
+
+
+@requires_dependency('scipy')
+@requires_data('gammapy-extra')
+def test_PSF3D_containment_radius():
+    filename = str(gammapy_extra.dir) + '/test_datasets/psf_table_023523.fits.gz'
+    psf = PSF3D.read(filename)
+
+    energy = Energy([1, 3, 10], 'TeV')
+    theta = Angle([0, 0.5, 1], 'deg')
+    radius = psf.containment_radius(energy, theta, fraction=0.68)
+    assert radius.shape == (3, 3)
+    assert radius.unit == 'deg'
+
+    # Compare with the radius computed via `TablePSF` for each pair
+    for idx_energy, idx_theta in [(0, 0), (1, 2), (2, 1)]:
+        table_psf = psf.to_table_psf(energy[idx_energy], theta[idx_theta])
+        expected = table_psf.containment_radius(0.68)
+        assert_quantity_allclose(radius[idx_energy, idx_theta], expected, rtol=1e-6)
+
+    radius = psf.containment_radius(Energy(1, 'TeV'), Angle(0.5, 'deg'))
+    assert radius.shape == ()
@@ -16,7 +16,8 @@ def psf_king():
 
 @requires_data('gammapy-extra')
 def test_psf_king_evaluate(psf_king):
-    energy = Quantity(1, "TeV")
+    # energy node closest to 1 TeV
+    energy = psf_king.energy[8]
     off1 = Angle(0, "deg")
     off2 = Angle(1, "deg")
     param_off1 = psf_king.evaluate(energy, off1)
@@ -27,6 +28,32 @@ def test_psf_king_evaluate(psf_king):
     assert_quantity_allclose(param_off1["sigma"], psf_king.sigma[0, 8])
     assert_quantity_allclose(param_off2["sigma"], psf_king.sigma[2, 8])
 
+    # Linear interpolation in offset and log(energy)
+    param = psf_king.evaluate(energy, psf_king.offset[:2].mean())
+    assert_quantity_allclose(param["gamma"], psf_king.gamma[:2, 8].mean())
+    energy = np.sqrt(psf_king.energy[8] * psf_king.energy[9])
+    param = psf_king.evaluate(energy, off1)
+    assert_quantity_allclose(param["sigma"], psf_king.sigma[0, 8:10].mean())
+
+    # Values outside the nodes are clipped to the nodes
+    param = psf_king.evaluate(Quantity(1e6, "TeV"), off1)
+    assert_quantity_allclose(param["gamma"], psf_king.gamma[0, -1])
+
+
+@requires_data('gammapy-extra')
+def test_psf_king_evaluate_psf(psf_king):
+    energy = Quantity([1, 10], "TeV")
+    theta = Angle([0, 0.3, 1], "deg")
+    rad = Angle(np.linspace(0, 0.5, 10), "deg")
+    psf_value = psf_king.evaluate_psf(energy[:, np.newaxis, np.newaxis],
+                                      theta[:, np.newaxis], rad)
+    assert psf_value.shape == (2, 3, 10)
+    assert psf_value.unit == "sr-1"
+
+    param = psf_king.evaluate(energy[1], theta[1])
+    expected = psf_king.evaluate_direct(rad, param["gamma"], param["sigma"])
+    assert_quantity_allclose(psf_value[1, 1], expected)
+
 
 @requires_data('gammapy-extra')
 def test_psf_king_to_table(psf_king):
@@ -107,7 +107,15 @@ def test_EnergyDependentTablePSF():
     # psf2 = psf.psf_in_energy_band(energy_band, spectrum)
 
     # TODO: test containment_radius
-    # TODO: test containment_fraction
+
+    radius = Angle([[0.1], [0.5]], 'deg')
+    actual = psf.containment_fraction(energies, radius)
+    assert actual.shape == (2, 2)
+    for idx, energy in enumerate(energies):
+        table_psf = psf.table_psf_at_energy(energy)
+        desired = table_psf.integral(Angle(0, 'deg'), radius[:, 0])
+        assert_allclose(actual[:, idx], desired, rtol=1e-6)
+
     # TODO: test info
     # TODO: test plotting methods
 
@@ -118,6 +126,33 @@ def test_EnergyDependentTablePSF():
 
     assert_allclose(actual, desired)
 
+
+@requires_dependency('scipy')
+def test_EnergyDependentTablePSF_containment_fraction():
+    # Offset grid not starting at 0, like bin centers
+    offset = Angle(np.linspace(0.05, 2, 40), 'deg')
+    energy = Quantity([1, 10, 100], 'GeV')
+    sigma = Angle([0.5, 0.2, 0.1], 'deg').radian[:, np.newaxis]
+    psf_value = np.exp(-0.5 * (offset.radian / sigma) ** 2) / (2 * np.pi * sigma ** 2)
+    psf = EnergyDependentTablePSF(energy=energy, offset=offset,
+                                  psf_value=Quantity(psf_value, 'sr^-1'))
+
+    radius = Angle([0, 0.02, 0.05, 0.13, 0.5, 3], 'deg')
+    actual = psf.containment_fraction(energy[:, np.newaxis], radius)
+    assert actual.shape == (3, 6)
+    assert_allclose(actual[:, 0], 0)
+    for idx in range(len(energy)):
+        table_psf = psf.table_psf_at_energy(energy[idx])
+        desired = table_psf.integral(Angle(0, 'deg'), radius)
+        assert_allclose(actual[idx], desired, rtol=1e-6)
+
+    # Undefined PSF values give NaN
+    psf.psf_value[1, 5] = np.nan
+    actual = psf.containment_fraction(energy, Angle(0.5, 'deg'))
+    assert np.isnan(actual[1])
+    assert np.isfinite(actual[2])
+
+
 @requires_data('gammapy-extra')
 @requires_dependency('matplotlib')
 def test_EnergyDependentTablePSF_plot():
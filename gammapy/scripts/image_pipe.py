@@ -1,6 +1,7 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
 import logging
+from multiprocessing import Pool, cpu_count
 import numpy as np
 from astropy.units import Quantity
 from astropy.table import QTable, Table
@@ -43,10 +44,16 @@ class SingleObsImageMaker(object):
         Minimum counts required for the observation (TODO: used how?)
     save_bkg_scale: bool
         True if you want to save the normalisation of the bkg computed outside the exlusion region in a Table
+    use_cutout : bool
+        If true, the images are computed only on the cutout of ``empty_image``
+        that contains the field of view, i.e. the pixels within ``offset_band[1]``
+        of the pointing position. Use `~gammapy.image.SkyImage.paste` to add
+        them to images of the full size.
     """
 
     def __init__(self, obs, empty_image,
-                 energy_band, offset_band, exclusion_mask=None, ncounts_min=0, save_bkg_scale=True):
+                 energy_band, offset_band, exclusion_mask=None, ncounts_min=0, save_bkg_scale=True,
+                 use_cutout=False):
         # Select the events in the given energy and offset range
         self.energy_band = energy_band
         self.offset_band = offset_band
@@ -56,6 +63,15 @@ class SingleObsImageMaker(object):
         self.events = events.select_offset(self.offset_band)
 
         self.images = SkyImageList()
+        self.obs_center = obs.pointing_radec
+        if use_cutout:
+            empty_image = empty_image.cutout_circle(self.obs_center, self.offset_band[1])
+            if empty_image is None:
+                raise ValueError('Field of view of observation {} does not overlap '
+                                 'with the image.'.format(self.obs_id))
+            if exclusion_mask:
+                exclusion_mask = exclusion_mask.cutout_circle(self.obs_center, self.offset_band[1])
+
         self.empty_image = empty_image
         self.header = self.empty_image.to_image_hdu().header
         if exclusion_mask:
@@ -67,7 +83,6 @@ class SingleObsImageMaker(object):
         self.edisp = obs.edisp
         self.psf = obs.psf
         self.bkg = obs.bkg
-        self.obs_center = obs.pointing_radec
         self.livetime = obs.observation_live_time_duration
         self.save_bkg_scale = save_bkg_scale
         if self.save_bkg_scale:
@@ -289,9 +304,19 @@ class StackedObsImageMaker(object):
             self.table_bkg_scale = Table(names=["OBS_ID", "bkg_scale"])
 
     def make_images(self, make_background_image=False, bkg_norm=True,
-                    spectral_index=2.3, for_integral_flux=False, radius=10):
+                    spectral_index=2.3, for_integral_flux=False, radius=10, n_jobs=1):
         """Compute the counts, bkg, exposure, excess and significance images for a set of observation.
 
+        The images of each observation are computed on the cutout containing
+        its field of view (see ``use_cutout`` in `SingleObsImageMaker`) and
+        then added to the total images.
+
+        With ``n_jobs > 1`` the observations are processed in a pool of worker
+        processes. Each worker loads the observations from its own
+        `~gammapy.data.DataStore` and only returns the cutout images, which
+        are added to the total images in the order of ``obs_table``. The
+        results do not depend on ``n_jobs``.
+
         Parameters
         ----------
         make_background_image : bool
@@ -304,29 +329,49 @@ class StackedObsImageMaker(object):
             True if you want that the total excess / exposure gives the integrated flux
         radius : float
             Disk radius in pixels for the significance image
+        n_jobs : int, optional
+            Number of worker processes. If None, the number of CPUs is used.
         """
+        config = dict(
+            empty_image=self.empty_image, energy_band=self.energy_band,
+            offset_band=self.offset_band, exclusion_mask=self.exclusion_mask,
+            ncounts_min=self.ncounts_min, make_background_image=make_background_image,
+            bkg_norm=bkg_norm, spectral_index=spectral_index,
+            for_integral_flux=for_integral_flux,
+        )
+        obs_ids = list(self.obs_table['OBS_ID'])
+        n_jobs = n_jobs or cpu_count()
 
         total_counts = SkyImage.empty_like(self.empty_image, name='counts')
         if make_background_image:
             total_bkg = SkyImage.empty_like(self.empty_image, name='bkg')
             total_exposure = SkyImage.empty_like(self.empty_image, name='exposure')
 
-        for obs_id in self.obs_table['OBS_ID']:
-            obs = self.data_store.obs(obs_id)
-            obs_image = SingleObsImageMaker(obs, self.empty_image, self.energy_band, self.offset_band,
-                                            self.exclusion_mask, self.ncounts_min)
-            if len(obs_image.events) <= self.ncounts_min:
-                continue
-            else:
-                obs_image.counts_image()
-                total_counts.data += obs_image.images['counts'].data
+        pool = None
+        if n_jobs == 1 or len(obs_ids) <= 1:
+            results = (_make_obs_images(self.data_store, obs_id, **config) for obs_id in obs_ids)
+        else:
+            log.info('Using {} processes to compute the images.'.format(n_jobs))
+            # Each worker unpickles its own copy of the data store, with its own cache
+            pool = Pool(processes=n_jobs, initializer=_init_worker,
+                        initargs=(self.data_store, config))
+            results = pool.imap(_make_obs_images_worker, obs_ids)
+
+        try:
+            for obs_id, result in zip(obs_ids, results):
+                if result is None:
+                    continue
+                images, bkg_scale = result
+                total_counts.paste(images['counts'])
                 if make_background_image:
-                    obs_image.bkg_image(bkg_norm)
-                    if self.save_bkg_scale:
-                        self.table_bkg_scale.add_row(obs_image.table_bkg_scale[0])
-                    obs_image.exposure_image(spectral_index, for_integral_flux)
-                    total_bkg.data += obs_image.images['bkg'].data
-                    total_exposure.data += obs_image.images['exposure'].data
+                    if self.save_bkg_scale and bkg_scale is not None:
+                        self.table_bkg_scale.add_row([obs_id, bkg_scale])
+                    total_bkg.paste(images['bkg'])
+                    total_exposure.paste(images['exposure'])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         self.images['counts'] = total_counts
 
@@ -356,3 +401,49 @@ class StackedObsImageMaker(object):
         total_excess = SkyImage.empty_like(self.empty_image, name='excess')
         total_excess.data = self.images['counts'].data - self.images['bkg'].data
         self.images['excess'] = total_excess
+
+
+def _make_obs_images(data_store, obs_id, empty_image, energy_band, offset_band, exclusion_mask,
+                     ncounts_min, make_background_image, bkg_norm, spectral_index, for_integral_flux):
+    """Compute the cutout images of one observation for `StackedObsImageMaker`.
+
+    Returns ``None`` if the observation is skipped, otherwise a tuple
+    ``(images, bkg_scale)`` with a `~gammapy.image.SkyImageList` of the
+    cutout images and the background scale (``None`` if not computed).
+    """
+    obs = data_store.obs(obs_id)
+    if empty_image.cutout_circle(obs.pointing_radec, offset_band[1]) is None:
+        log.info('Skipping observation {}: outside of the image'.format(obs_id))
+        return None
+
+    obs_image = SingleObsImageMaker(obs, empty_image, energy_band, offset_band,
+                                    exclusion_mask, ncounts_min, use_cutout=True)
+    if len(obs_image.events) <= ncounts_min:
+        return None
+
+    images = SkyImageList()
+    bkg_scale = None
+    obs_image.counts_image()
+    images['counts'] = obs_image.images['counts']
+    if make_background_image:
+        obs_image.bkg_image(bkg_norm)
+        if len(obs_image.table_bkg_scale):
+            bkg_scale = obs_image.table_bkg_scale[0]['bkg_scale']
+        obs_image.exposure_image(spectral_index, for_integral_flux)
+        images['bkg'] = obs_image.images['bkg']
+        images['exposure'] = obs_image.images['exposure']
+
+    return images, bkg_scale
+
+
+_worker = dict()
+
+
+def _init_worker(data_store, config):
+    """Set up a worker process of `StackedObsImageMaker.make_images`."""
+    _worker['data_store'] = data_store
+    _worker['config'] = config
+
+
+def _make_obs_images_worker(obs_id):
+    return _make_obs_images(_worker['data_store'], obs_id, **_worker['config'])
@@ -73,3 +73,15 @@ def test_image_pipe(tmpdir):
     assert_allclose(images['excess'].data.sum(), 346.8486363336217, atol=3)
     assert_allclose(image_maker.table_bkg_scale[0]["bkg_scale"], 0.7495491394090461)
     assert_allclose(image_maker.table_bkg_scale[1]["bkg_scale"], 0.725116527521305)
+
+    # Parallel processing gives the same result
+    image_maker_parallel = StackedObsImageMaker(
+        empty_image=ref_image, energy_band=energy_band, offset_band=offset_band, data_store=data_store,
+        obs_table=data_store.obs_table, exclusion_mask=exclusion_mask,
+    )
+    image_maker_parallel.make_images(make_background_image=True, for_integral_flux=True, radius=10.,
+                                     n_jobs=2)
+    for name in ['counts', 'bkg', 'exposure']:
+        assert_allclose(image_maker_parallel.images[name].data, images[name].data)
+    assert_allclose(image_maker_parallel.table_bkg_scale['bkg_scale'],
+                    image_maker.table_bkg_scale['bkg_scale'])
@@ -19,5 +19,6 @@ from .utils import *
 from .extract import *
 from .simulation import *
 from .obs_group import *
+from .fit_engine import *
 from .fit import *
 from .results import *
@@ -2,8 +2,11 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 import logging
 import os
+from multiprocessing import Pool, cpu_count
+from time import time
 import numpy as np
 import astropy.units as u
+from astropy.table import Table, Column
 from regions import CircleSkyRegion
 from ..extern.pathlib import Path
 from ..utils.scripts import make_path
@@ -56,6 +59,8 @@ class SpectrumExtraction(object):
     """True energy axis to be used if not specified otherwise"""
     DEFAULT_RECO_ENERGY = np.logspace(-2, 2, 73) * u.TeV
     """Reconstruced energy axis to be used if not specified otherwise"""
+    TIMING_STEPS = ('events', 'off_pha', 'arf', 'rmf', 'containment')
+    """Extraction steps listed in the ``timing`` table"""
 
     # NOTE : The default true binning is not used in the test due to
     # extrapolation issues
@@ -71,6 +76,8 @@ class SpectrumExtraction(object):
         self.e_reco = e_reco or self.DEFAULT_RECO_ENERGY
         self.e_true = e_true or self.DEFAULT_TRUE_ENERGY
         self._observations = None
+        self.timing = None
+        self.timing_background = None
         self.containment_correction = containment_correction
         if self.containment_correction and not isinstance(target.on_region,
                                                           CircleSkyRegion):
@@ -89,7 +96,7 @@ class SpectrumExtraction(object):
             self.extract_spectrum()
         return self._observations
 
-    def run(self, outdir=None):
+    def run(self, outdir=None, n_jobs=1):
         """Run all steps
 
         Extract spectrum, update observation table, filter observations,
@@ -99,6 +106,8 @@ class SpectrumExtraction(object):
         ----------
         outdir : Path, str
             directory to write results files to
+        n_jobs : int, optional
+            Number of worker processes, see `extract_spectrum`
         """
         cwd = Path.cwd()
         outdir = cwd if outdir is None else make_path(outdir)
@@ -107,7 +116,7 @@ class SpectrumExtraction(object):
         if not isinstance(self.background, list):
             log.info('Estimate background with config {}'.format(self.background))
             self.estimate_background(self.background)
-        self.extract_spectrum()
+        self.extract_spectrum(n_jobs=n_jobs)
         self.write()
         os.chdir(str(cwd))
 
@@ -125,6 +134,7 @@ class SpectrumExtraction(object):
         config : dict
             Background estimation method
         """
+        t = time()
         method = self.background.pop('method')
         if method == 'reflected':
             config = self.background.copy()
@@ -140,6 +150,9 @@ class SpectrumExtraction(object):
         else:
             raise NotImplementedError("Method: {}".format(method))
 
+        self.timing_background = time() - t
+        log.info('Time for background estimation: {:.3f} s'.format(self.timing_background))
+
     def filter_observations(self):
         """Filter observations by number of reflected regions"""
         raise NotImplementedError("broken")
@@ -153,87 +166,65 @@ class SpectrumExtraction(object):
         self._observations = SpectrumObservationList(np.asarray(obs)[mask])
         self.obs_table = self.obs_table[mask]
 
-    def extract_spectrum(self):
+    def extract_spectrum(self, n_jobs=1):
         """Extract 1D spectral information
 
         The result can be obtained via
         :func:`~gammapy.spectrum.spectrum_extraction.observations`
+
+        The runtime of the extraction steps for each observation is stored
+        in the ``timing`` table (columns ``events``, ``off_pha``, ``arf``,
+        ``rmf`` and ``containment``, in seconds). ``off_pha`` only covers
+        filling the OFF counts spectrum; the time of the background
+        estimation in `estimate_background` is stored as ``timing_background``.
+
+        With ``n_jobs > 1`` the observations are processed in a pool of worker
+        processes. Each worker loads the observations from its own
+        `~gammapy.data.DataStore`. The result does not depend on ``n_jobs``.
+
+        Parameters
+        ----------
+        n_jobs : int, optional
+            Number of worker processes. If None, the number of CPUs is used.
         """
         log.info('Starting spectrum extraction')
-        spectrum_observations = []
         if not isinstance(self.background, list):
             raise ValueError("Invalid background estimate: {}".format(self.background))
-        for obs, bkg in zip(self.obs, self.background):
-            log.info('Extracting spectrum for observation\n {}'.format(obs))
-            offset = obs.pointing_radec.separation(self.target.on_region.center)
-            log.info('Offset : {}\n'.format(offset))
-
-            idx = self.target.on_region.contains(obs.events.radec)
-            on_events = obs.events[idx]
 
-            counts_kwargs = dict(energy=self.e_reco,
-                                 livetime=obs.observation_live_time_duration,
-                                 obs_id=obs.obs_id)
+        config = dict(target=self.target, e_reco=self.e_reco, e_true=self.e_true,
+                      containment_correction=self.containment_correction)
+        n_jobs = n_jobs or cpu_count()
 
-            # We now add a number of optional keywords for the DataStoreObservation
-            # We first check that the entry exists in the table
-            try:
-                counts_kwargs.update(tstart=obs.tstart)
-            except KeyError:
-                pass
-            try:
-                counts_kwargs.update(tstop=obs.tstop)
-            except KeyError:
-                pass
-            try:
-                counts_kwargs.update(muoneff=obs.muoneff)
-            except KeyError:
-                pass
+        if n_jobs == 1 or len(self.obs) <= 1:
+            results = [_extract_obs(obs, bkg, **config)
+                       for obs, bkg in zip(self.obs, self.background)]
+        else:
+            log.info('Using {} processes to extract the spectra.'.format(n_jobs))
+            # Each worker unpickles its own copies of the data stores, with their own cache
+            data_stores = []
+            tasks = []
+            for obs, bkg in zip(self.obs, self.background):
+                ids = [id(_) for _ in data_stores]
+                if id(obs.data_store) not in ids:
+                    data_stores.append(obs.data_store)
+                    ids.append(id(obs.data_store))
+                tasks.append((ids.index(id(obs.data_store)), obs.obs_id, bkg))
+
+            pool = Pool(processes=n_jobs, initializer=_init_worker,
+                        initargs=(data_stores, config))
             try:
-                counts_kwargs.update(zen_pnt=obs.pointing_zen)
-            except KeyError:
-                pass
-
-            on_vec = PHACountsSpectrum(backscal=bkg.a_on, **counts_kwargs)
-            off_vec = PHACountsSpectrum(backscal=bkg.a_off, is_bkg=True,
-                                        **counts_kwargs)
-
-            on_vec.fill(on_events)
-            off_vec.fill(bkg.off_events)
-
-            arf = obs.aeff.to_effective_area_table(offset, energy=self.e_true)
-            rmf = obs.edisp.to_energy_dispersion(offset,
-                                                 e_reco=self.e_reco,
-                                                 e_true=self.e_true)
-
-            # If required, correct arf for psf leakage
-            # TODO: write correction factor as AREASCAL column in PHAFILE
-            if self.containment_correction:
-                # First need psf
-                angles = np.linspace(0., 1.5, 150) * u.deg
-                psf = obs.psf.to_table_psf(offset, angles)
-
-                center_energies = arf.energy.nodes
-                for index, energy in enumerate(center_energies):
-                    try:
-                        correction = psf.integral(energy,
-                                                  0. * u.deg,
-                                                  self.target.on_region.radius)
-                    except:
-                        # TODO: Why is this necessary?
-                        correction = np.nan
-
-                    arf.data[index] = arf.data[index] * correction
-
-            temp = SpectrumObservation(on_vector=on_vec,
-                                       aeff=arf,
-                                       off_vector=off_vec,
-                                       edisp=rmf)
-
-            temp.hi_threshold=obs.aeff.high_threshold
-            temp.lo_threshold=obs.aeff.low_threshold
-
-            spectrum_observations.append(temp)
+                results = pool.map(_extract_obs_worker, tasks)
+            finally:
+                pool.close()
+                pool.join()
+
+        spectrum_observations = [_[0] for _ in results]
+        timing = [_[1] for _ in results]
+        self.timing = Table()
+        self.timing['OBS_ID'] = [_[0] for _ in timing]
+        for idx, name in enumerate(self.TIMING_STEPS):
+            self.timing[name] = Column([_[idx + 1] for _ in timing], unit='s')
+            log.info('Time for {}: {:.3f} s'.format(name, self.timing[name].sum()))
 
         self._observations = SpectrumObservationList(spectrum_observations)
 
@@ -275,3 +266,106 @@ class SpectrumExtraction(object):
         """Write results to disk"""
         self.observations.write(self.OGIP_FOLDER)
         # TODO : add more debug plots etc. here
+
+
+def _extract_obs(obs, bkg, target, e_reco, e_true, containment_correction):
+    """Extract the `~gammapy.spectrum.SpectrumObservation` of one observation.
+
+    Returns a tuple ``(spectrum_obs, timing)``, with ``timing`` the observation
+    id followed by the runtime of each step in
+    `SpectrumExtraction.TIMING_STEPS`.
+    """
+    timing = [obs.obs_id]
+    t = time()
+
+    log.info('Extracting spectrum for observation\n {}'.format(obs))
+    offset = obs.pointing_radec.separation(target.on_region.center)
+    log.info('Offset : {}\n'.format(offset))
+
+    idx = target.on_region.contains(obs.events.radec)
+    on_events = obs.events[idx]
+
+    counts_kwargs = dict(energy=e_reco,
+                         livetime=obs.observation_live_time_duration,
+                         obs_id=obs.obs_id)
+
+    # We now add a number of optional keywords for the DataStoreObservation
+    # We first check that the entry exists in the table
+    try:
+        counts_kwargs.update(tstart=obs.tstart)
+    except KeyError:
+        pass
+    try:
+        counts_kwargs.update(tstop=obs.tstop)
+    except KeyError:
+        pass
+    try:
+        counts_kwargs.update(muoneff=obs.muoneff)
+    except KeyError:
+        pass
+    try:
+        counts_kwargs.update(zen_pnt=obs.pointing_zen)
+    except KeyError:
+        pass
+
+    on_vec = PHACountsSpectrum(backscal=bkg.a_on, **counts_kwargs)
+    on_vec.fill(on_events)
+    t = _add_timing(timing, t)
+
+    off_vec = PHACountsSpectrum(backscal=bkg.a_off, is_bkg=True,
+                                **counts_kwargs)
+    off_vec.fill(bkg.off_events)
+    t = _add_timing(timing, t)
+
+    arf = obs.aeff.to_effective_area_table(offset, energy=e_true)
+    t = _add_timing(timing, t)
+
+    rmf = obs.edisp.to_energy_dispersion(offset,
+                                         e_reco=e_reco,
+                                         e_true=e_true)
+    t = _add_timing(timing, t)
+
+    # If required, correct arf for psf leakage
+    # TODO: write correction factor as AREASCAL column in PHAFILE
+    if containment_correction:
+        # First need psf
+        angles = np.linspace(0., 1.5, 150) * u.deg
+        psf = obs.psf.to_table_psf(offset, angles)
+
+        # NaN where the PSF is not defined
+        correction = psf.containment_fraction(arf.energy.nodes,
+                                              target.on_region.radius)
+        arf.data = arf.data * correction
+    _add_timing(timing, t)
+
+    spectrum_obs = SpectrumObservation(on_vector=on_vec,
+                                       aeff=arf,
+                                       off_vector=off_vec,
+                                       edisp=rmf)
+
+    spectrum_obs.hi_threshold = obs.aeff.high_threshold
+    spectrum_obs.lo_threshold = obs.aeff.low_threshold
+
+    return spectrum_obs, timing
+
+
+def _add_timing(timing, t_start):
+    """Append the time since ``t_start`` to ``timing`` and return the current time."""
+    t = time()
+    timing.append(t - t_start)
+    return t
+
+
+_worker = dict()
+
+
+def _init_worker(data_stores, config):
+    """Set up a worker process of `SpectrumExtraction.extract_spectrum`."""
+    _worker['data_stores'] = data_stores
+    _worker['config'] = config
+
+
+def _extract_obs_worker(task):
+    idx, obs_id, bkg = task
+    obs = _worker['data_stores'][idx].obs(obs_id)
+    return _extract_obs(obs, bkg, **_worker['config'])
@@ -13,6 +13,7 @@ from . import (
     models,
     DifferentialFluxPoints,
 )
+from .fit_engine import SpectrumFitEngine
 
 __all__ = [
     'SpectrumFit',
@@ -37,18 +38,26 @@ class SpectrumFit(object):
         Model to be fit
     stat : str, `~sherpa.stats.Stat`
         Fit statistic to be used
+    method : {'sherpa', 'native'}
+        Fit with Sherpa or with `~gammapy.spectrum.SpectrumFitEngine`, which
+        does not need Sherpa and is faster for joint fits of many observations.
+        The native fit only supports gammapy models and statistic strings.
     """
     FLUX_FACTOR = 1e-20
     """Numerical constant to make model amplitude O(1) during the fit"""
     DEFAULT_STAT = 'wstat'
     """Default statistic to be used for the fit"""
 
-    def __init__(self, obs_list, model, stat=DEFAULT_STAT):
+    def __init__(self, obs_list, model, stat=DEFAULT_STAT, method='sherpa'):
         if isinstance(obs_list, SpectrumObservation):
             obs_list = [obs_list]
 
+        if method not in ['sherpa', 'native']:
+            raise ValueError('Invalid method: {}'.format(method))
+
         self.obs_list = SpectrumObservationList(obs_list)
         self.model = model
+        self.method = method
         self.statistic = stat
         self._fit_range = None
         self._result = list()
@@ -69,12 +78,23 @@ class SpectrumFit(object):
 
     @property
     def statistic(self):
-        """Sherpa `~sherpa.stats.Stat` to be used for the fit"""
+        """Sherpa `~sherpa.stats.Stat` to be used for the fit
+
+        For the native fit, this is the name of the statistic.
+        """
 
         return self._stat
 
     @statistic.setter
     def statistic(self, stat):
+        if self.method == 'native':
+            if not isinstance(stat, six.string_types):
+                raise ValueError("Only statistic strings are supported")
+            if stat.lower() not in SpectrumFitEngine.STATISTICS:
+                raise ValueError("Undefined stat string: {}".format(stat))
+            self._stat = stat.lower()
+            return
+
         import sherpa.stats as s
 
         if isinstance(stat, six.string_types):
@@ -109,6 +129,41 @@ class SpectrumFit(object):
 
     def fit(self):
         """Fit spectrum"""
+        if self.method == 'native':
+            self._fit_native()
+        else:
+            self._fit_sherpa()
+        self._global_result = self._make_global_result()
+
+    def _fit_native(self):
+        """Fit spectrum with `~gammapy.spectrum.SpectrumFitEngine`"""
+        from . import SpectrumFitResult
+        self._result = list()
+
+        engine = SpectrumFitEngine(self.obs_list, self.model, stat=self.statistic,
+                                   fit_range=self.fit_range)
+        engine.fit()
+
+        npred = engine.predicted_counts()
+        statval = engine.total_stat()
+        for ii, obs in enumerate(self.obs_list):
+            fit_range = engine.fit_range_obs(ii)
+            # Skip observations not participating in the fit
+            if fit_range is not None:
+                result = SpectrumFitResult(model=engine.best_fit_model,
+                                           covariance=engine.covariance.copy(),
+                                           covar_axis=list(engine.free_parameters),
+                                           fit_range=fit_range,
+                                           statname=engine.stat,
+                                           statval=statval,
+                                           npred=npred[ii])
+                result.obs = obs
+            else:
+                result = None
+            self._result.append(result)
+
+    def _fit_sherpa(self):
+        """Fit spectrum with Sherpa"""
         from sherpa.fit import Fit
         from sherpa.models import ArithmeticModel, SimulFitModel
         from sherpa.astro.instrument import Response1D
@@ -183,6 +238,8 @@ class SpectrumFit(object):
                 result = None
             self._result.append(result)
 
+    def _make_global_result(self):
+        """Global result from the results of all observations"""
         valid_result = np.nonzero(self.result)[0][0]
         global_result = copy.deepcopy(self.result[valid_result])
         global_result.npred = None
@@ -191,7 +248,7 @@ class SpectrumFit(object):
         fit_range_min = min([_[0] for _ in all_fitranges])
         fit_range_max = max([_[1] for _ in all_fitranges]) 
         global_result.fit_range = u.Quantity((fit_range_min, fit_range_max))
-        self._global_result = global_result
+        return global_result
 
     def compute_fluxpoints(self, binning):
         """Compute `~DifferentialFluxPoints` for best fit model
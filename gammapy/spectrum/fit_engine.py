@@ -0,0 +1,415 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import absolute_import, division, print_function, unicode_literals
+import copy
+import logging
+import numpy as np
+import astropy.units as u
+from astropy.table import Table, Column
+from astropy.extern import six
+from ..extern.bunch import Bunch
+from ..stats import cash, cstat, wstat
+from .models import SpectralModel
+from .utils import _trapz_loglog
+
+__all__ = [
+    'SpectrumFitEngine',
+]
+
+log = logging.getLogger(__name__)
+
+FIT_UNITS = [
+    u.Unit(''),
+    u.Unit('TeV'),
+    u.Unit('TeV-1'),
+    u.Unit('m-2 s-1 TeV-1'),
+    u.Unit('m-2 s-1'),
+]
+"""Units of the model parameters during the fit (energies in TeV, areas in m2)"""
+
+
+class SpectrumFitEngine(object):
+    """Forward-folding likelihood fit of a spectral model with NumPy.
+
+    This is an alternative to the Sherpa fit in `~gammapy.spectrum.SpectrumFit`
+    (use ``method='native'`` there). The responses of all observations
+    (effective area times livetime, energy dispersion) are stacked once into
+    one matrix, with the noticed reconstructed energy bins of all observations
+    as columns. Each evaluation of the fit statistic then integrates the model
+    once on the union of the true energy binnings of all observations and
+    folds it with a single matrix product.
+
+    The bins used in the fit are the bins in the safe energy range
+    (``QUALITY == 0``), restricted to the bins containing the ``fit_range``
+    limits (as in Sherpa). The model integral over the true energy bins is
+    computed analytically if the model implements ``integral``, otherwise
+    with the log-log trapezoidal rule.
+
+    Parameters
+    ----------
+    obs_list : `~gammapy.spectrum.SpectrumObservationList`
+        Observations to fit
+    model : `~gammapy.spectrum.models.SpectralModel`
+        Model to fit, with parameters as `~astropy.units.Quantity`
+    stat : {'wstat', 'cstat', 'cash'}
+        Fit statistic (see `gammapy.stats`). ``'wstat'`` needs off vectors,
+        and includes the model independent terms (as in Sherpa).
+    fit_range : `~astropy.units.Quantity`, optional
+        Energy range of the fit
+    frozen : list of str, optional
+        Names of the parameters not to fit, default: `DEFAULT_FROZEN`
+    """
+    STATISTICS = ['wstat', 'cstat', 'cash']
+    """Available fit statistics"""
+    DEFAULT_FROZEN = ['reference', 'emin', 'emax']
+    """Parameters not fitted by default"""
+
+    def __init__(self, obs_list, model, stat='wstat', fit_range=None, frozen=None):
+        if not isinstance(model, SpectralModel):
+            raise ValueError('Model not understood: {}'.format(model))
+
+        stat = stat.lower()
+        if stat not in self.STATISTICS:
+            raise ValueError('Undefined stat string: {}'.format(stat))
+
+        self.obs_list = obs_list
+        self.model = model
+        self.stat = stat
+        self.fit_range = fit_range
+        self.frozen = self.DEFAULT_FROZEN if frozen is None else frozen
+        self.covariance = None
+
+        self._setup_parameters()
+        self._setup_response()
+
+    def _setup_parameters(self):
+        self.parameter_names = list(self.model.parameters.keys())
+        self.parameter_units = []
+        values = []
+        for name in self.parameter_names:
+            value = u.Quantity(self.model.parameters[name])
+            unit = _fit_unit(value.unit)
+            self.parameter_units.append(unit)
+            values.append(value.to(unit).value)
+
+        self.parameter_values = np.array(values, dtype=np.float64)
+        self.free_parameters = [_ for _ in self.parameter_names if _ not in self.frozen]
+
+        integral = six.get_unbound_function(type(self.model).integral)
+        self._analytic_integral = integral is not six.get_unbound_function(SpectralModel.integral)
+
+    def _setup_response(self):
+        e_true = [obs.e_true.to('TeV').value for obs in self.obs_list]
+        self.e_true = np.unique(np.concatenate(e_true))
+
+        self.responses, self.masks = [], []
+        on_counts, off_counts, alpha = [], [], []
+        for obs in self.obs_list:
+            mask = self._noticed_bins(obs)
+            self.responses.append(self._response_matrix(obs))
+            self.masks.append(mask)
+
+            on_counts.append(obs.on_vector.data.value)
+            if self.stat == 'wstat':
+                if obs.off_vector is None:
+                    raise ValueError('wstat needs off vectors: {}'.format(obs.obs_id))
+                off_counts.append(obs.off_vector.data.value)
+                alpha.append((obs.alpha * np.ones(obs.nbins))[mask])
+
+        if len(self.obs_list) == 1 and self.masks[0].sum() == 1:
+            raise ValueError('You are trying to fit one observation in only '
+                             'one bin, error estimation will fail')
+
+        self._matrix = np.hstack([r[:, m] for r, m in zip(self.responses, self.masks)])
+        if self.stat == 'wstat':
+            self._alpha = np.concatenate(alpha)
+            self.set_counts(on_counts, off_counts)
+        else:
+            self.set_counts(on_counts)
+
+    def set_counts(self, on_counts, off_counts=None):
+        """Replace the counts of the observations.
+
+        The responses are kept, so this is the fast way to fit e.g. many
+        simulated realizations of the same observations (see `fit_batch`).
+
+        Parameters
+        ----------
+        on_counts : list of array_like
+            On counts in all reco energy bins, one array per observation
+        off_counts : list of array_like, optional
+            Off counts in all reco energy bins, one array per observation.
+            Needed for ``'wstat'``.
+        """
+        self._n_on = np.concatenate([np.asarray(counts, dtype=np.float64)[mask]
+                                     for counts, mask in zip(on_counts, self.masks)])
+        if self.stat == 'wstat':
+            if off_counts is None:
+                raise ValueError('wstat needs off counts')
+            self._n_off = np.concatenate([np.asarray(counts, dtype=np.float64)[mask]
+                                          for counts, mask in zip(off_counts, self.masks)])
+
+    def _noticed_bins(self, obs):
+        """Mask of the reconstructed energy bins used in the fit."""
+        mask = np.array(obs.on_vector.quality) == 0
+        if self.fit_range is not None:
+            e_reco = obs.e_reco.to('TeV').value
+            fit_min, fit_max = u.Quantity(self.fit_range).to('TeV').value
+            mask &= (e_reco[1:] > fit_min) & (e_reco[:-1] <= fit_max)
+        return mask
+
+    def _response_matrix(self, obs):
+        """Response for the union true energy bins, shape ``(n_true, n_reco)``."""
+        e_true = obs.e_true.to('TeV').value
+        n_true = len(e_true) - 1
+
+        # Union true energy bins contained in the observation true energy bins
+        idx = np.searchsorted(e_true, self.e_true[:-1], side='right') - 1
+        valid = (idx >= 0) & (idx < n_true)
+        rebin = np.zeros((len(self.e_true) - 1, n_true))
+        rebin[np.where(valid)[0], idx[valid]] = 1
+
+        exposure = obs.aeff.evaluate(fill_nan=True).to('m2').value
+        exposure = exposure * obs.livetime.to('s').value
+
+        if obs.edisp is not None:
+            pdf = u.Quantity(obs.edisp.pdf_matrix).value
+        elif n_true == obs.nbins:
+            pdf = np.eye(n_true)
+        else:
+            raise ValueError('Observation without energy dispersion has different '
+                             'true and reco energy binning: {}'.format(obs.obs_id))
+
+        return np.dot(rebin * exposure, pdf)
+
+    def _values(self, free_values):
+        """All parameter values for given free parameter values."""
+        values = self.parameter_values.copy()
+        values[[self.parameter_names.index(_) for _ in self.free_parameters]] = free_values
+        return values
+
+    def integral_flux(self, values=None):
+        """Model integral flux in the union true energy bins (``m-2 s-1``)
+
+        Parameters
+        ----------
+        values : array-like, optional
+            Values of all parameters in `FIT_UNITS`, default: `parameter_values`
+        """
+        values = self.parameter_values if values is None else values
+        parameters = Bunch(zip(self.parameter_names, values))
+        emin, emax = self.e_true[:-1], self.e_true[1:]
+
+        if self._analytic_integral:
+            model = copy.copy(self.model)
+            model.parameters = parameters
+            return model.integral(emin, emax)
+        else:
+            flux = self.model.evaluate(self.e_true, **parameters)
+            return _trapz_loglog(flux, self.e_true, intervals=True)
+
+    def npred(self, values=None):
+        """Predicted signal counts in the noticed bins of all observations.
+
+        Parameters
+        ----------
+        values : array-like, optional
+            Values of all parameters in `FIT_UNITS`, default: `parameter_values`
+        """
+        return np.dot(self.integral_flux(values), self._matrix)
+
+    def predicted_counts(self, values=None):
+        """Predicted signal counts in all bins, one array per observation.
+
+        Parameters
+        ----------
+        values : array-like, optional
+            Values of all parameters in `FIT_UNITS`, default: `parameter_values`
+        """
+        flux = self.integral_flux(values)
+        return [np.dot(flux, _) for _ in self.responses]
+
+    def stat_per_bin(self, values=None):
+        """Fit statistic in the noticed bins of all observations.
+
+        Parameters
+        ----------
+        values : array-like, optional
+            Values of all parameters in `FIT_UNITS`, default: `parameter_values`
+        """
+        mu_sig = self.npred(values)
+        if self.stat == 'wstat':
+            return wstat(n_on=self._n_on, n_off=self._n_off, alpha=self._alpha,
+                         mu_sig=mu_sig, extra_terms=True)
+        elif self.stat == 'cstat':
+            return cstat(n_on=self._n_on, mu_on=mu_sig)
+        else:
+            return cash(n_on=self._n_on, mu_on=mu_sig)
+
+    def total_stat(self, values=None):
+        """Total fit statistic (float)
+
+        Parameters
+        ----------
+        values : array-like, optional
+            Values of all parameters in `FIT_UNITS`, default: `parameter_values`
+        """
+        return np.sum(self.stat_per_bin(values))
+
+    def fit(self, method='Nelder-Mead', step=1e-3, **kwargs):
+        """Fit the free parameters.
+
+        Minimizes `total_stat` with `scipy.optimize.minimize`. The free
+        parameters are scaled with their start values to make them O(1)
+        during the fit. The covariance matrix is computed from the Hessian of
+        the fit statistic at the best fit, using central finite differences.
+
+        Parameters
+        ----------
+        method : str
+            Minimization method, see `scipy.optimize.minimize`
+        step : float
+            Step (relative to the start values) for the Hessian computation
+        kwargs : dict
+            Passed to `scipy.optimize.minimize`, default: ``tol=1e-10``
+
+        Returns
+        -------
+        result : `~scipy.optimize.OptimizeResult`
+            Minimization result
+        """
+        from scipy.optimize import minimize
+        kwargs.setdefault('tol', 1e-10)
+
+        idx = [self.parameter_names.index(_) for _ in self.free_parameters]
+        free_start = self.parameter_values[idx]
+        scale = np.where(free_start != 0, np.abs(free_start), 1)
+
+        def stat(x):
+            return self.total_stat(self._values(x * scale))
+
+        result = minimize(stat, free_start / scale, method=method, **kwargs)
+        log.debug(result)
+
+        self.parameter_values = self._values(result.x * scale)
+
+        hessian = _hessian(stat, result.x, step)
+        try:
+            self.covariance = 2 * np.linalg.inv(hessian) * np.outer(scale, scale)
+        except np.linalg.LinAlgError:
+            log.warning('Singular Hessian, covariance set to nan')
+            self.covariance = np.nan * np.ones_like(hessian)
+
+        return result
+
+    def fit_batch(self, on_counts, off_counts=None, **kwargs):
+        """Fit many realizations of the counts of one observation.
+
+        Each realization is fitted with `fit`, starting from the initial
+        parameter values. The parameter values and counts are reset afterwards.
+
+        Parameters
+        ----------
+        on_counts : array_like
+            On counts with shape ``(n_realizations, n_bins)``
+        off_counts : array_like, optional
+            Off counts with shape ``(n_realizations, n_bins)``. Needed for ``'wstat'``.
+        kwargs : dict
+            Passed to `fit`
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            Best fit values and errors of the free parameters (columns
+            ``<name>`` and ``<name>_err``), fit statistic (``statval``) and
+            minimizer status (``success``), one row per realization.
+        """
+        if len(self.obs_list) != 1:
+            raise ValueError('Batch fits need an engine for one observation.')
+
+        start = self.parameter_values.copy()
+        counts = self._n_on, getattr(self, '_n_off', None)
+        idx = [self.parameter_names.index(_) for _ in self.free_parameters]
+        n_realizations = len(on_counts)
+
+        values = np.empty((n_realizations, len(idx)))
+        errors = np.empty((n_realizations, len(idx)))
+        statval = np.empty(n_realizations)
+        success = np.empty(n_realizations, dtype=bool)
+
+        try:
+            for ii in range(n_realizations):
+                off = None if off_counts is None else [off_counts[ii]]
+                self.set_counts([on_counts[ii]], off)
+                self.parameter_values = start.copy()
+                result = self.fit(**kwargs)
+
+                values[ii] = self.parameter_values[idx]
+                errors[ii] = np.sqrt(np.diag(self.covariance))
+                statval[ii] = result.fun
+                success[ii] = result.success
+        finally:
+            self.parameter_values = start
+            self._n_on, self._n_off = counts
+
+        table = Table()
+        for jj, name in enumerate(self.free_parameters):
+            unit = self.parameter_units[idx[jj]]
+            table[name] = Column(values[:, jj], unit=unit)
+            table[name + '_err'] = Column(errors[:, jj], unit=unit)
+        table['statval'] = statval
+        table['success'] = success
+        return table
+
+    @property
+    def best_fit_model(self):
+        """Model with the current parameter values (`~gammapy.spectrum.models.SpectralModel`)"""
+        model = copy.deepcopy(self.model)
+        model.parameters = Bunch()
+        for name, value, unit in zip(self.parameter_names, self.parameter_values,
+                                     self.parameter_units):
+            model.parameters[name] = value * unit
+        return model
+
+    def fit_range_obs(self, idx):
+        """Energy range of the noticed bins of one observation.
+
+        Given by the linear centers of the first and last noticed bin (as in Sherpa).
+
+        Parameters
+        ----------
+        idx : int
+            Observation index
+
+        Returns
+        -------
+        fit_range : `~astropy.units.Quantity`
+            Fit range, None if no bins of the observation are noticed
+        """
+        bins = np.where(self.masks[idx])[0]
+        if len(bins) == 0:
+            return None
+
+        e_reco = self.obs_list[idx].e_reco.to('TeV').value
+        center = (e_reco[:-1] + e_reco[1:]) / 2
+        return u.Quantity([center[bins[0]], center[bins[-1]]], 'TeV')
+
+
+def _fit_unit(unit):
+    """Unit from `FIT_UNITS` equivalent to a given unit."""
+    for fit_unit in FIT_UNITS:
+        if unit.is_equivalent(fit_unit):
+            return fit_unit
+    raise ValueError('Parameter unit not supported: {}'.format(unit))
+
+
+def _hessian(func, x, step):
+    """Hessian matrix of a function, with central finite differences."""
+    n = len(x)
+    hessian = np.empty((n, n))
+    steps = step * np.eye(n)
+    for i in range(n):
+        for j in range(i, n):
+            value = (func(x + steps[i] + steps[j]) - func(x + steps[i] - steps[j]) -
+                     func(x - steps[i] + steps[j]) + func(x - steps[i] - steps[j]))
+            hessian[i, j] = hessian[j, i] = value / (4 * step ** 2)
+    return hessian
@@ -17,6 +17,7 @@ __all__ = [
     'SpectrumStats',
     'SpectrumObservation',
     'SpectrumObservationList',
+    'SpectrumObservationBatch',
     'SpectrumObservationStacker',
 ]
 
@@ -470,6 +471,111 @@ class SpectrumObservationList(UserList):
         return obs_list
     
 
+class SpectrumObservationBatch(object):
+    """Many observations with the same IRFs, livetime and binning.
+
+    The counts of all observations are stored in two arrays, e.g. for many
+    simulated realizations of one observation (see
+    `~gammapy.spectrum.SpectrumSimulation.simulate_batch`). Single
+    `~gammapy.spectrum.SpectrumObservation` objects are only created on
+    access, `fit` works directly on the count arrays.
+
+    Parameters
+    ----------
+    on_counts : `~numpy.ndarray`
+        On counts with shape ``(n_obs, n_bins)``
+    aeff : `~gammapy.irf.EffectiveAreaTable`
+        Effective area
+    edisp : `~gammapy.irf.EnergyDispersion`
+        Energy dispersion
+    livetime : `~astropy.units.Quantity`
+        Livetime of each observation
+    e_reco : `~astropy.units.Quantity`, optional
+        Reco energy bin edges, default: reco energy axis of ``edisp``
+    off_counts : `~numpy.ndarray`, optional
+        Off counts with shape ``(n_obs, n_bins)``
+    alpha : float, optional
+        Exposure ratio between on and off region
+    obs_id : array_like, optional
+        Observation ids, default: ``0, ..., n_obs - 1``
+    creator : str, optional
+        Creator of the PHA counts spectra
+    """
+
+    def __init__(self, on_counts, aeff, edisp, livetime, e_reco=None,
+                 off_counts=None, alpha=None, obs_id=None, creator=None):
+        self.on_counts = np.asarray(on_counts)
+        self.off_counts = None if off_counts is None else np.asarray(off_counts)
+        self.aeff = aeff
+        self.edisp = edisp
+        self.livetime = livetime
+        self.e_reco = edisp.e_reco.data if e_reco is None else e_reco
+        self.alpha = alpha
+        self.obs_id = np.arange(len(self.on_counts)) if obs_id is None else np.asarray(obs_id)
+        self.creator = creator or self.__class__.__name__
+
+    def __len__(self):
+        return len(self.on_counts)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __getitem__(self, idx):
+        """Create one `~gammapy.spectrum.SpectrumObservation`"""
+        counts_kwargs = dict(energy=self.e_reco,
+                             livetime=self.livetime,
+                             obs_id=self.obs_id[idx],
+                             creator=self.creator)
+
+        on_vector = PHACountsSpectrum(data=self.on_counts[idx].copy(),
+                                      backscal=1,
+                                      **counts_kwargs)
+
+        if self.off_counts is not None:
+            off_vector = PHACountsSpectrum(data=self.off_counts[idx].copy(),
+                                           backscal=1. / self.alpha,
+                                           is_bkg=True,
+                                           **counts_kwargs)
+        else:
+            off_vector = None
+
+        return SpectrumObservation(on_vector=on_vector, off_vector=off_vector,
+                                   aeff=self.aeff, edisp=self.edisp)
+
+    def to_observation_list(self):
+        """Create `~gammapy.spectrum.SpectrumObservationList` of all observations"""
+        return SpectrumObservationList(list(self))
+
+    def fit(self, model, stat='wstat', fit_range=None, **kwargs):
+        """Fit a model to each observation.
+
+        The response is computed once and the fits only exchange the counts,
+        see `~gammapy.spectrum.SpectrumFitEngine.fit_batch`.
+
+        Parameters
+        ----------
+        model : `~gammapy.spectrum.models.SpectralModel`
+            Model to fit, the parameter values are the start values
+        stat : {'wstat', 'cstat', 'cash'}
+            Fit statistic
+        fit_range : `~astropy.units.Quantity`, optional
+            Energy range of the fit
+        kwargs : dict
+            Passed to `~gammapy.spectrum.SpectrumFitEngine.fit`
+
+        Returns
+        -------
+        table : `~astropy.table.Table`
+            Best fit parameters, one row per observation
+        """
+        from .fit_engine import SpectrumFitEngine
+        engine = SpectrumFitEngine([self[0]], model, stat=stat, fit_range=fit_range)
+        table = engine.fit_batch(self.on_counts, self.off_counts, **kwargs)
+        table['obs_id'] = self.obs_id
+        return table
+
+
 class SpectrumObservationStacker(object):
     r"""Stack `~gammapy.spectrum.SpectrumObervationList`
 
@@ -645,22 +751,28 @@ class SpectrumObservationStacker(object):
         reco_bins = self.obs_list[0].e_reco.nbins
         true_bins = self.obs_list[0].e_true.nbins
 
-        aefft = Quantity(np.zeros(true_bins), 'cm2 s')
-        temp = np.zeros(shape=(reco_bins, true_bins))
-        aefftedisp = Quantity(temp, 'cm2 s')
+        aefft = np.zeros(true_bins)
+        aefftedisp = np.zeros(shape=(true_bins, reco_bins))
 
+        # Only the non-zero bands of the matrices are added up
         for o in self.obs_list:
             aeff_data = o.aeff.evaluate(fill_nan=True)
-            aefft_current = aeff_data * o.livetime
+            aefft_current = (aeff_data * o.livetime).to('cm2 s').value
             aefft += aefft_current
-            edisp_data = o.edisp.pdf_in_safe_range(o.lo_threshold, o.hi_threshold)
-            aefftedisp += edisp_data.transpose() * aefft_current
 
-        stacked_edisp = np.nan_to_num(aefftedisp / aefft)
+            bands = o.edisp.bands
+            e_reco = o.edisp.e_reco.data
+            safe = ((e_reco[:-1] >= o.lo_threshold) & (e_reco[1:] <= o.hi_threshold))
+            mask = safe[bands.cols]
+            rows, cols = bands.rows[mask], bands.cols[mask]
+            aefftedisp[rows, cols] += bands.values[mask] * aefft_current[rows]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stacked_edisp = np.nan_to_num(aefftedisp / aefft[:, np.newaxis])
 
         self.stacked_edisp = EnergyDispersion(e_true=self.obs_list[0].e_true,
                                               e_reco=self.obs_list[0].e_reco,
-                                              data=stacked_edisp.transpose())
+                                              data=stacked_edisp)
 
     def stack_obs(self):
         """Create stacked `~gammapy.spectrum.SpectrumObservation`"""
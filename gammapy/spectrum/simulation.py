@@ -1,11 +1,12 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
+import numpy as np
 import astropy.units as u
 import logging
 from ..utils.random import get_random_state
 from .utils import calculate_predicted_counts
 from .core import PHACountsSpectrum
-from .observation import SpectrumObservation, SpectrumObservationList
+from .observation import SpectrumObservation, SpectrumObservationList, SpectrumObservationBatch
 
 __all__ = [
     'SpectrumSimulation'
@@ -89,6 +90,48 @@ class SpectrumSimulation(object):
             self.obs.obs_id = current_seed
             self.result.append(self.obs)
 
+    def simulate_batch(self, n_obs, seed='random-seed'):
+        """Simulate many observations at once.
+
+        The predicted counts are computed only once and the counts of all
+        observations are drawn in one call per vector. This is much faster
+        than `run` if many realizations are needed, e.g. to study the fit
+        bias and coverage.
+
+        Parameters
+        ----------
+        n_obs : int
+            Number of observations
+        seed : {int, 'random-seed', 'global-rng', `~numpy.random.RandomState`}
+            see :func:~`gammapy.utils.random.get_random_state`
+
+        Returns
+        -------
+        batch : `~gammapy.spectrum.SpectrumObservationBatch`
+            Simulated observations
+        """
+        rand = get_random_state(seed)
+        npred_source = np.asarray(self.npred_source.data)
+        size = (n_obs, len(npred_source))
+        log.info("Simulating {} observations".format(n_obs))
+
+        on_counts = rand.poisson(npred_source, size=size)
+        off_counts = None
+
+        if self.background_model is not None:
+            npred_background = np.asarray(self.npred_background.data)
+            on_counts += rand.poisson(npred_background, size=size)
+            off_counts = rand.poisson(npred_background / self.alpha, size=size)
+
+        return SpectrumObservationBatch(on_counts=on_counts,
+                                        off_counts=off_counts,
+                                        aeff=self.aeff,
+                                        edisp=self.edisp,
+                                        livetime=self.livetime,
+                                        e_reco=self.e_reco,
+                                        alpha=self.alpha,
+                                        creator=self.__class__.__name__)
+
     def reset(self):
         """Clear all results"""
         self.result = SpectrumObservationList()
@@ -95,6 +95,27 @@ class TestSpectrumExtraction:
         assert n_on_actual == results['n_on']
         assert_allclose(sigma_actual, results['sigma'], atol=1e-2)
 
+        assert list(extraction.timing['OBS_ID']) == [23523, 23592]
+        assert extraction.timing.colnames[1:] == ['events', 'off_pha', 'arf', 'rmf', 'containment']
+        assert extraction.timing_background > 0
+
+    def test_extract_parallel(self, target, obs, bkg):
+        extraction = SpectrumExtraction(target=target, obs=obs,
+                                        background=copy.deepcopy(bkg))
+        extraction.estimate_background(extraction.background)
+        extraction.extract_spectrum()
+        expected = extraction.observations
+
+        extraction.extract_spectrum(n_jobs=2)
+        actual = extraction.observations
+
+        assert actual.obs_id == expected.obs_id
+        for obs_actual, obs_expected in zip(actual, expected):
+            assert_allclose(obs_actual.on_vector.data, obs_expected.on_vector.data)
+            assert_allclose(obs_actual.off_vector.data, obs_expected.off_vector.data)
+            assert_quantity_allclose(obs_actual.aeff.data, obs_expected.aeff.data)
+            assert_quantity_allclose(obs_actual.edisp.data, obs_expected.edisp.data)
+
     def test_run(self, tmpdir, extraction):
         """Test the run method and check if files are written correctly"""
         extraction.run(outdir=tmpdir)
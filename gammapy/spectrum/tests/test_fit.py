@@ -106,6 +106,60 @@ def test_spectral_fit(tmpdir):
                              0.06321 / u.TeV, rtol=1e-3)
 
 
+@requires_dependency('scipy')
+@requires_dependency('uncertainties')
+@requires_data('gammapy-extra')
+def test_spectral_fit_native():
+    pha1 = gammapy_extra.filename("datasets/hess-crab4_pha/pha_obs23592.fits")
+    pha2 = gammapy_extra.filename("datasets/hess-crab4_pha/pha_obs23523.fits")
+    obs1 = SpectrumObservation.read(pha1)
+    obs2 = SpectrumObservation.read(pha2)
+    obs_list = SpectrumObservationList([obs1, obs2])
+
+    model = models.PowerLaw(index=2 * u.Unit(''),
+                            amplitude=10 ** -12 * u.Unit('cm-2 s-1 TeV-1'),
+                            reference=1 * u.TeV)
+
+    fit = SpectrumFit(obs_list, model, method='native')
+    fit.fit()
+    result = fit.result[0]
+
+    # Same values as for the Sherpa fit in test_spectral_fit
+    assert result.statname == 'wstat'
+    assert_allclose(result.statval, 103.595, rtol=1e-3)
+    assert_quantity_allclose(result.model.parameters.index,
+                             2.116 * u.Unit(''), rtol=1e-3)
+    model_with_errors = result.model_with_uncertainties
+    assert_allclose(model_with_errors.parameters.index.s, 0.0542, rtol=1e-2)
+    assert 'index' in result.to_table().colnames
+
+    thres_bin = obs1.on_vector.energy.find_node(obs1.lo_threshold)
+    desired = obs1.on_vector.energy.lin_center()[thres_bin + 1]
+    assert_quantity_allclose(result.fit_range[0], desired)
+
+    npred = obs1.predicted_counts(result.model)
+    assert_allclose(result.npred, npred.data, rtol=1e-3)
+
+    fit_range = [4, 20] * u.TeV
+    fit.fit_range = fit_range
+    fit.fit()
+    range_bin = obs1.on_vector.energy.find_node(fit_range[1])
+    desired = obs1.on_vector.energy.lin_center()[range_bin]
+    assert_quantity_allclose(fit.result[0].fit_range[1], desired)
+
+    ecpl = models.ExponentialCutoffPowerLaw(
+        index=2 * u.Unit(''),
+        amplitude=10 ** -12 * u.Unit('cm-2 s-1 TeV-1'),
+        reference=1 * u.TeV,
+        lambda_=0.1 / u.TeV
+    )
+
+    fit = SpectrumFit(obs_list, ecpl, method='native')
+    fit.fit()
+    assert_quantity_allclose(fit.result[0].model.parameters.lambda_,
+                             0.06321 / u.TeV, rtol=1e-2)
+
+
 @requires_dependency('sherpa')
 @pytest.mark.skipif('NUMPY_LT_1_9')
 @pytest.mark.xfail(reason = 'wait for https://github.com/sherpa/sherpa/pull/249')
@@ -58,3 +58,28 @@ class TestSpectrumSimulation:
         assert self.sim.result[2].on_vector.total_counts == 151 
         assert self.sim.result[3].on_vector.total_counts == 163 
         assert self.sim.result[4].on_vector.total_counts == 185
+
+    def test_simulate_batch(self):
+        self.sim.background_model = self.background_model
+        self.sim.alpha = self.alpha
+        batch = self.sim.simulate_batch(n_obs=50, seed=23)
+
+        assert len(batch) == 50
+        assert batch.on_counts.shape == (50, len(self.sim.e_reco) - 1)
+        assert batch.off_counts.shape == batch.on_counts.shape
+
+        npred = self.sim.npred_source.total_counts + self.sim.npred_background.total_counts
+        assert np.abs(batch.on_counts.sum(axis=1).mean() / npred - 1) < 0.05
+
+        obs = batch[3]
+        assert obs.obs_id == 3
+        assert obs.on_vector.total_counts == batch.on_counts[3].sum()
+        assert obs.off_vector.total_counts == batch.off_counts[3].sum()
+
+        batch = self.sim.simulate_batch(n_obs=3, seed=42)
+        result = batch.fit(self.source_model, stat='wstat')
+        assert len(result) == 3
+        assert list(result['obs_id']) == [0, 1, 2]
+        assert result['success'].all()
+        assert np.all(np.abs(result['index'] - 2.3) < 0.5)
+        assert self.source_model.parameters.index.value == 2.3
@@ -153,8 +153,8 @@ def wstat(n_on, n_off, alpha, mu_sig, extra_terms=False):
 
     
     term1 = mu_sig + (1 + alpha) * mu_bkg 
-    term2 = - n_on * np.log(mu_sig + alpha * mu_bkg)
-    term3 = - n_off * np.log(mu_bkg) 
+    term2 = - _xlogy(n_on, mu_sig + alpha * mu_bkg)
+    term3 = - _xlogy(n_off, mu_bkg)
     
     stat = 2 * (term1 + term2 + term3)
 
@@ -184,9 +184,16 @@ def _get_wstat_extra_terms(n_on, n_off):
     see:
     https://heasarc.gsfc.nasa.gov/xanadu/xspec/manual/XSappendixStatistics.html
     """
-    term = - n_on*(1-np.log(n_on)) - n_off*(1-np.log(n_off))
+    term = - n_on + _xlogy(n_on, n_on) - n_off + _xlogy(n_off, n_off)
     return 2 * term
 
+
+def _xlogy(x, y):
+    """Compute ``x * log(y)``, with the value 0 where ``x`` is 0."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(x > 0, x * np.log(y), 0)
+
+
 def lstat():
     r"""L statistic, for Poisson data with Poisson background (Bayesian).
 
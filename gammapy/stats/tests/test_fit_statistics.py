@@ -91,3 +91,16 @@ def test_wstat():
     actual = np.sum(statsvec)
     print(fvec)
     assert_allclose(actual, desired)
+
+
+def test_wstat_zero_counts():
+    alpha, mu_sig = 0.2, np.array([3., 3.])
+
+    # No on counts: mu_bkg = n_off / (1 + alpha)
+    actual = gammapy_stats.wstat(n_on=0, n_off=5, alpha=alpha, mu_sig=3., extra_terms=True)
+    assert_allclose(actual, 2 * (3 + 5 * np.log(1 + alpha)))
+
+    # No off counts: mu_bkg = 0 for mu_sig > alpha * n_on / (1 + alpha)
+    actual = gammapy_stats.wstat(n_on=[2, 0], n_off=[0, 0], alpha=alpha, mu_sig=mu_sig,
+                                 extra_terms=True)
+    assert_allclose(actual, [2 * (3 - 2 - 2 * np.log(3. / 2)), 6])
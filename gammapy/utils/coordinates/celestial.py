@@ -8,6 +8,8 @@ from astropy.coordinates.angle_utilities import angular_separation
 __all__ = [
     'minimum_separation',
     'pair_correlation',
+    'sky_to_unit_vector',
+    'sky_circle_membership',
 ]
 
 
@@ -70,3 +72,64 @@ def pair_correlation(lon, lat, theta_bins):
         counts += hist
 
     return counts
+
+
+def sky_to_unit_vector(lon, lat):
+    """Convert sky positions to Cartesian unit vectors.
+
+    Parameters
+    ----------
+    lon, lat : `~astropy.units.Quantity` or array_like
+        Sky coordinates (in deg if not a Quantity)
+
+    Returns
+    -------
+    xyz : `~numpy.ndarray`
+        Unit vectors with shape ``lon.shape + (3,)``
+    """
+    lon = np.radians(getattr(lon, 'degree', lon))
+    lat = np.radians(getattr(lat, 'degree', lat))
+
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def sky_circle_membership(xyz, center_xyz, radius, chunk_size=2 ** 22):
+    """Test which sky positions are inside which circles.
+
+    Positions and circle centers are given as unit vectors, so that all
+    circles are tested with one matrix product: a position is inside a
+    circle if the dot product with the center is larger than the cosine
+    of the radius.
+
+    Parameters
+    ----------
+    xyz : `~numpy.ndarray`
+        Unit vectors of the positions, shape ``(n_positions, 3)``
+    center_xyz : `~numpy.ndarray`
+        Unit vectors of the circle centers, shape ``(n_circles, 3)``
+    radius : `~astropy.coordinates.Angle` or array_like
+        Circle radii (in deg if not an Angle), shape ``(n_circles,)``
+    chunk_size : int
+        Maximum number of position-circle pairs processed at once,
+        limits the size of temporary arrays.
+
+    Returns
+    -------
+    mask : `~numpy.ndarray`
+        Boolean array with shape ``(n_circles, n_positions)``, true for
+        positions with a separation from the circle center smaller than
+        the radius.
+    """
+    xyz = np.asarray(xyz)
+    center_xyz = np.atleast_2d(center_xyz)
+    cos_radius = np.cos(np.radians(np.atleast_1d(getattr(radius, 'degree', radius))))
+    cos_radius = cos_radius[:, np.newaxis]
+
+    mask = np.empty((len(center_xyz), len(xyz)), dtype=bool)
+    step = max(chunk_size // max(len(center_xyz), 1), 1)
+    for start in range(0, len(xyz), step):
+        chunk = slice(start, start + step)
+        mask[:, chunk] = np.dot(center_xyz, xyz[chunk].T) > cos_radius
+
+    return mask
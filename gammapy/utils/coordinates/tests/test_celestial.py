@@ -1,7 +1,8 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 from __future__ import absolute_import, division, print_function, unicode_literals
+import numpy as np
 from numpy.testing import assert_allclose
-from ...coordinates import minimum_separation
+from ...coordinates import minimum_separation, sky_to_unit_vector, sky_circle_membership
 
 
 def test_minimum_separation():
@@ -11,3 +12,21 @@ def test_minimum_separation():
     lat2 = [0, 0.5]
     separation = minimum_separation(lon1, lat1, lon2, lat2)
     assert_allclose(separation, [1, 0, 0.5])
+
+
+def test_sky_to_unit_vector():
+    xyz = sky_to_unit_vector([0, 90, 0], [0, 0, 90])
+    assert_allclose(xyz, [[1, 0, 0], [0, 1, 0], [0, 0, 1]], atol=1e-15)
+
+
+def test_sky_circle_membership():
+    xyz = sky_to_unit_vector([0, 1, 2, 3], [0, 0, 0, 0])
+    centers = sky_to_unit_vector([0, 3], [0, 0])
+    mask = sky_circle_membership(xyz, centers, [1.5, 0.5], chunk_size=3)
+    assert mask.tolist() == [[True, True, False, False], [False, False, False, True]]
+
+    # No circles and / or no positions
+    empty = np.zeros((0, 3))
+    assert sky_circle_membership(xyz, empty, []).shape == (0, 4)
+    assert sky_circle_membership(empty, centers, [1.5, 0.5]).shape == (2, 0)
+    assert sky_circle_membership(empty, empty, []).shape == (0, 0)
@@ -2,10 +2,15 @@
 """FITS utility functions.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
+import gzip
+import re
+from collections import OrderedDict
+from io import BytesIO
 import numpy as np
-from astropy.units import Quantity
+from astropy.extern import six
+from astropy.units import Quantity, Unit
 from astropy.io import fits
-from astropy.table import Table, QTable
+from astropy.table import Table, QTable, MaskedColumn
 
 __all__ = [
     'table_from_row_data',
@@ -13,6 +18,7 @@ __all__ = [
     'table_to_fits_table',
     'fits_table_to_table',
     'energy_axis_to_ebounds',
+    'iter_fits_table_chunks',
 ]
 
 
@@ -192,3 +198,160 @@ def ebounds_to_energy_axis(ebounds):
     emax = table['E_MAX'].quantity
     energy = np.append(emin.value, emax.value[-1]) * emin.unit
     return BinnedDataAxis(data=energy)
+
+
+_FITS_BLOCK_SIZE = 2880
+
+_STRUCTURAL_KEYWORDS = re.compile(
+    r'^(XTENSION|BITPIX|NAXIS\d*|PCOUNT|GCOUNT|TFIELDS|EXTNAME|COMMENT|HISTORY|'
+    r'T(TYPE|FORM|UNIT|DIM|NULL|SCAL|ZERO|DISP)\d+)$'
+)
+"""FITS header keywords describing the HDU structure, not copied to table meta data."""
+
+
+def iter_fits_table_chunks(filename, hdu=1, columns=None, chunk_size=100000):
+    """Read a FITS binary table in chunks of rows.
+
+    Only one chunk of rows is in memory at any time. Uncompressed files
+    are memory mapped, so that only the pages of the current chunk are
+    read. Gzip compressed files are decompressed while reading, without
+    decompressing the whole file into memory first.
+
+    The columns are converted like in `~astropy.table.Table.read`
+    (``TSCAL`` / ``TZERO``, ``TDIM``, logical and bit columns, ``TNULL``
+    masking and units). Variable length columns are not supported for
+    compressed files.
+
+    Parameters
+    ----------
+    filename : str
+        FITS filename, optionally gzip compressed
+    hdu : str or int
+        HDU name or index
+    columns : list of str, optional
+        Names of the columns to read (default: all columns)
+    chunk_size : int
+        Number of rows per chunk
+
+    Returns
+    -------
+    tables : generator of `~astropy.table.Table`
+        Table chunks. The table meta data contains the HDU header keywords.
+    """
+    filename = str(filename)
+    with open(filename, 'rb') as fh:
+        compressed = fh.read(2) == b'\x1f\x8b'
+
+    if compressed:
+        chunks = _iter_gzip_table_chunks(filename, hdu, chunk_size)
+    else:
+        chunks = _iter_memmap_table_chunks(filename, hdu, chunk_size)
+
+    for header, data in chunks:
+        yield _fits_rec_to_table(data, header, columns)
+
+
+def _iter_memmap_table_chunks(filename, hdu, chunk_size):
+    """Iterate over chunks of rows of a memory mapped binary table."""
+    with fits.open(filename, memmap=True, uint=True) as hdu_list:
+        table_hdu = hdu_list[hdu]
+        if not isinstance(table_hdu, fits.BinTableHDU):
+            raise ValueError('HDU {!r} is not a binary table.'.format(hdu))
+
+        data = table_hdu.data
+        for start in range(0, table_hdu.header['NAXIS2'], chunk_size):
+            yield table_hdu.header, data[start:start + chunk_size]
+
+
+def _iter_gzip_table_chunks(filename, hdu, chunk_size):
+    """Iterate over chunks of rows of a binary table in a gzip compressed file.
+
+    The raw rows of each chunk are wrapped in a small in-memory FITS file,
+    so that astropy does the column conversion.
+    """
+    with gzip.open(filename, 'rb') as fileobj:
+        header = _skip_to_hdu(fileobj, hdu)
+        if header.get('PCOUNT', 0):
+            raise ValueError('Variable length columns are not supported for '
+                             'compressed files: {}'.format(filename))
+
+        primary = fits.PrimaryHDU().header.tostring().encode('ascii')
+        nrows = header['NAXIS2']
+        for start in range(0, nrows, chunk_size):
+            chunk_header = header.copy()
+            chunk_header['NAXIS2'] = min(chunk_size, nrows - start)
+
+            data = fileobj.read(chunk_header['NAXIS2'] * header['NAXIS1'])
+            padding = b'\0' * (-len(data) % _FITS_BLOCK_SIZE)
+            buffer = BytesIO(primary + chunk_header.tostring().encode('ascii') + data + padding)
+            with fits.open(buffer, memmap=False, uint=True) as chunk_hdu_list:
+                yield header, chunk_hdu_list[1].data
+
+
+def _fits_rec_to_table(data, header, columns=None):
+    """Convert `~astropy.io.fits.FITS_rec` rows to a `~astropy.table.Table`.
+
+    Only the given columns are converted, otherwise like `~astropy.table.Table.read`.
+    """
+    names = data.columns.names
+    columns = names if columns is None else list(columns)
+    missing = set(columns) - set(names)
+    if missing:
+        raise KeyError('Columns not found: {}'.format(sorted(missing)))
+
+    meta = OrderedDict()
+    for key, value in header.items():
+        if key and not _STRUCTURAL_KEYWORDS.match(key):
+            meta[key] = value
+
+    table = Table(meta=meta)
+    for name in columns:
+        column = data.columns[name]
+        values = data.field(name)
+        if column.null is not None:
+            values = MaskedColumn(values, mask=values == column.null, fill_value=column.null)
+        table[name] = values
+        if column.unit:
+            table[name].unit = Unit(column.unit, format='fits', parse_strict='warn')
+
+    return table
+
+
+def _skip_to_hdu(fileobj, hdu):
+    """Move file position to the data of a given HDU and return its header."""
+    idx = 0
+    while True:
+        try:
+            header = fits.Header.fromfile(fileobj)
+        except EOFError:
+            header = None
+
+        if not header:
+            raise KeyError('HDU not found: {!r}'.format(hdu))
+
+        extname = header.get('EXTNAME', 'PRIMARY' if idx == 0 else '')
+        if isinstance(hdu, six.string_types):
+            match = extname.strip().upper() == hdu.upper()
+        else:
+            match = idx == hdu
+
+        if match:
+            if header.get('XTENSION', '').strip() != 'BINTABLE':
+                raise ValueError('HDU {!r} is not a binary table.'.format(hdu))
+            return header
+
+        fileobj.seek(_data_size(header), 1)
+        idx += 1
+
+
+def _data_size(header):
+    """Size of the HDU data in bytes, including padding."""
+    if header['NAXIS'] == 0:
+        return 0
+
+    size = 1
+    for axis in range(1, header['NAXIS'] + 1):
+        size *= header['NAXIS{}'.format(axis)]
+
+    size = abs(header['BITPIX']) // 8 * header.get('GCOUNT', 1) * (header.get('PCOUNT', 0) + size)
+    return -(-size // _FITS_BLOCK_SIZE) * _FITS_BLOCK_SIZE
@@ -2,6 +2,7 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 import itertools
+from functools import reduce
 import numpy as np
 import abc
 import copy
@@ -18,6 +19,7 @@ __all__ = [
     'NDDataArray',
     'DataAxis',
     'BinnedDataAxis',
+    'GridInterpolator',
 ]
 
 # Note: test for this class are implemented in
@@ -35,7 +37,7 @@ class NDDataArray(object):
 
     interp_kwargs = dict(bounds_error=False)
     """Interpolation kwargs used to initialize the
-    `scipy.interpolate.RegularGridInterpolator`.  The interpolation behaviour
+    `~gammapy.utils.nddata.GridInterpolator`.  The interpolation behaviour
     of an individual axis ('log', 'linear') can be passed to the axis on
     initialization."""
 
@@ -180,19 +182,25 @@ class NDDataArray(object):
         ss += array_stats_str(self.data, 'Data')
         return ss
 
-    def evaluate(self, method=None, **kwargs):
+    def evaluate(self, method=None, outer=True, **kwargs):
         """Evaluate NDData Array
 
         This function provides a uniform interface to several interpolators.
         The evaluation nodes are given as ``kwargs``.
 
         Currently available:
-        `~scipy.interpolate.RegularGridInterpolator`, methods: linear, nearest
+        `~gammapy.utils.nddata.GridInterpolator`, methods: linear, nearest
 
         Parameters
         ----------
         method : str {'linear', 'nearest'}, optional
             Interpolation method
+        outer : bool, optional
+            If True (default), evaluate on the outer product of the values
+            given for the axes. The result has the concatenated shape of the
+            values, with length one dimensions removed. If False, the values
+            are broadcast against each other and the result has the
+            broadcast shape.
         kwargs : dict
             Keys are the axis names, Values the evaluation points
 
@@ -211,19 +219,13 @@ class NDDataArray(object):
             # Transform to match interpolation behaviour of axis
             values.append(np.atleast_1d(axis._interp_values(temp)))
 
-        if method is None:
-            return self._eval_regular_grid_interp(
-                values) * self.data.unit
-        elif method == 'linear':
-            return self._eval_regular_grid_interp(
-                values, method='linear') * self.data.unit
-        elif method == 'nearest':
-            return self._eval_regular_grid_interp(
-                values, method='nearest') * self.data.unit
-        else:
+        if method not in [None, 'linear', 'nearest']:
             raise ValueError('Interpolator {} not available'.format(method))
 
-    def _eval_regular_grid_interp(self, values, **kwargs):
+        return self._eval_regular_grid_interp(
+            values, method=method, outer=outer) * self.data.unit
+
+    def _eval_regular_grid_interp(self, values, method=None, outer=True):
         """Evaluate linear interpolator
 
         Input: list of values to evaluate, in correct units and correct order.
@@ -231,48 +233,206 @@ class NDDataArray(object):
         if self._regular_grid_interp is None:
             self._add_regular_grid_interp()
 
-        # This is necessary since np.append does not support the 1D case
-        if self.dim > 1:
-            shapes = np.append(*[np.shape(_) for _ in values])
+        if outer:
+            shape = tuple(itertools.chain(*[np.shape(_) for _ in values]))
+            values = [_.flatten() for _ in values]
+            res = self._regular_grid_interp.outer(values, method=method)
+            return np.reshape(res, shape).squeeze()
         else:
-            shapes = values[0].shape
-        # Flatten in order to support 2D array input
-        values = [_.flatten() for _ in values]
-        points = list(itertools.product(*values))
-        res = self._regular_grid_interp(points, **kwargs)
-        res = np.reshape(res, shapes).squeeze()
-
-        return res
+            return self._regular_grid_interp(values, method=method)
 
     def _add_regular_grid_interp(self, interp_kwargs=None):
-        """Add `~scipy.interpolate.RegularGridInterpolator`
-
-        http://docs.scipy.org/doc/scipy-0.14.0/reference/generated/scipy.interpolate.RegularGridInterpolator.html
+        """Add `~gammapy.utils.nddata.GridInterpolator`
 
         Parameters
         ----------
         interp_kwargs : dict, optional
             Interpolation kwargs
         """
-        from scipy.interpolate import RegularGridInterpolator
-        
         if interp_kwargs is None:
             interp_kwargs = self.interp_kwargs
         points = [a._interp_nodes() for a in self.axes]
         values = self.data.value
 
         # If values contains nan, only setup interpolator in valid range
-        if np.isnan(values).any():
-            if self.dim > 1:
-                raise NotImplementedError('Data grid contains nan. This is not'
-                                          'supported for arrays dimension > 1')
-            else:
-                mask = np.isfinite(values)
-                points = [points[0][mask]]
-                values = values[mask]
+        if np.isnan(values).any() and self.dim == 1:
+            mask = np.isfinite(values)
+            points = [points[0][mask]]
+            values = values[mask]
+
+        self._regular_grid_interp = GridInterpolator(points, values, **interp_kwargs)
+
+
+class GridInterpolator(object):
+    """Interpolation on a regular grid in arbitrary dimensions.
+
+    Vectorized replacement for `~scipy.interpolate.RegularGridInterpolator`,
+    with the same parameters and, for grids without NaN values, the same
+    results. Interpolation is done per axis
+    using indices and weights computed with `~numpy.searchsorted`, so no
+    list of evaluation points has to be created. The values can be given
+    either as broadcastable arrays (see `~GridInterpolator.__call__`) or
+    as one array per axis, spanning an outer product grid
+    (see `~GridInterpolator.outer`).
+
+    Grid values that are NaN are ignored in linear interpolation: the
+    result is the weighted mean of the finite values at the corners of
+    the grid cell. It is NaN if all corners are NaN.
+
+    Parameters
+    ----------
+    points : list of `~numpy.ndarray`
+        Strictly ascending grid nodes for each axis.
+    values : `~numpy.ndarray`
+        Data on the grid.
+    method : {'linear', 'nearest'}
+        Default interpolation method.
+    bounds_error : bool
+        Raise a `ValueError` for values outside the grid.
+    fill_value : float or None
+        Value used outside the grid. If None, values outside the
+        grid are extrapolated.
+    """
+
+    def __init__(self, points, values, method='linear', bounds_error=True,
+                 fill_value=np.nan):
+        self.points = [np.asarray(_, dtype=float) for _ in points]
+        self.values = np.asarray(values)
+        self.method = method
+        self.bounds_error = bounds_error
+        self.fill_value = fill_value
 
-        self._regular_grid_interp = RegularGridInterpolator(points, values,
-                                                            **interp_kwargs)
+        self._finite = np.isfinite(self.values)
+        self._has_nan = not self._finite.all()
+        if self._has_nan:
+            self._values_finite = np.where(self._finite, self.values, 0)
+
+    def __call__(self, values, method=None):
+        """Evaluate at broadcastable arrays of values.
+
+        Parameters
+        ----------
+        values : list of `~numpy.ndarray`
+            Values for each axis.
+        method : {'linear', 'nearest'}, optional
+            Interpolation method, default is ``self.method``.
+
+        Returns
+        -------
+        result : `~numpy.ndarray`
+            Interpolated values with the broadcast shape of the values.
+        """
+        method = method or self.method
+        values = [np.asarray(_, dtype=float) for _ in values]
+        indices, weights, out = self._indices_weights(values, method)
+
+        if method == 'nearest':
+            result = self.values[tuple(indices)].astype(float)
+        elif self._has_nan:
+            result = self._interp_corners(self._values_finite, indices, weights)
+            norm = self._interp_corners(self._finite.astype(float), indices, weights)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.where(norm > 0, result / norm, np.nan)
+        else:
+            result = self._interp_corners(self.values, indices, weights)
+
+        return self._fill(result, reduce(np.logical_or, out))
+
+    def outer(self, values, method=None):
+        """Evaluate on the outer product grid of 1D arrays of values.
+
+        The interpolation is separable: it is done along one axis after
+        the other, so the cost scales with the size of the output grid
+        and not with the number of grid cell corners.
+
+        Parameters
+        ----------
+        values : list of `~numpy.ndarray`
+            1D array of values for each axis.
+        method : {'linear', 'nearest'}, optional
+            Interpolation method, default is ``self.method``.
+
+        Returns
+        -------
+        result : `~numpy.ndarray`
+            Interpolated values with shape ``(len(values[0]), len(values[1]), ...)``.
+        """
+        method = method or self.method
+        values = [np.asarray(_, dtype=float).ravel() for _ in values]
+        indices, weights, out = self._indices_weights(values, method)
+
+        if method == 'nearest':
+            result = self.values[np.ix_(*indices)].astype(float)
+        elif self._has_nan:
+            result = self._interp_separable(self._values_finite, indices, weights)
+            norm = self._interp_separable(self._finite.astype(float), indices, weights)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.where(norm > 0, result / norm, np.nan)
+        else:
+            result = self._interp_separable(self.values, indices, weights)
+
+        # Outer product of the out of bounds masks
+        out = [_.reshape([-1 if i == axis else 1 for i in range(len(out))])
+               for axis, _ in enumerate(out)]
+        return self._fill(result, reduce(np.logical_or, out))
+
+    def _indices_weights(self, values, method):
+        """Lower grid cell indices, weights and out of bounds masks per axis."""
+        indices, weights, out = [], [], []
+        for nodes, value in zip(self.points, values):
+            if len(nodes) > 1:
+                idx = np.searchsorted(nodes, value) - 1
+                idx = np.clip(idx, 0, len(nodes) - 2)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    weight = (value - nodes[idx]) / (nodes[idx + 1] - nodes[idx])
+            else:
+                idx = np.zeros(value.shape, dtype=int)
+                weight = np.zeros(value.shape)
+
+            if method == 'nearest':
+                idx = np.where(weight <= 0.5, idx, idx + 1)
+            elif method != 'linear':
+                raise ValueError('Interpolator {} not available'.format(method))
+
+            indices.append(idx)
+            weights.append(weight)
+            out.append((value < nodes[0]) | (value > nodes[-1]))
+
+        if self.bounds_error and np.any([_.any() for _ in out]):
+            raise ValueError('One of the requested values is out of bounds.')
+
+        return indices, weights, out
+
+    def _interp_corners(self, data, indices, weights):
+        """Multilinear interpolation, summing over the grid cell corners."""
+        data = data.ravel()
+        strides = np.cumprod([1] + [len(_) for _ in self.points[:0:-1]])[::-1]
+        result = 0
+        for corner in itertools.product([0, 1], repeat=len(indices)):
+            index, weight = 0, 1
+            for offset, idx, w, nodes, stride in zip(corner, indices, weights,
+                                                     self.points, strides):
+                index = index + stride * np.minimum(idx + offset, len(nodes) - 1)
+                weight = weight * (w if offset else 1 - w)
+            result = result + data.take(index) * weight
+        return result
+
+    def _interp_separable(self, data, indices, weights):
+        """Multilinear interpolation on an outer product grid, one axis at a time."""
+        for axis, (idx, w, nodes) in enumerate(zip(indices, weights, self.points)):
+            shape = [1] * data.ndim
+            shape[axis] = -1
+            w = w.reshape(shape)
+            lower = data.take(idx, axis=axis)
+            upper = data.take(np.minimum(idx + 1, len(nodes) - 1), axis=axis)
+            data = lower * (1 - w) + upper * w
+        return data
+
+    def _fill(self, result, out):
+        """Set values outside the grid to ``fill_value``."""
+        if self.fill_value is not None and np.any(out):
+            result = np.where(out, self.fill_value, result)
+        return result
 
 
 class DataAxis(object):
@@ -0,0 +1,55 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import absolute_import, division, print_function, unicode_literals
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+from astropy.io import fits
+from astropy.table import Table, vstack
+from ...utils.fits import iter_fits_table_chunks
+
+
+def make_test_hdu_list():
+    columns = [
+        fits.Column(name='A', format='E', unit='deg', array=np.arange(25)),
+        fits.Column(name='B', format='I', bzero=32768, array=np.arange(25, dtype='uint16') + 40000),
+        fits.Column(name='C', format='L', array=np.arange(25) % 2 == 0),
+        fits.Column(name='D', format='6K', dim='(3,2)', array=np.arange(150).reshape(25, 2, 3)),
+        fits.Column(name='E', format='5A', array=['ab', 'cde', 'f', 'ghijk', ''] * 5),
+        fits.Column(name='F', format='J', null=-1, array=np.arange(25) % 3 - 1),
+        fits.Column(name='G', format='3X', array=np.arange(75).reshape(25, 3) % 2 == 0),
+    ]
+    hdu = fits.BinTableHDU.from_columns(columns, name='TEST')
+    hdu.header['TEST_KEY'] = 42
+    return fits.HDUList([fits.PrimaryHDU(), hdu])
+
+
+def test_iter_fits_table_chunks(tmpdir):
+    hdu_list = make_test_hdu_list()
+
+    for name in ['test.fits', 'test.fits.gz']:
+        filename = str(tmpdir / name)
+        hdu_list.writeto(filename)
+        table = Table.read(filename, hdu='TEST')
+
+        chunks = list(iter_fits_table_chunks(filename, hdu='TEST', chunk_size=10))
+        assert [len(_) for _ in chunks] == [10, 10, 5]
+        assert chunks[0].meta['TEST_KEY'] == 42
+        assert chunks[0].meta is not chunks[1].meta
+
+        actual = vstack(chunks)
+        assert actual.colnames == table.colnames
+        assert actual['A'].unit == 'deg'
+        assert_allclose(actual['A'], table['A'])
+        assert actual['B'].dtype == np.uint16
+        assert_equal(actual['B'], table['B'])
+        assert actual['C'].dtype == bool
+        assert_equal(actual['C'], table['C'])
+        assert actual['D'].shape == (25, 2, 3)
+        assert_equal(actual['D'], table['D'])
+        assert actual['E'].dtype == table['E'].dtype
+        assert actual['E'].tolist() == table['E'].tolist()
+        assert_equal(actual['F'].mask, table['F'].mask)
+        assert actual['F'].mask.sum() == 9
+        assert_equal(actual['G'], table['G'])
+
+        chunks = list(iter_fits_table_chunks(filename, hdu=1, columns=['C', 'A']))
+        assert chunks[0].colnames == ['C', 'A']
@@ -0,0 +1,57 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+from __future__ import absolute_import, division, print_function, unicode_literals
+import itertools
+import numpy as np
+from numpy.testing import assert_allclose
+from astropy.tests.helper import pytest
+from ..testing import requires_dependency
+from ..nddata import GridInterpolator
+
+
+@requires_dependency('scipy')
+@pytest.mark.parametrize('method', ['linear', 'nearest'])
+@pytest.mark.parametrize('fill_value', [np.nan, 0, None])
+def test_grid_interpolator(method, fill_value):
+    from scipy.interpolate import RegularGridInterpolator
+    np.random.seed(0)
+    points = [np.sort(np.random.uniform(0, 1, 5)), np.linspace(0, 1, 3),
+              np.logspace(0, 1, 4)]
+    values = np.random.uniform(0, 1, (5, 3, 4))
+    kwargs = dict(method=method, bounds_error=False, fill_value=fill_value)
+
+    interp = GridInterpolator(points, values, **kwargs)
+    reference = RegularGridInterpolator(points, values, **kwargs)
+
+    # Outer product evaluation
+    x = [np.random.uniform(-0.2, 1.2, 6), np.random.uniform(-0.2, 1.2, 2),
+         np.random.uniform(0.5, 12, 3)]
+    actual = interp.outer(x)
+    desired = reference(list(itertools.product(*x))).reshape(6, 2, 3)
+    assert_allclose(actual, desired)
+
+    # Broadcast evaluation
+    x = [np.random.uniform(-0.2, 1.2, (4, 1)), np.random.uniform(-0.2, 1.2, (4, 7)),
+         np.random.uniform(0.5, 12, 7)]
+    actual = interp(x)
+    desired = reference(np.stack([_.ravel() for _ in np.broadcast_arrays(*x)], axis=-1))
+    assert_allclose(actual, desired.reshape(4, 7))
+
+
+def test_grid_interpolator_nan():
+    points = [np.arange(4.), np.arange(3.)]
+    values = np.arange(12.).reshape(4, 3)
+    values[0] = np.nan
+    interp = GridInterpolator(points, values, bounds_error=False)
+
+    actual = interp.outer([np.array([0., 0.5, 2.5]), np.array([0., 1.5])])
+    desired = [[np.nan, np.nan], [3, 4.5], [7.5, 9]]
+    assert_allclose(actual, desired)
+
+    actual = interp([np.array([0.5, 2.5]), np.array([1.5, 1.5])])
+    assert_allclose(actual, [4.5, 9])
+
+
+def test_grid_interpolator_bounds_error():
+    interp = GridInterpolator([np.arange(3.)], np.arange(3.))
+    with pytest.raises(ValueError):
+        interp([np.array([3.5])])